@@ -0,0 +1,364 @@
+"""Micro-benchmarks for the Tibber Extended sensor and coordinator hot paths.
+
+Runs offline against synthetic quarter-hour payloads (1, 10 and 100 homes,
+HOURLY and QUARTER_HOURLY sensors, a normal day and the 92/100 slot DST
+days) and reports
+time per call and allocations for:
+
+- decoding the response body with the standard library and with Home
+  Assistant's ``json_loads`` (orjson), as the API client does
+- parsing a price response into typed records, deriving hourly prices and
+  building the price index (what ``_async_update_data`` does with a
+  fetched response)
+- ``_get_current_price_point``
+- ``native_value``, ``icon`` and ``extra_state_attributes``
+- a full state-write tick over all homes
+- the day rollover of the price views at the midnight tick
+
+The coordinators, fetcher and sensors are built through their constructors
+on a test Home Assistant instance, so Home Assistant and
+``pytest-homeassistant-custom-component`` (``requirements_test.txt``) must be
+installed::
+
+    python -m benchmarks.bench_hot_paths
+    python -m benchmarks.bench_hot_paths --compare
+    python -m benchmarks.bench_hot_paths --quick --output quick.json
+    python -m benchmarks.bench_hot_paths --quick --compare quick.json --threshold 0.5
+
+Results are written as JSON (``benchmarks/results/latest.json`` by default).
+With ``--compare`` the run is checked against a result file, the committed
+``benchmarks/baseline.json`` unless another is given, and exits non-zero if
+any benchmark got slower, or allocated more at its peak, than the allowed
+threshold. Time is compared per benchmark, as the geometric mean over
+all scenarios; peak allocations per scenario, ignoring changes below 1 KiB.
+The baseline is a full run, so compare full runs with it.
+
+Allocations are nearly the same on every machine, but times are not: on other
+hardware, write a baseline of the unchanged tree first and compare with
+that::
+
+    git stash && python -m benchmarks.bench_hot_paths --output /tmp/base.json
+    git stash pop && python -m benchmarks.bench_hot_paths --compare /tmp/base.json
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import math
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from unittest.mock import patch
+
+from aiohttp import ClientSession
+from homeassistant.const import __version__ as HA_VERSION
+from homeassistant.helpers import frame
+from homeassistant.util import dt as dt_util
+from homeassistant.util.json import json_loads
+from pytest_homeassistant_custom_component.common import MockConfigEntry, async_test_home_assistant
+
+from tests.helpers.payloads import FETCH_RESOLUTION, price_response
+
+ROOT = Path(__file__).resolve().parent.parent
+PACKAGE_DIR = ROOT / "custom_components" / "tibber-extended"
+PACKAGE = "tibber_extended"
+DOMAIN = "tibber_extended"
+TOKEN = "bench"
+# Körs över alla hem och får därför färre varv
+HEAVY_BENCHMARKS = (
+    "decode_json_stdlib",
+    "decode_json",
+    "parse_response",
+    "state_write_tick",
+    "day_rollover",
+)
+DEFAULT_OUTPUT = Path(__file__).resolve().parent / "results" / "latest.json"
+BASELINE = Path(__file__).resolve().parent / "baseline.json"
+# Mindre ökning av minnestoppen än så här räknas som brus vid jämförelsen
+MIN_MEMORY_DELTA = 1024
+
+TIME_ZONE = "Europe/Stockholm"
+HOME_COUNTS = (1, 10, 100)
+RESOLUTIONS = ("HOURLY", "QUARTER_HOURLY")
+DAYS = {
+    "normal": date(2026, 1, 15),
+    "dst_spring": date(2026, 3, 29),  # 23 timmar, 92 kvartar
+    "dst_autumn": date(2026, 10, 25),  # 25 timmar, 100 kvartar
+}
+
+
+def load_integration():
+    """Import the integration modules from the hyphenated package directory."""
+    # Namnrymdspaket så att __init__.py (och dess setup-kod) inte körs
+    package = types.ModuleType(PACKAGE)
+    package.__path__ = [str(PACKAGE_DIR)]
+    sys.modules[PACKAGE] = package
+    return types.SimpleNamespace(
+        api=importlib.import_module(f"{PACKAGE}.api"),
+        const=importlib.import_module(f"{PACKAGE}.const"),
+        coordinator=importlib.import_module(f"{PACKAGE}.coordinator"),
+        fetcher=importlib.import_module(f"{PACKAGE}.fetcher"),
+        sensor=importlib.import_module(f"{PACKAGE}.sensor"),
+    )
+
+
+def make_coordinator(hass, integration, resolution):
+    """Return a coordinator of a new entry, with its timers cancelled."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={"access_token": TOKEN, "resolution": resolution, "history_days": 0},
+    )
+    coordinator = integration.coordinator.TibberDataCoordinator(hass, entry)
+    # Inga schemalagda hämtningar - bara beräkningen mäts
+    coordinator._cancel_time_triggers()
+    return coordinator
+
+
+def measure(func, number, setup=None):
+    """Return (mean, min) seconds per call and (peak, retained) bytes for one call."""
+    timings = []
+    if setup is None:
+        # Korta anrop mäts i omgångar för att slippa klockans overhead
+        batch = 10
+        for _ in range(max(1, number // batch)):
+            start = time.perf_counter()
+            for _ in range(batch):
+                func()
+            timings.append((time.perf_counter() - start) / batch)
+    else:
+        for _ in range(number):
+            setup()
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    result = func()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    return sum(timings) / len(timings), min(timings), peak - before, current - before
+
+
+def run_scenario(hass, integration, homes, resolution, day_name, number):
+    """Run all benchmarks for one payload shape and return result rows."""
+    tz = dt_util.get_time_zone(TIME_ZONE)
+    day = DAYS[day_name]
+    # Priser hämtas alltid per kvart, oavsett sensorernas upplösning
+    response = price_response(homes, FETCH_RESOLUTION, day, tz)
+    body = json.dumps({"data": response}).encode()
+    frozen_now = datetime(day.year, day.month, day.day, 12, 7, tzinfo=tz)
+
+    rows = []
+    # Hela scenariot, även uppbyggnaden av vyerna, körs vid frozen_now
+    with (
+        patch.object(dt_util, "now", lambda time_zone=None: frozen_now),
+        patch.object(dt_util, "utcnow", lambda: frozen_now.astimezone(dt_util.UTC)),
+    ):
+        coordinator = make_coordinator(hass, integration, resolution)
+        # Egen coordinator utan tidigare data så att hela indexet byggs varje gång
+        ingest_coordinator = make_coordinator(hass, integration, resolution)
+        fetcher = integration.fetcher.TibberPriceFetcher(hass, TOKEN)
+
+        def ingest():
+            homes_data = fetcher._parse(response, True, True)
+            ingest_coordinator._build_price_index(homes_data)
+            return homes_data
+
+        def reset_ingest():
+            fetcher._homes = {}
+            ingest_coordinator.data = None
+
+        homes_data = fetcher._parse(response, True, True)
+        coordinator._build_price_index(homes_data)
+        coordinator.data = homes_data
+
+        sensors = [
+            integration.sensor.TibberPriceSensor(coordinator, home_id, "Bench", "SEK")
+            for home_id in homes_data
+        ]
+        sensor = sensors[0]
+
+        def tick():
+            for entity in sensors:
+                entity.native_value
+                entity.icon
+                entity.extra_state_attributes
+
+        def reset_rollover():
+            coordinator.data = homes_data
+            coordinator._views_date = day - timedelta(days=1)
+
+        benchmarks = {
+            "decode_json_stdlib": (lambda: json.loads(body), None),
+            "decode_json": (lambda: json_loads(body), None),
+            "parse_response": (ingest, reset_ingest),
+            "get_current_price_point": (sensor._get_current_price_point, None),
+            "native_value": (lambda: sensor.native_value, None),
+            "icon": (lambda: sensor.icon, None),
+            "extra_state_attributes": (lambda: sensor.extra_state_attributes, None),
+            "state_write_tick": (tick, None),
+            "day_rollover": (coordinator._roll_over, reset_rollover),
+        }
+
+        for name, (func, setup) in benchmarks.items():
+            # Tunga anrop över alla hem körs färre gånger
+            runs = max(10, number // homes) if name in HEAVY_BENCHMARKS else number
+            mean, best, peak, retained = measure(func, runs, setup)
+            rows.append(
+                {
+                    "benchmark": name,
+                    "homes": homes,
+                    "resolution": resolution,
+                    "day": day_name,
+                    "slots": len(response["viewer"]["homes"][0]["currentSubscription"]["priceInfo"]["today"]),
+                    "runs": runs,
+                    "mean_us": round(mean * 1e6, 3),
+                    "min_us": round(best * 1e6, 3),
+                    "peak_bytes": peak,
+                    "retained_bytes": retained,
+                }
+            )
+        coordinator._cancel_tick()
+        ingest_coordinator._cancel_tick()
+    return rows
+
+
+def result_key(row):
+    """Return the identity of a result row."""
+    return (row["benchmark"], row["homes"], row["resolution"], row["day"])
+
+
+def compare(rows, baseline_path, threshold):
+    """Print the regressions against a baseline and return them.
+
+    Peak allocations are compared per scenario. Single timings are too
+    noisy for that on a shared machine, so each benchmark's time is the
+    geometric mean of its ratios over all scenarios: a slower code path
+    shows up in every scenario, a noisy moment only in a few.
+    """
+    baseline = {
+        result_key(row): row
+        for row in json.loads(Path(baseline_path).read_text())["results"]
+    }
+    regressions = []
+    time_ratios = {}
+    skipped = 0
+    for row in rows:
+        old = baseline.get(result_key(row))
+        if not old:
+            continue
+        if old["runs"] != row["runs"]:
+            # Minsta tiden av färre varv är inte jämförbar
+            skipped += 1
+            continue
+        if old["min_us"] and row["min_us"]:
+            time_ratios.setdefault(row["benchmark"], []).append(
+                math.log(row["min_us"] / old["min_us"])
+            )
+        if row["peak_bytes"] - old["peak_bytes"] <= MIN_MEMORY_DELTA:
+            continue
+        ratio = row["peak_bytes"] / old["peak_bytes"] if old["peak_bytes"] else math.inf
+        if ratio > 1 + threshold:
+            regressions.append((row["benchmark"], "memory", ratio))
+            print(
+                f"REGRESSION {row['benchmark']:<24} {row['homes']:>3} homes "
+                f"{row['resolution']:<14} {row['day']:<10} peak memory {ratio:.2f}x"
+            )
+
+    for name, logs in time_ratios.items():
+        ratio = math.exp(sum(logs) / len(logs))
+        flag = "REGRESSION" if ratio > 1 + threshold else "ok"
+        print(f"{flag:<10} {name:<24} time {ratio:.2f}x over {len(logs)} scenarios")
+        if ratio > 1 + threshold:
+            regressions.append((name, "time", ratio))
+
+    if skipped:
+        print(f"{skipped} scenario(s) skipped, run with the baseline's --quick/--number to compare them")
+    print(f"{len(regressions)} regression(s) against {baseline_path}")
+    return regressions
+
+
+async def async_run(args) -> list:
+    """Run every scenario against a test Home Assistant and return the result rows."""
+    integration = load_integration()
+    number = 100 if args.quick else args.number
+    home_counts = HOME_COUNTS[:2] if args.quick else HOME_COUNTS
+
+    rows = []
+    # Egen konfigurationsmapp - cachen som sparas vid stopp hamnar inte i repot
+    with tempfile.TemporaryDirectory() as config_dir:
+        async with async_test_home_assistant(config_dir=config_dir) as hass, ClientSession() as session:
+            # Som pytest-pluginets hass-fixtur
+            frame.async_setup(hass)
+            await hass.config.async_set_time_zone(TIME_ZONE)
+            # Klienten gör inga anrop - en egen session slipper Home Assistants DNS-upplösning
+            hass.data.setdefault(DOMAIN, {})[integration.const.DATA_CLIENTS] = {
+                TOKEN: integration.api.TibberApiClient(session, TOKEN)
+            }
+            for homes in home_counts:
+                for resolution in RESOLUTIONS:
+                    for day_name in DAYS:
+                        for row in run_scenario(hass, integration, homes, resolution, day_name, number):
+                            rows.append(row)
+                            print(
+                                f"{row['benchmark']:<24} {homes:>3} homes {resolution:<14} "
+                                f"{day_name:<10} {row['mean_us']:>12.2f} us "
+                                f"{row['peak_bytes'] / 1024:>10.1f} KiB"
+                            )
+            await hass.async_stop(force=True)
+    return rows
+
+
+def main():
+    """Run the benchmarks and save the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="fewer runs, 1 and 10 homes only")
+    parser.add_argument("--number", type=int, default=1000, help="runs per benchmark")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument(
+        "--compare",
+        type=Path,
+        nargs="?",
+        const=BASELINE,
+        help="result file to compare with (default: benchmarks/baseline.json)",
+    )
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown (0.25 = 25 %%)")
+    args = parser.parse_args()
+
+    rows = asyncio.run(async_run(args))
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(
+        json.dumps(
+            {
+                "meta": {
+                    "created": datetime.now().isoformat(timespec="seconds"),
+                    "python": platform.python_version(),
+                    "homeassistant": HA_VERSION,
+                    "platform": platform.platform(),
+                    "time_zone": TIME_ZONE,
+                },
+                "results": rows,
+            },
+            indent=2,
+        )
+    )
+    print(f"Results saved to {args.output}")
+
+    if args.compare and compare(rows, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""End-to-end load test of Tibber Extended against the local mock API.
+
+Starts ``mock_server`` in-process, boots a bare Home Assistant instance
+with the integration linked in as a custom component, creates config
+entries through the real config flow and then refreshes all coordinators
+concurrently for a number of rounds. Reported per run:
+
+- setup time for all entries
+- fetch throughput (refreshes per second) and refresh latency
+  (p50/p95/p99/max, including queueing in the rate limiter)
+- failed refreshes, and the mock's 429/500/GraphQL error counters
+- state writes (state_changed events) during the rounds
+- the process's max RSS, and with ``--trace-memory`` Python memory
+  (tracemalloc setup/current/peak). Tracing slows every allocation down,
+  so latency and throughput of such runs are not comparable to others
+- homes that have tomorrow's prices at the end, for late publication runs
+
+No network access is needed. Home Assistant must be installed::
+
+    python -m benchmarks.load_test --entries 50 --homes 3 --rounds 10
+    python -m benchmarks.load_test --entries 20 --latency 0.2 --jitter 0.1 --http-429-rate 0.05
+    python -m benchmarks.load_test --entries 10 --tomorrow-at 23:59 --consumption
+
+Each entry gets its own token unless ``--shared-token`` is given, in which
+case all entries share one fetcher, client and rate limiter (and the same
+homes, so Home Assistant ignores the duplicate entities). Injected faults
+only apply to the refresh rounds; setup goes through the fault-free mock
+so that every config flow creates its entry.
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import platform
+import resource
+import socket
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import replace
+from datetime import datetime
+from pathlib import Path
+
+from aiohttp import web
+
+from tests.helpers.mock_server import GRAPHQL_PATH, add_arguments, create_app, options_from_args
+
+ROOT = Path(__file__).resolve().parent.parent
+PACKAGE_DIR = ROOT / "custom_components" / "tibber-extended"
+DOMAIN = "tibber_extended"
+DEFAULT_OUTPUT = Path(__file__).resolve().parent / "results" / "load_latest.json"
+
+
+def free_port() -> int:
+    """Return a free local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, share):
+    """Return the nearest-rank percentile of a list of values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+
+def make_config_dir(time_zone: str) -> Path:
+    """Return a temporary config directory with the integration linked in."""
+    config_dir = Path(tempfile.mkdtemp(prefix="tibber_load_"))
+    (config_dir / "custom_components").mkdir()
+    # Mappnamnet måste vara domänen för att Home Assistant ska hitta integrationen
+    (config_dir / "custom_components" / DOMAIN).symlink_to(PACKAGE_DIR)
+    (config_dir / "configuration.yaml").write_text(
+        f"homeassistant:\n  time_zone: {time_zone}\n"
+    )
+    return config_dir
+
+
+async def async_start_hass(config_dir: Path):
+    """Boot Home Assistant from the config directory."""
+    from homeassistant import bootstrap
+    from homeassistant.runner import RuntimeConfig
+
+    # Repots custom_components skulle annars skugga konfigurationsmappens
+    sys.path[:] = [path for path in sys.path if Path(path or ".").resolve() != ROOT]
+    hass = await bootstrap.async_setup_hass(
+        RuntimeConfig(config_dir=str(config_dir), skip_pip=True)
+    )
+    if hass is None:
+        raise RuntimeError("Home Assistant failed to start")
+    await hass.async_start()
+    return hass
+
+
+async def async_create_entry(hass, index: int, args):
+    """Create one config entry through the config flow and return it."""
+    flow = hass.config_entries.flow
+    result = await flow.async_init(DOMAIN, context={"source": "user"})
+    result = await flow.async_configure(
+        result["flow_id"],
+        {
+            "access_token": "load-test" if args.shared_token else f"load-test-{index}",
+            "home_name": f"Load {index}",
+            "resolution": args.resolution,
+            "consumption": args.consumption,
+        },
+    )
+    if result.get("step_id") == "homes":
+        # Kontot har flera hem - följ de första --track-homes av de som erbjuds
+        offered = list(next(iter(result["data_schema"].schema.values())).options)
+        tracked = args.track_homes or args.homes
+        result = await flow.async_configure(result["flow_id"], {"homes": offered[:tracked]})
+    if result["type"] != "create_entry":
+        raise RuntimeError(f"Config flow did not create an entry: {result}")
+    return result["result"]
+
+
+async def async_run(args) -> dict:
+    """Run the load test and return the results."""
+    options = options_from_args(args)
+    port = free_port()
+
+    # Fel injiceras först i omgångarna, annars kan konfigurationsflödet avbrytas
+    app, mock = create_app(replace(options, http_429_rate=0.0, error_rate=0.0, graphql_error_rate=0.0))
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+
+    hass = await async_start_hass(make_config_dir(args.time_zone))
+    try:
+        # Samma modul som Home Assistant laddar - klienten läser adressen vid varje anrop
+        api = importlib.import_module(f"custom_components.{DOMAIN}.api")
+        api.TIBBER_API_URL = f"http://127.0.0.1:{port}{GRAPHQL_PATH}"
+
+        from homeassistant.const import EVENT_STATE_CHANGED
+
+        if args.trace_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        entries = []
+        for index in range(args.entries):
+            entries.append(await async_create_entry(hass, index, args))
+        await hass.async_block_till_done()
+        setup_seconds = time.perf_counter() - started
+        setup_memory = tracemalloc.get_traced_memory()[0] if args.trace_memory else None
+        setup_stats = dict(mock.stats)
+
+        coordinators = [hass.data[DOMAIN][entry.entry_id] for entry in entries]
+        state_writes = 0
+
+        def count_write(event):
+            nonlocal state_writes
+            state_writes += 1
+
+        remove_listener = hass.bus.async_listen(EVENT_STATE_CHANGED, count_write)
+        mock.options = options
+
+        async def timed_refresh(coordinator):
+            refresh_started = time.perf_counter()
+            await coordinator.async_refresh()
+            return time.perf_counter() - refresh_started, coordinator.last_update_success
+
+        latencies = []
+        failures = 0
+        if args.trace_memory:
+            tracemalloc.reset_peak()
+        rounds_started = time.perf_counter()
+        for _ in range(args.rounds):
+            for coordinator in coordinators:
+                # Förbi fetcherns sammanslagning av tätt liggande hämtningar
+                coordinator.fetcher._last_result = None
+            for latency, success in await asyncio.gather(
+                *(timed_refresh(coordinator) for coordinator in coordinators)
+            ):
+                latencies.append(latency)
+                failures += not success
+            await hass.async_block_till_done()
+            if args.interval:
+                await asyncio.sleep(args.interval)
+        rounds_seconds = time.perf_counter() - rounds_started
+        current = peak = None
+        if args.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        remove_listener()
+
+        homes = [(coordinator, home) for coordinator in coordinators for home in coordinator.data or {}]
+        refreshes = len(latencies)
+        return {
+            "entries": args.entries,
+            "homes_per_entry": args.track_homes or args.homes,
+            "rounds": args.rounds,
+            "setup_s": round(setup_seconds, 3),
+            "setup_requests": setup_stats.get("requests", 0),
+            "refreshes": refreshes,
+            "refreshes_per_s": round(refreshes / rounds_seconds, 1) if rounds_seconds else None,
+            "latency_ms": {
+                name: round(percentile(latencies, share) * 1000, 1) if latencies else None
+                for name, share in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99), ("max", 1.0))
+            },
+            "failed_refreshes": failures,
+            "state_writes": state_writes,
+            "homes_with_tomorrow": sum(
+                bool(coordinator.get_prices(home, "tomorrow")) for coordinator, home in homes
+            ),
+            "homes": len(homes),
+            "memory": {
+                "setup_bytes": setup_memory,
+                "current_bytes": current,
+                "peak_bytes": peak,
+                "max_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            },
+            "server": dict(mock.stats),
+        }
+    finally:
+        await hass.async_stop()
+        await runner.cleanup()
+
+
+def main():
+    """Run the load test and save the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=10, help="config entries to create")
+    parser.add_argument("--track-homes", type=int, default=0, help="homes tracked per entry (0 = all)")
+    parser.add_argument("--resolution", default="QUARTER_HOURLY", choices=("HOURLY", "QUARTER_HOURLY"))
+    parser.add_argument("--rounds", type=int, default=5, help="concurrent refresh rounds")
+    parser.add_argument("--interval", type=float, default=0.0, help="pause between rounds (s)")
+    parser.add_argument("--shared-token", action="store_true", help="one token for all entries")
+    parser.add_argument("--consumption", action="store_true", help="enable consumption sensors")
+    parser.add_argument("--trace-memory", action="store_true", help="measure Python memory (slows the run)")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    results = asyncio.run(async_run(args))
+    print(json.dumps(results, indent=2))
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(
+        json.dumps(
+            {
+                "meta": {
+                    "created": datetime.now().isoformat(timespec="seconds"),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "arguments": {key: value for key, value in vars(args).items() if key != "output"},
+                },
+                "results": results,
+            },
+            indent=2,
+        )
+    )
+    print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,167 @@
 """Tibber Extended Integration för Home Assistant."""
 import logging
+import voluptuous as vol
+
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+)
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    CONF_ACCESS_TOKEN,
+    CONF_CHEAPEST_COUNT,
+    CONF_CHEAPEST_SLOTS,
+    CONF_CONSUMPTION,
+    CONF_HISTORY_DAYS,
+    CONF_HOMES,
+    CONF_LIVE_MEASUREMENT,
+    CONF_LIVE_THROTTLE,
+    CONF_PERIOD_HOURS,
+    CONF_PRICE_THRESHOLD,
+    CONF_RESOLUTION,
+    DEFAULT_CHEAPEST_COUNT,
+    DEFAULT_CHEAPEST_SLOTS,
+    DEFAULT_HISTORY_DAYS,
+    DEFAULT_LIVE_THROTTLE,
+    DEFAULT_PERIOD_HOURS,
+    DEFAULT_PRICE_THRESHOLD,
+    SIGNAL_OPTIONS_UPDATED,
+)
+from .api import async_drop_client
+from .consumption import TibberConsumptionCoordinator
+from .coordinator import STORAGE_VERSION, TibberDataCoordinator
+from .live import TibberLiveStream
+from .periods import MODE_CHEAPEST_WINDOW, PERIOD_MODES, find_period
 
 _LOGGER = logging.getLogger(__name__)
 
 DOMAIN = "tibber_extended"
-PLATFORMS = ["sensor"]
+PLATFORMS = ["sensor", "binary_sensor"]
+
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+SERVICE_FIND_PRICE_PERIOD = "find_price_period"
+
+# Inställningar som ändrar vilka entiteter eller strömmar som finns - kräver omladdning
+RELOAD_OPTIONS = {
+    CONF_ACCESS_TOKEN: None,
+    CONF_RESOLUTION: "QUARTER_HOURLY",
+    CONF_HOMES: [],
+    CONF_PERIOD_HOURS: DEFAULT_PERIOD_HOURS,
+    CONF_LIVE_MEASUREMENT: False,
+    CONF_LIVE_THROTTLE: DEFAULT_LIVE_THROTTLE,
+    CONF_CONSUMPTION: False,
+}
+
+# Inställningar vars värde kan ändras på plats, men som skapar entiteter när de slås på/av
+TOGGLE_OPTIONS = {
+    CONF_CHEAPEST_SLOTS: DEFAULT_CHEAPEST_SLOTS,
+    CONF_CHEAPEST_COUNT: DEFAULT_CHEAPEST_COUNT,
+    CONF_PRICE_THRESHOLD: DEFAULT_PRICE_THRESHOLD,
+    CONF_HISTORY_DAYS: DEFAULT_HISTORY_DAYS,
+}
+
+FIND_PRICE_PERIOD_SCHEMA = vol.Schema(
+    {
+        vol.Optional("home_id"): cv.string,
+        vol.Optional("mode", default=MODE_CHEAPEST_WINDOW): vol.In(PERIOD_MODES),
+        vol.Optional("hours", default=3): vol.All(vol.Coerce(float), vol.Range(min=0.25, max=48)),
+        vol.Optional("count", default=6): vol.All(vol.Coerce(int), vol.Range(min=1, max=192)),
+        vol.Optional("start"): cv.datetime,
+        vol.Optional("end"): cv.datetime,
+    }
+)
+
+
+def _as_local(value):
+    """Treat naive service datetimes as local time."""
+    if value is None or value.tzinfo is not None:
+        return value
+    return value.replace(tzinfo=dt_util.get_default_time_zone())
+
+
+async def async_setup(hass: HomeAssistant, config: dict) -> bool:
+    """Set up the Tibber Extended services."""
+
+    async def async_find_price_period(call: ServiceCall) -> ServiceResponse:
+        """Find the cheapest/most expensive period in the cached prices."""
+        start = _as_local(call.data.get("start"))
+        end = _as_local(call.data.get("end"))
+        homes = {}
+        
+        for coordinator in hass.data.get(DOMAIN, {}).values():
+            if not isinstance(coordinator, TibberDataCoordinator) or not coordinator.data:
+                continue
+            for home_id in coordinator.data:
+                if call.data.get("home_id") not in (None, home_id) or home_id in homes:
+                    continue
+                homes[home_id] = find_period(
+                    coordinator.get_horizon(home_id),
+                    call.data["mode"],
+                    call.data["hours"],
+                    call.data["count"],
+                    coordinator.sensor_update_interval,
+                    start,
+                    end,
+                )
+        
+        return {"homes": homes}
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_FIND_PRICE_PERIOD,
+        async_find_price_period,
+        schema=FIND_PRICE_PERIOD_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    
+    return True
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Tibber Extended from a config entry."""
     hass.data.setdefault(DOMAIN, {})
-    hass.data[DOMAIN][entry.entry_id] = entry.data
+    coordinator = TibberDataCoordinator(hass, entry)
+    
+    # Visa cachade priser direkt och hämta bara i bakgrunden om de är gamla
+    if await coordinator.async_restore():
+        _LOGGER.debug("Cached prices are fresh, skipping initial fetch")
+    elif coordinator.data:
+        entry.async_create_background_task(
+            hass, coordinator.async_refresh(), f"{DOMAIN}_refresh_{entry.entry_id}"
+        )
+    else:
+        # Ingen cache - försök hämta data första gången
+        try:
+            await coordinator.async_config_entry_first_refresh()
+        except Exception as err:
+            _LOGGER.error("Failed to fetch initial data: %s", err)
+    
+    # Starta realtidsströmmar för Tibber Pulse om det är aktiverat
+    if entry.data.get(CONF_LIVE_MEASUREMENT, False) and coordinator.data:
+        throttle = entry.data.get(CONF_LIVE_THROTTLE, DEFAULT_LIVE_THROTTLE)
+        for home_id in coordinator.data:
+            stream = TibberLiveStream(hass, coordinator.token, home_id, throttle)
+            stream.async_start()
+            entry.async_on_unload(stream.async_stop)
+            coordinator.live_streams[home_id] = stream
+    
+    # Förbrukning och kostnad hämtas stegvis från senast sparade cursor
+    if entry.data.get(CONF_CONSUMPTION, False) and coordinator.data:
+        coordinator.consumption = TibberConsumptionCoordinator(hass, entry, coordinator)
+        await coordinator.consumption.async_restore()
+        entry.async_create_background_task(
+            hass, coordinator.consumption.async_refresh(), f"{DOMAIN}_consumption_{entry.entry_id}"
+        )
+    
+    hass.data[DOMAIN][entry.entry_id] = coordinator
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     
@@ -32,6 +181,53 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     return unload_ok
 
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove cached prices, history and consumption when a config entry is deleted."""
+    await Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}").async_remove()
+    await Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.history").async_remove()
+    await Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.consumption").async_remove()
+    async_drop_client(hass, entry.data[CONF_ACCESS_TOKEN])
+
+
+def _needs_reload(old: dict, new: dict) -> bool:
+    """Return True if the changed options cannot be applied in place."""
+    for key, default in RELOAD_OPTIONS.items():
+        if old.get(key, default) != new.get(key, default):
+            return True
+    for key, default in TOGGLE_OPTIONS.items():
+        if bool(old.get(key, default)) != bool(new.get(key, default)):
+            return True
+    return False
+
+
 async def update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
-    """Handle options update."""
-    await hass.config_entries.async_reload(entry.entry_id)
\ No newline at end of file
+    """Handle options update.
+
+    Most options are applied to the running coordinator and entities.
+    Only changes to the token, the resolution or the set of entities
+    reload the entry, and only a new token discards the cached prices.
+    """
+    coordinator = hass.data[DOMAIN].get(entry.entry_id)
+    new = dict(entry.data)
+    if coordinator is None:
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+    
+    old = coordinator.options
+    if _needs_reload(old, new):
+        token_changed = old.get(CONF_ACCESS_TOKEN) != new.get(CONF_ACCESS_TOKEN)
+        if token_changed:
+            # Cachen hör till den gamla token - hämta på nytt efter omladdningen
+            await coordinator.async_discard_cache()
+        else:
+            # Spara nu så att omladdningen startar från cachen utan API-anrop
+            await coordinator.async_flush()
+        _LOGGER.debug("Reloading %s after changed options", entry.title)
+        await hass.config_entries.async_reload(entry.entry_id)
+        if token_changed:
+            # Den gamla tokens klient behålls bara om en annan entry använder den
+            async_drop_client(hass, old[CONF_ACCESS_TOKEN])
+        return
+    
+    coordinator.async_apply_options(new)
+    async_dispatcher_send(hass, SIGNAL_OPTIONS_UPDATED.format(entry.entry_id), old, new)
\ No newline at end of file
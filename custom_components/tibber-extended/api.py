@@ -0,0 +1,365 @@
+"""Tibber GraphQL API client for Tibber Extended."""
+import asyncio
+import logging
+import time
+from email.utils import parsedate_to_datetime
+from http import HTTPStatus
+
+import aiohttp
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.util import dt as dt_util
+from homeassistant.util.json import json_loads
+
+from .const import CONF_ACCESS_TOKEN, DOMAIN, DATA_CLIENTS, TIBBER_API_URL
+from .metrics import TibberMetrics
+from .scheduler import backoff_delay
+
+_LOGGER = logging.getLogger(__name__)
+
+# Timeout i sekunder för vanliga hämtningar respektive token-validering
+DEFAULT_TIMEOUT = 30
+VALIDATE_TIMEOUT = 10
+
+# Tibbers gräns per token, med utrymme för några anrop i snabb följd
+RATE_LIMIT_REQUESTS = 100
+RATE_LIMIT_PERIOD = 300  # sekunder
+RATE_LIMIT_BURST = 10
+# Längsta tid ett anrop köar för en ledig plats innan det ges upp
+MAX_QUEUE_WAIT = 10  # sekunder
+
+# Paus efter HTTP 429 när Retry-After saknas, och högsta tillåtna paus
+DEFAULT_RETRY_AFTER = 60  # sekunder
+MAX_RETRY_AFTER = 3600  # sekunder
+
+# Kretsbrytaren öppnar efter så här många fel i följd: 30 s, 1, 2, 4 ... max 30 min
+CIRCUIT_FAILURE_THRESHOLD = 3
+CIRCUIT_BASE_DELAY = 30
+CIRCUIT_MAX_DELAY = 1800
+
+HOMES_QUERY = """
+{
+    viewer {
+        homes {
+            id
+            appNickname
+        }
+    }
+}
+"""
+
+
+class TibberApiError(Exception):
+    """Error returned by the Tibber API."""
+
+
+class TibberGraphQLError(TibberApiError):
+    """The Tibber API answered with GraphQL errors."""
+
+
+class TibberUnavailableError(TibberApiError):
+    """No request was sent because the API must not be called right now."""
+
+    def __init__(self, message: str, retry_after: float) -> None:
+        """Initialize the error with the seconds until a retry makes sense."""
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TibberRateLimitError(TibberUnavailableError):
+    """Tibber's request limit for the token is reached."""
+
+
+class TibberCircuitOpenError(TibberUnavailableError):
+    """Requests are paused after repeated failures."""
+
+
+class TokenBucket:
+    """Token bucket allowing ``capacity`` requests at once and ``rate`` per second.
+
+    Reservations may drive the bucket negative; each caller then waits
+    for its own place in line, so concurrent requests are spread out
+    instead of all retrying at the same moment.
+    """
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        """Initialize a full bucket."""
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def reserve(self) -> float:
+        """Take one token and return how many seconds to wait before using it."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def release(self) -> None:
+        """Give back a reserved token that was not used."""
+        self.tokens += 1
+
+
+class CircuitBreaker:
+    """Stop calling the API after repeated failures.
+
+    After ``CIRCUIT_FAILURE_THRESHOLD`` failures in a row the breaker
+    opens for an exponentially growing time. When it expires one probe
+    request is let through while every other caller still fails fast; a
+    success closes the breaker, a failure opens it again.
+    """
+
+    __slots__ = ("failures", "open_until", "probing")
+
+    def __init__(self) -> None:
+        """Initialize a closed breaker."""
+        self.failures = 0
+        self.open_until = 0.0
+        self.probing = False
+
+    def check(self) -> None:
+        """Raise TibberCircuitOpenError while the breaker is open or probing."""
+        remaining = self.open_until - time.monotonic()
+        if remaining > 0:
+            raise TibberCircuitOpenError(
+                f"Tibber API paused after {self.failures} failures, retry in {remaining:.0f} s",
+                remaining,
+            )
+        if self.failures < CIRCUIT_FAILURE_THRESHOLD:
+            return
+        # Halvöppen - bara ett provanrop åt gången
+        if self.probing:
+            raise TibberCircuitOpenError(
+                f"Tibber API paused after {self.failures} failures, waiting for a probe request",
+                DEFAULT_TIMEOUT,
+            )
+        self.probing = True
+
+    def release(self) -> None:
+        """Let another request probe, when the probe was never answered."""
+        self.probing = False
+
+    def record_success(self) -> None:
+        """Close the breaker."""
+        if self.failures >= CIRCUIT_FAILURE_THRESHOLD:
+            _LOGGER.info("Tibber API reachable again, resuming requests")
+        self.failures = 0
+        self.open_until = 0.0
+        self.probing = False
+
+    def record_failure(self) -> None:
+        """Count a failure and open the breaker at the threshold."""
+        self.failures += 1
+        self.probing = False
+        if self.failures < CIRCUIT_FAILURE_THRESHOLD:
+            return
+        delay = backoff_delay(
+            self.failures - CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_BASE_DELAY, CIRCUIT_MAX_DELAY
+        )
+        self.open_until = time.monotonic() + delay
+        _LOGGER.warning(
+            "Tibber API failed %s times in a row, pausing requests for %.0f s",
+            self.failures,
+            delay,
+        )
+
+
+def parse_retry_after(value: str | None) -> float:
+    """Return the seconds of a Retry-After header (delay or HTTP date)."""
+    if not value:
+        return DEFAULT_RETRY_AFTER
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = (parsedate_to_datetime(value) - dt_util.utcnow()).total_seconds()
+        except (TypeError, ValueError):
+            return DEFAULT_RETRY_AFTER
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+class TibberApiClient:
+    """Send GraphQL queries to Tibber for one access token.
+
+    All clients share Home Assistant's pooled keep-alive session, so
+    repeated fetches and token validations reuse the same TCP/TLS
+    connection to api.tibber.com instead of opening a new one per call.
+
+    Requests go through a token-bucket limiter and a circuit breaker.
+    HTTP 429 pauses all requests for the token until Retry-After has
+    passed, and nothing is sent while the pause or an open breaker
+    lasts; those calls raise a TibberUnavailableError instead.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        token: str,
+        metrics: TibberMetrics | None = None,
+    ) -> None:
+        """Initialize the client."""
+        self._session = session
+        self.metrics = metrics
+        self._limiter = TokenBucket(RATE_LIMIT_REQUESTS / RATE_LIMIT_PERIOD, RATE_LIMIT_BURST)
+        self._breaker = CircuitBreaker()
+        self._retry_at = 0.0
+        self._headers = {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json",
+        }
+
+    async def _async_acquire(self) -> None:
+        """Wait for a free request slot, or raise if none is available soon."""
+        remaining = self._retry_at - time.monotonic()
+        if remaining > 0:
+            raise TibberRateLimitError(
+                f"Tibber rate limit, retry in {remaining:.0f} s", remaining
+            )
+        self._breaker.check()
+
+        try:
+            delay = self._limiter.reserve()
+            if delay > MAX_QUEUE_WAIT:
+                self._limiter.release()
+                raise TibberRateLimitError(
+                    f"Local request limit reached, retry in {delay:.0f} s", delay
+                )
+            if delay:
+                _LOGGER.debug("Request limit reached, waiting %.1f s", delay)
+                await asyncio.sleep(delay)
+        except BaseException:
+            # Inget anrop skickades - ett eventuellt provanrop får göras av nästa
+            self._breaker.release()
+            raise
+
+    async def async_query(
+        self,
+        query: str,
+        variables: dict | None = None,
+        timeout: int = DEFAULT_TIMEOUT,
+    ) -> dict:
+        """Run a GraphQL query and return its data object."""
+        payload = {"query": query}
+        if variables:
+            payload["variables"] = variables
+
+        await self._async_acquire()
+        started = time.monotonic()
+        try:
+            async with self._session.post(
+                TIBBER_API_URL,
+                json=payload,
+                headers=self._headers,
+                timeout=aiohttp.ClientTimeout(total=timeout),
+            ) as response:
+                if response.status == HTTPStatus.TOO_MANY_REQUESTS:
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    self._retry_at = time.monotonic() + retry_after
+                    _LOGGER.warning(
+                        "Tibber rate limit reached, pausing requests for %.0f s", retry_after
+                    )
+                    raise TibberRateLimitError(
+                        f"Tibber rate limit, retry in {retry_after:.0f} s", retry_after
+                    )
+                if response.status != 200:
+                    raise TibberApiError(f"API error: {response.status}")
+
+                body = await response.read()
+        except TibberRateLimitError:
+            # 429 säger inget om API:ets hälsa - pausen efter Retry-After räcker
+            self._breaker.release()
+            if self.metrics:
+                self.metrics.increment("rate_limited")
+            raise
+        except (TibberApiError, aiohttp.ClientError, asyncio.TimeoutError):
+            self._breaker.record_failure()
+            if self.metrics:
+                self.metrics.increment("api_errors")
+            raise
+        except asyncio.CancelledError:
+            self._breaker.release()
+            raise
+
+        self._breaker.record_success()
+        if self.metrics:
+            self.metrics.record_fetch((time.monotonic() - started) * 1000, len(body))
+
+        # orjson via Home Assistant - snabbare än aiohttp:s json()
+        data = json_loads(body)
+        if "errors" in data:
+            if self.metrics:
+                self.metrics.increment("graphql_errors")
+            error_msg = data["errors"][0].get("message", "Unknown error")
+            raise TibberGraphQLError(error_msg)
+
+        return data.get("data") or {}
+
+    async def async_get_homes(self) -> dict | None:
+        """Return the account's homes as {id: nickname}, or None if the token is invalid.
+
+        Raises TibberUnavailableError if the token is rate limited, since
+        the token may well be valid.
+        """
+        try:
+            data = await self.async_query(HOMES_QUERY, timeout=VALIDATE_TIMEOUT)
+        except TibberGraphQLError:
+            return None
+        except TibberUnavailableError:
+            raise
+        except Exception as err:
+            _LOGGER.error("Error validating token: %s", err)
+            return None
+
+        return {
+            home["id"]: home.get("appNickname") or home["id"]
+            for home in (data.get("viewer") or {}).get("homes") or []
+        }
+
+    async def async_validate_token(self) -> bool:
+        """Return True if the token can read the account's homes."""
+        return await self.async_get_homes() is not None
+
+
+def async_get_client(
+    hass: HomeAssistant,
+    token: str,
+    metrics: TibberMetrics | None = None,
+    keep: bool = True,
+) -> TibberApiClient:
+    """Return the shared client for a token.
+
+    The coordinators, the live stream and the config flow's token
+    validation all use the same client per token, so its limiter and
+    circuit breaker cover every request made with that token. The client
+    is kept across entry reloads, so a Retry-After pause and the breaker's
+    state outlast a reload, until ``async_drop_client`` is called for a
+    token that no entry uses any more. Callers that only need it briefly
+    pass ``keep=False`` and get a client that is not kept when the token
+    has none in use.
+    """
+    clients = hass.data.setdefault(DOMAIN, {}).setdefault(DATA_CLIENTS, {})
+    client = clients.get(token)
+
+    if client is None:
+        client = TibberApiClient(async_get_clientsession(hass), token, metrics)
+        if keep:
+            clients[token] = client
+    elif metrics is not None:
+        client.metrics = metrics
+
+    return client
+
+
+def async_drop_client(hass: HomeAssistant, token: str) -> None:
+    """Forget the shared client of a token that no config entry uses any more."""
+    if any(
+        entry.data.get(CONF_ACCESS_TOKEN) == token
+        for entry in hass.config_entries.async_entries(DOMAIN)
+    ):
+        return
+    hass.data.get(DOMAIN, {}).get(DATA_CLIENTS, {}).pop(token, None)
@@ -0,0 +1,173 @@
+"""Binary sensor platform for Tibber Extended."""
+import logging
+from bisect import bisect_right
+from datetime import datetime, timezone
+
+from homeassistant.components.binary_sensor import BinarySensorEntity
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_track_point_in_utc_time
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+from .entity import TibberHomeEntity
+from .ranking import RULE_BELOW_THRESHOLD, RULE_CHEAPEST
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up Tibber Extended binary sensors."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    entities = []
+
+    for home_id in coordinator.data or {}:
+        home_name = coordinator.home_name(home_id)
+        if coordinator.cheapest_count:
+            entities.append(
+                TibberPriceRuleBinarySensor(
+                    coordinator, home_id, home_name, RULE_CHEAPEST, "mdi:cash-check"
+                )
+            )
+        if coordinator.price_threshold:
+            entities.append(
+                TibberPriceRuleBinarySensor(
+                    coordinator, home_id, home_name, RULE_BELOW_THRESHOLD, "mdi:cash-minus"
+                )
+            )
+
+    async_add_entities(entities)
+
+
+class TibberPriceRuleBinarySensor(TibberHomeEntity, BinarySensorEntity):
+    """On while the current slot matches a price rule.
+
+    The coordinator computes the rule's on-windows once per data update.
+    The sensor arms a single timer at the next window start or end, so it
+    changes state exactly at the transitions without polling.
+    """
+
+    def __init__(self, coordinator, home_id, home_name, rule, icon):
+        """Initialize the binary sensor."""
+        super().__init__(coordinator, home_id)
+        self._rule = rule
+        self._attr_name = f"{home_name} {self._label()}"
+        self._attr_unique_id = f"{home_id}_{rule}"
+        self._attr_icon = icon
+        self._unsub_transition = None
+
+    def _label(self) -> str:
+        """Return the name of the rule with its current setting."""
+        if self._rule == RULE_CHEAPEST:
+            return f"Cheapest {self.coordinator.cheapest_count} Slots"
+        return f"Price Below {self.coordinator.price_threshold}"
+
+    def _apply_options(self, old, new):
+        """Rename after the home name or the rule's setting changed."""
+        super()._apply_options(old, new)
+        self._attr_name = f"{self.coordinator.home_name(self._home_id)} {self._label()}"
+
+    def _get_windows(self):
+        """Return the (starts, ends) arrays of the rule's on-windows."""
+        return (self.coordinator.rule_windows.get(self._home_id) or {}).get(self._rule)
+
+    @property
+    def available(self) -> bool:
+        """Return if entity is available."""
+        return super().available and self._get_windows() is not None
+
+    def _write_key(self):
+        """Add how many windows have started and ended to the write key."""
+        windows = self._get_windows()
+        if windows is None:
+            return super()._write_key()
+        starts, ends = windows
+        now = dt_util.utcnow().timestamp()
+        return (super()._write_key(), bisect_right(starts, now), bisect_right(ends, now))
+
+    @property
+    def is_on(self) -> bool | None:
+        """Return True while the current slot is inside an on-window."""
+        windows = self._get_windows()
+        if windows is None:
+            return None
+        starts, ends = windows
+        now = dt_util.utcnow().timestamp()
+        position = bisect_right(starts, now) - 1
+        return position >= 0 and now < ends[position]
+
+    @property
+    def extra_state_attributes(self):
+        """Return the upcoming on-windows."""
+        windows = self._get_windows()
+        if windows is None:
+            return {}
+        now = dt_util.utcnow().timestamp()
+        return {
+            "windows": [
+                {"start": _as_iso(start), "end": _as_iso(end)}
+                for start, end in zip(*windows)
+                if end > now
+            ]
+        }
+
+    async def async_added_to_hass(self):
+        """Arm the first transition when added to hass."""
+        await super().async_added_to_hass()
+        self._schedule_transition()
+        self.async_on_remove(self._cancel_transition)
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Re-arm the transition timer for new windows."""
+        self._schedule_transition()
+        super()._handle_coordinator_update()
+
+    @callback
+    def _schedule_transition(self) -> None:
+        """Arm a timer at the next window start or end."""
+        self._cancel_transition()
+        windows = self._get_windows()
+        if not windows:
+            return
+
+        starts, ends = windows
+        now = dt_util.utcnow().timestamp()
+        upcoming = []
+        for column in (starts, ends):
+            position = bisect_right(column, now)
+            if position < len(column):
+                upcoming.append(column[position])
+        if not upcoming:
+            return
+
+        self._unsub_transition = async_track_point_in_utc_time(
+            self.hass,
+            self._handle_transition,
+            datetime.fromtimestamp(min(upcoming), tz=timezone.utc),
+        )
+
+    @callback
+    def _cancel_transition(self) -> None:
+        """Cancel the armed transition timer."""
+        if self._unsub_transition:
+            self._unsub_transition()
+            self._unsub_transition = None
+
+    @callback
+    def _handle_transition(self, now) -> None:
+        """Write the new state and arm the next transition."""
+        self._unsub_transition = None
+        _LOGGER.debug("%s transition at %s", self._attr_name, now)
+        self._async_write_if_changed()
+        self._schedule_transition()
+
+
+def _as_iso(timestamp: float) -> str:
+    """Return an epoch timestamp as a local ISO 8601 string."""
+    return dt_util.as_local(datetime.fromtimestamp(timestamp, tz=timezone.utc)).isoformat()
@@ -1,13 +1,14 @@
 """Config flow for Tibber Extended."""
 import logging
 import voluptuous as vol
-import aiohttp
 import re
 
 from homeassistant import config_entries
 from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
+import homeassistant.helpers.config_validation as cv
 
+from .api import TibberUnavailableError, async_get_client
 from .const import (
     DOMAIN,
     CONF_ACCESS_TOKEN,
@@ -15,12 +16,33 @@ from .const import (
     CONF_UPDATE_TIMES,
     CONF_HOME_NAME,
     CONF_CURRENCY,
+    CONF_ATTRIBUTE_MODE,
+    CONF_UPDATE_MODE,
+    CONF_LIVE_MEASUREMENT,
+    CONF_LIVE_THROTTLE,
+    CONF_PERIOD_HOURS,
+    CONF_CHEAPEST_SLOTS,
+    CONF_HISTORY_DAYS,
+    CONF_CHEAPEST_COUNT,
+    CONF_PRICE_THRESHOLD,
+    CONF_HOMES,
+    CONF_ACCOUNT_HOMES,
+    CONF_CONSUMPTION,
     DEFAULT_DEMO_TOKEN,
     DEFAULT_UPDATE_TIMES,
     DEFAULT_CURRENCY,
+    DEFAULT_ATTRIBUTE_MODE,
+    DEFAULT_UPDATE_MODE,
+    DEFAULT_LIVE_THROTTLE,
+    DEFAULT_PERIOD_HOURS,
+    DEFAULT_CHEAPEST_SLOTS,
+    DEFAULT_HISTORY_DAYS,
+    DEFAULT_CHEAPEST_COUNT,
+    DEFAULT_PRICE_THRESHOLD,
     RESOLUTION_OPTIONS,
     CURRENCY_OPTIONS,
-    TIBBER_API_URL,
+    ATTRIBUTE_MODE_OPTIONS,
+    UPDATE_MODE_OPTIONS,
 )
 
 _LOGGER = logging.getLogger(__name__)
@@ -32,11 +54,32 @@ def validate_time_format(time_str: str) -> bool:
     return bool(re.match(pattern, time_str))
 
 
+def parse_period_hours(value: str) -> list | None:
+    """Parse comma separated period lengths in hours, or None if invalid."""
+    period_hours = []
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            hours = float(part)
+        except ValueError:
+            return None
+        if not 0.25 <= hours <= 24:
+            return None
+        period_hours.append(int(hours) if hours.is_integer() else hours)
+    return period_hours
+
+
 class TibberExtendedConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Tibber Extended."""
 
     VERSION = 1
 
+    def __init__(self) -> None:
+        """Initialize the flow."""
+        self._data = {}
+
     async def async_step_user(self, user_input=None) -> FlowResult:
         """Handle the initial step."""
         errors = {}
@@ -61,18 +104,33 @@ class TibberExtendedConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                     errors["base"] = "invalid_time_format"
                     break
             
-            if valid_times:
-                # Validera token
-                valid = await self._validate_token(token)
+            # Validera periodlängder för billigaste/dyraste perioder
+            period_hours = parse_period_hours(str(user_input.get(CONF_PERIOD_HOURS, "")))
+            if valid_times and period_hours is None:
+                errors["base"] = "invalid_period_hours"
+            
+            if not errors:
+                # Validera token och hämta kontots hem
+                try:
+                    homes = await async_get_client(self.hass, token, keep=False).async_get_homes()
+                    valid = homes is not None
+                except TibberUnavailableError as err:
+                    _LOGGER.warning("Could not validate token: %s", err)
+                    valid = None
                 
                 if valid:
                     # Spara times_list istället för sträng
                     user_input[CONF_UPDATE_TIMES] = times_list if times_list else DEFAULT_UPDATE_TIMES
+                    user_input[CONF_PERIOD_HOURS] = period_hours
+                    user_input[CONF_ACCOUNT_HOMES] = homes
+                    self._data = user_input
                     
-                    return self.async_create_entry(
-                        title=user_input.get(CONF_HOME_NAME, "Tibber Extended"),
-                        data=user_input,
-                    )
+                    if len(homes) > 1:
+                        # Flera hem på kontot - låt användaren välja vilka som följs
+                        return await self.async_step_homes()
+                    return self._async_create_entry()
+                elif valid is None:
+                    errors["base"] = "rate_limited"
                 else:
                     errors["base"] = "invalid_token"
 
@@ -101,6 +159,46 @@ class TibberExtendedConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                     CONF_UPDATE_TIMES,
                     default=default_times
                 ): str,
+                vol.Optional(
+                    CONF_UPDATE_MODE,
+                    default=DEFAULT_UPDATE_MODE
+                ): vol.In(UPDATE_MODE_OPTIONS),
+                vol.Optional(
+                    CONF_ATTRIBUTE_MODE,
+                    default=DEFAULT_ATTRIBUTE_MODE
+                ): vol.In(ATTRIBUTE_MODE_OPTIONS),
+                vol.Optional(
+                    CONF_PERIOD_HOURS,
+                    default=", ".join(str(h) for h in DEFAULT_PERIOD_HOURS)
+                ): str,
+                vol.Optional(
+                    CONF_CHEAPEST_SLOTS,
+                    default=DEFAULT_CHEAPEST_SLOTS
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=96)),
+                vol.Optional(
+                    CONF_HISTORY_DAYS,
+                    default=DEFAULT_HISTORY_DAYS
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=365)),
+                vol.Optional(
+                    CONF_CHEAPEST_COUNT,
+                    default=DEFAULT_CHEAPEST_COUNT
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=96)),
+                vol.Optional(
+                    CONF_PRICE_THRESHOLD,
+                    default=DEFAULT_PRICE_THRESHOLD
+                ): vol.Coerce(float),
+                vol.Optional(
+                    CONF_LIVE_MEASUREMENT,
+                    default=False
+                ): bool,
+                vol.Optional(
+                    CONF_LIVE_THROTTLE,
+                    default=DEFAULT_LIVE_THROTTLE
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=300)),
+                vol.Optional(
+                    CONF_CONSUMPTION,
+                    default=False
+                ): bool,
             }
         )
 
@@ -114,38 +212,34 @@ class TibberExtendedConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             }
         )
 
-    async def _validate_token(self, token: str) -> bool:
-        """Validate the Tibber API token."""
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-        }
-        
-        query = """
-        {
-            viewer {
-                homes {
-                    id
-                }
-            }
-        }
-        """
-        
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    TIBBER_API_URL,
-                    json={"query": query},
-                    headers=headers,
-                    timeout=aiohttp.ClientTimeout(total=10),
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return "errors" not in data
-        except Exception as err:
-            _LOGGER.error("Error validating token: %s", err)
-        
-        return False
+    async def async_step_homes(self, user_input=None) -> FlowResult:
+        """Let the user pick which of the account's homes to track."""
+        errors = {}
+        homes = self._data[CONF_ACCOUNT_HOMES]
+
+        if user_input is not None:
+            if user_input.get(CONF_HOMES):
+                self._data[CONF_HOMES] = [
+                    home_id for home_id in homes if home_id in user_input[CONF_HOMES]
+                ]
+                return self._async_create_entry()
+            errors["base"] = "no_homes"
+
+        return self.async_show_form(
+            step_id="homes",
+            data_schema=vol.Schema(
+                {vol.Required(CONF_HOMES, default=list(homes)): cv.multi_select(homes)}
+            ),
+            errors=errors,
+        )
+
+    @callback
+    def _async_create_entry(self) -> FlowResult:
+        """Create the entry from the collected settings."""
+        return self.async_create_entry(
+            title=self._data.get(CONF_HOME_NAME, "Tibber Extended"),
+            data=self._data,
+        )
 
     @staticmethod
     @callback
@@ -182,13 +276,39 @@ class TibberExtendedOptionsFlow(config_entries.OptionsFlow):
                     errors["base"] = "invalid_time_format"
                     break
             
-            if valid_times:
-                # Validera token
-                valid = await self._validate_token(token)
+            # Validera periodlängder för billigaste/dyraste perioder
+            period_hours = parse_period_hours(str(user_input.get(CONF_PERIOD_HOURS, "")))
+            if valid_times and period_hours is None:
+                errors["base"] = "invalid_period_hours"
+            
+            # Minst ett hem måste väljas, som i konfigurationen
+            if not errors and CONF_HOMES in user_input and not user_input[CONF_HOMES]:
+                errors["base"] = "no_homes"
+            
+            if not errors:
+                # Validera token, men bara om den har ändrats
+                homes = self._config_entry.data.get(CONF_ACCOUNT_HOMES)
+                if token == self._config_entry.data.get(CONF_ACCESS_TOKEN):
+                    valid = True
+                else:
+                    try:
+                        homes = await async_get_client(self.hass, token, keep=False).async_get_homes()
+                        valid = homes is not None
+                    except TibberUnavailableError as err:
+                        _LOGGER.warning("Could not validate token: %s", err)
+                        valid = None
                 
                 if valid:
                     user_input[CONF_UPDATE_TIMES] = times_list if times_list else DEFAULT_UPDATE_TIMES
+                    user_input[CONF_PERIOD_HOURS] = period_hours
                     user_input[CONF_ACCESS_TOKEN] = token
+                    if homes is not None:
+                        # Valda hem som inte finns på (ett nytt) konto släpps, inga kvar = alla
+                        selected = user_input.get(CONF_HOMES, self._config_entry.data.get(CONF_HOMES))
+                        user_input[CONF_ACCOUNT_HOMES] = homes
+                        user_input[CONF_HOMES] = [
+                            home_id for home_id in homes if home_id in (selected or ())
+                        ]
                     
                     # Uppdatera config entry data
                     self.hass.config_entries.async_update_entry(
@@ -197,6 +317,8 @@ class TibberExtendedOptionsFlow(config_entries.OptionsFlow):
                     )
                     
                     return self.async_create_entry(title="", data={})
+                elif valid is None:
+                    errors["base"] = "rate_limited"
                 else:
                     errors["base"] = "invalid_token"
 
@@ -206,6 +328,20 @@ class TibberExtendedOptionsFlow(config_entries.OptionsFlow):
             current_times_str = ", ".join(current_times)
         else:
             current_times_str = current_times
+        
+        current_period_hours = self._config_entry.data.get(CONF_PERIOD_HOURS, DEFAULT_PERIOD_HOURS)
+        current_period_hours_str = ", ".join(str(h) for h in current_period_hours)
+        
+        # Hemvalet visas bara om kontot har flera hem (sparade från konfigurationen)
+        account_homes = self._config_entry.data.get(CONF_ACCOUNT_HOMES) or {}
+        homes_schema = {}
+        if len(account_homes) > 1:
+            homes_schema[
+                vol.Optional(
+                    CONF_HOMES,
+                    default=self._config_entry.data.get(CONF_HOMES) or list(account_homes),
+                )
+            ] = cv.multi_select(account_homes)
 
         data_schema = vol.Schema(
             {
@@ -229,6 +365,47 @@ class TibberExtendedOptionsFlow(config_entries.OptionsFlow):
                     CONF_UPDATE_TIMES,
                     default=current_times_str,
                 ): str,
+                vol.Optional(
+                    CONF_UPDATE_MODE,
+                    default=self._config_entry.data.get(CONF_UPDATE_MODE, DEFAULT_UPDATE_MODE),
+                ): vol.In(UPDATE_MODE_OPTIONS),
+                vol.Optional(
+                    CONF_ATTRIBUTE_MODE,
+                    default=self._config_entry.data.get(CONF_ATTRIBUTE_MODE, DEFAULT_ATTRIBUTE_MODE),
+                ): vol.In(ATTRIBUTE_MODE_OPTIONS),
+                vol.Optional(
+                    CONF_PERIOD_HOURS,
+                    default=current_period_hours_str,
+                ): str,
+                vol.Optional(
+                    CONF_CHEAPEST_SLOTS,
+                    default=self._config_entry.data.get(CONF_CHEAPEST_SLOTS, DEFAULT_CHEAPEST_SLOTS),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=96)),
+                vol.Optional(
+                    CONF_HISTORY_DAYS,
+                    default=self._config_entry.data.get(CONF_HISTORY_DAYS, DEFAULT_HISTORY_DAYS),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=365)),
+                vol.Optional(
+                    CONF_CHEAPEST_COUNT,
+                    default=self._config_entry.data.get(CONF_CHEAPEST_COUNT, DEFAULT_CHEAPEST_COUNT),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=96)),
+                vol.Optional(
+                    CONF_PRICE_THRESHOLD,
+                    default=self._config_entry.data.get(CONF_PRICE_THRESHOLD, DEFAULT_PRICE_THRESHOLD),
+                ): vol.Coerce(float),
+                vol.Optional(
+                    CONF_LIVE_MEASUREMENT,
+                    default=self._config_entry.data.get(CONF_LIVE_MEASUREMENT, False),
+                ): bool,
+                vol.Optional(
+                    CONF_LIVE_THROTTLE,
+                    default=self._config_entry.data.get(CONF_LIVE_THROTTLE, DEFAULT_LIVE_THROTTLE),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=300)),
+                vol.Optional(
+                    CONF_CONSUMPTION,
+                    default=self._config_entry.data.get(CONF_CONSUMPTION, False),
+                ): bool,
+                **homes_schema,
             }
         )
 
@@ -241,37 +418,3 @@ class TibberExtendedOptionsFlow(config_entries.OptionsFlow):
                 "token_info": "Lämna tomt för att behålla nuvarande token",
             }
         )
-
-    async def _validate_token(self, token: str) -> bool:
-        """Validate the Tibber API token."""
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-        }
-        
-        query = """
-        {
-            viewer {
-                homes {
-                    id
-                }
-            }
-        }
-        """
-        
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    TIBBER_API_URL,
-                    json={"query": query},
-                    headers=headers,
-                    timeout=aiohttp.ClientTimeout(total=10),
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return "errors" not in data
-        except Exception as err:
-            _LOGGER.error("Error validating token: %s", err)
-        
-        return False
-    
\ No newline at end of file
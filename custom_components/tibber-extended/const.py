@@ -2,11 +2,32 @@
 
 DOMAIN = "tibber_extended"
 
+# Nyckel i hass.data[DOMAIN] för delade pris-hämtare
+DATA_FETCHERS = "fetchers"
+# Nyckel i hass.data[DOMAIN] för delade API-klienter per token
+DATA_CLIENTS = "clients"
+
+# Dispatcher-signal när inställningar ändrats utan omladdning (formateras med entry_id)
+SIGNAL_OPTIONS_UPDATED = "tibber_extended_options_updated_{}"
+
 CONF_ACCESS_TOKEN = "access_token"
 CONF_RESOLUTION = "resolution"
 CONF_UPDATE_TIMES = "update_times"
 CONF_HOME_NAME = "home_name"
 CONF_CURRENCY = "currency"
+CONF_ATTRIBUTE_MODE = "attribute_mode"
+CONF_UPDATE_MODE = "update_mode"
+CONF_LIVE_MEASUREMENT = "live_measurement"
+CONF_LIVE_THROTTLE = "live_throttle"
+CONF_PERIOD_HOURS = "period_hours"
+CONF_CHEAPEST_SLOTS = "cheapest_slots"
+CONF_HISTORY_DAYS = "history_days"
+CONF_CHEAPEST_COUNT = "cheapest_count"
+CONF_PRICE_THRESHOLD = "price_threshold"
+# Valda hem-id:n (tom = alla) och kontots hem {id: smeknamn} från konfigurationen
+CONF_HOMES = "homes"
+CONF_ACCOUNT_HOMES = "account_homes"
+CONF_CONSUMPTION = "consumption"
 
 # Tibber Demo Token - fungerar för testning men kan sluta fungera när som helst
 DEFAULT_DEMO_TOKEN = "3A77EECF61BD445F47241A5A36202185C35AF3AF58609E19B53F3A8872AD7BE1-1"
@@ -14,14 +35,69 @@ DEFAULT_DEMO_TOKEN = "3A77EECF61BD445F47241A5A36202185C35AF3AF58609E19B53F3A8872
 # Default uppdateringstider (kl 13:00 och 15:00)
 DEFAULT_UPDATE_TIMES = ["13:00", "15:00"]
 
+# Skriv realtidsdata (Tibber Pulse) högst var 10:e sekund
+DEFAULT_LIVE_THROTTLE = 10
+
+# Billigaste/dyraste sammanhängande perioder (timmar) och antal billigaste intervall
+DEFAULT_PERIOD_HOURS = [3]
+DEFAULT_CHEAPEST_SLOTS = 0
+
+# Binärsensorer: de N billigaste intervallen per dygn och pris under tröskel (0 = av)
+DEFAULT_CHEAPEST_COUNT = 0
+DEFAULT_PRICE_THRESHOLD = 0.0
+
+# Antal dagar med historiska priser som sparas lokalt (0 = av)
+DEFAULT_HISTORY_DAYS = 7
+
 # Default valuta
 DEFAULT_CURRENCY = "SEK"
 
+# Fasta uppdateringstider eller adaptiv pollning tills morgondagens priser finns
+UPDATE_MODE_FIXED = "fixed"
+UPDATE_MODE_ADAPTIVE = "adaptive"
+DEFAULT_UPDATE_MODE = UPDATE_MODE_FIXED
+
+UPDATE_MODE_OPTIONS = {
+    UPDATE_MODE_FIXED: "Fixed update times",
+    UPDATE_MODE_ADAPTIVE: "Adaptive (poll until tomorrow's prices are published)",
+}
+
+# Hur prislistorna exponeras som attribut
+ATTRIBUTE_MODE_FULL = "full"
+ATTRIBUTE_MODE_COMPACT = "compact"
+ATTRIBUTE_MODE_MINIMAL = "minimal"
+DEFAULT_ATTRIBUTE_MODE = ATTRIBUTE_MODE_FULL
+
+ATTRIBUTE_MODE_OPTIONS = {
+    ATTRIBUTE_MODE_FULL: "Full (price lists in attributes, recorded)",
+    ATTRIBUTE_MODE_COMPACT: "Compact (columnar price arrays, not recorded)",
+    ATTRIBUTE_MODE_MINIMAL: "Minimal (statistics only)",
+}
+
+# Numeriska koder för prisnivåer i kompakt attributformat
+PRICE_LEVEL_CODES = {
+    "UNKNOWN": 0,
+    "VERY_CHEAP": 1,
+    "CHEAP": 2,
+    "NORMAL": 3,
+    "EXPENSIVE": 4,
+    "VERY_EXPENSIVE": 5,
+}
+
 RESOLUTION_OPTIONS = {
     "HOURLY": "Hourly",
     "QUARTER_HOURLY": "Quarter Hourly (15 min)",
 }
 
+# Längd per intervall i sekunder
+RESOLUTION_SECONDS = {
+    "HOURLY": 3600,
+    "QUARTER_HOURLY": 900,
+}
+
+# Priser hämtas alltid per kvart - timpriser räknas fram lokalt
+FETCH_RESOLUTION = "QUARTER_HOURLY"
+
 CURRENCY_OPTIONS = {
     "SEK": "SEK (Swedish Krona)",
     "NOK": "NOK (Norwegian Krone)",
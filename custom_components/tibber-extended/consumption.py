@@ -0,0 +1,320 @@
+"""Incremental consumption and cost ingestion for Tibber Extended."""
+import asyncio
+import logging
+from array import array
+from datetime import timedelta
+
+import aiohttp
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.update_coordinator import (
+    DataUpdateCoordinator,
+    UpdateFailed,
+)
+from homeassistant.util import dt as dt_util
+
+from .api import TibberApiError, TibberGraphQLError, TibberUnavailableError, async_get_client
+from .const import DOMAIN
+from .coordinator import CACHE_SAVE_DELAY, STORAGE_VERSION
+
+_LOGGER = logging.getLogger(__name__)
+
+# Timvärden sparas för innevarande och föregående månad
+CONSUMPTION_DAYS = 62
+# Största antalet timmar per dygn (dag med sommartidsomställning)
+MAX_HOURS_PER_DAY = 25
+# Antal timmar som hämtas första gången, innan det finns någon cursor
+CONSUMPTION_BACKFILL = 7 * 24
+# Noder per sida, och högsta antal sidor per uppdatering - resten tas nästa gång
+PAGE_SIZE = 100
+MAX_PAGES = 24
+
+CONSUMPTION_INTERVAL = timedelta(hours=1)
+
+CONSUMPTION_FIELDS = """
+pageInfo {
+    hasNextPage
+}
+edges {
+    cursor
+    node {
+        from
+        consumption
+        cost
+        unitPrice
+    }
+}
+"""
+
+# Första hämtningen: de senaste timmarna
+BACKFILL_QUERY = """
+query Consumption($homeId: ID!, $last: Int!) {
+    viewer {
+        home(id: $homeId) {
+            consumption(resolution: HOURLY, last: $last) {%s}
+        }
+    }
+}
+""" % CONSUMPTION_FIELDS
+
+# Därefter bara noder efter den sparade cursorn, en sida i taget
+PAGE_QUERY = """
+query Consumption($homeId: ID!, $first: Int!, $after: String!) {
+    viewer {
+        home(id: $homeId) {
+            consumption(resolution: HOURLY, first: $first, after: $after) {%s}
+        }
+    }
+}
+""" % CONSUMPTION_FIELDS
+
+
+class ConsumptionHistory:
+    """Rolling, array-backed store of hourly consumption and cost for one home.
+
+    Like ``PriceHistory`` the hours are kept in a fixed-size ring of typed
+    arrays, so the store is bounded by ``CONSUMPTION_DAYS``. ``cursor`` is
+    Tibber's cursor of the newest complete hour; the next update asks for
+    nodes after it only.
+
+    Next to each hour the running consumption and cost up to and including
+    it are kept, so ``totals`` of any period is a bisect on the sorted
+    starts and one subtraction instead of a scan of the ring.
+    """
+
+    __slots__ = (
+        "capacity", "cursor", "_starts", "_consumption", "_cost",
+        "_running_consumption", "_running_cost", "_head", "_size",
+    )
+
+    def __init__(self, days: int = CONSUMPTION_DAYS) -> None:
+        """Initialize an empty history holding ``days`` days of hours."""
+        self.capacity = days * MAX_HOURS_PER_DAY
+        self.cursor = None
+        self._starts = array("d", bytes(8 * self.capacity))
+        self._consumption = array("d", bytes(8 * self.capacity))
+        self._cost = array("d", bytes(8 * self.capacity))
+        self._running_consumption = array("d", bytes(8 * self.capacity))
+        self._running_cost = array("d", bytes(8 * self.capacity))
+        self._head = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        """Return the number of stored hours."""
+        return self._size
+
+    @property
+    def last_start(self) -> float | None:
+        """Return the start timestamp of the newest hour."""
+        if not self._size:
+            return None
+        return self._starts[(self._head + self._size - 1) % self.capacity]
+
+    def append(self, start: float, consumption: float, cost: float) -> bool:
+        """Add one hour newer than the stored ones, overwriting the oldest when full.
+
+        Returns False for hours already stored, which overlapping pages
+        may repeat.
+        """
+        last_start = self.last_start
+        if last_start is not None and start <= last_start:
+            return False
+
+        if self._size < self.capacity:
+            index = (self._head + self._size) % self.capacity
+            self._size += 1
+        else:
+            index = self._head
+            self._head = (self._head + 1) % self.capacity
+
+        # Löpande summor räknas från föregående timme, som fortfarande finns kvar i ringen
+        previous = (index - 1) % self.capacity
+        first = self._size == 1
+        self._starts[index] = start
+        self._consumption[index] = consumption
+        self._cost[index] = cost
+        self._running_consumption[index] = consumption + (0.0 if first else self._running_consumption[previous])
+        self._running_cost[index] = cost + (0.0 if first else self._running_cost[previous])
+        return True
+
+    def _bisect(self, timestamp: float) -> int:
+        """Return the offset from the oldest hour of the first hour starting at or after ``timestamp``."""
+        low, high = 0, self._size
+        while low < high:
+            middle = (low + high) // 2
+            if self._starts[(self._head + middle) % self.capacity] < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def totals(self, start: float, end: float) -> tuple[float, float, int]:
+        """Return (consumption, cost, hours) of the hours starting in [start, end)."""
+        first, stop = self._bisect(start), self._bisect(end)
+        if first >= stop:
+            return 0.0, 0.0, 0
+        oldest = (self._head + first) % self.capacity
+        newest = (self._head + stop - 1) % self.capacity
+        # Skillnaden mellan löpande summor, med den första timmen inräknad
+        consumption = (
+            self._running_consumption[newest] - self._running_consumption[oldest] + self._consumption[oldest]
+        )
+        cost = self._running_cost[newest] - self._running_cost[oldest] + self._cost[oldest]
+        return consumption, cost, stop - first
+
+    def as_dict(self) -> dict:
+        """Return the cursor and the hours as columns for storage."""
+        indices = [(self._head + offset) % self.capacity for offset in range(self._size)]
+        return {
+            "cursor": self.cursor,
+            "start": [self._starts[i] for i in indices],
+            "consumption": [self._consumption[i] for i in indices],
+            "cost": [self._cost[i] for i in indices],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ConsumptionHistory":
+        """Restore a history from stored columns, keeping the newest hours."""
+        history = cls()
+        history.cursor = data.get("cursor")
+        for start, consumption, cost in zip(data["start"], data["consumption"], data["cost"]):
+            history.append(start, consumption, cost)
+        return history
+
+
+class TibberConsumptionCoordinator(DataUpdateCoordinator):
+    """Fetch new hourly consumption per home, starting at the stored cursor.
+
+    The first update fetches the last week. After that only nodes after
+    each home's cursor are requested, a page at a time: every page is
+    written into the home's ring and dropped before the next is fetched,
+    so a long gap is caught up without holding months of nodes in memory.
+    The cursor only moves past complete hours, since Tibber returns the
+    newest hours with null consumption until they are metered.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, prices) -> None:
+        """Initialize."""
+        self.prices = prices
+        # Samma klient som prishämtningen, så att anropsgränsen gäller båda
+        self.client = async_get_client(hass, prices.token, prices.metrics)
+        self.homes = {}
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.consumption")
+
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN}_consumption",
+            update_interval=CONSUMPTION_INTERVAL,
+        )
+
+    async def async_restore(self) -> None:
+        """Restore the stored hours and cursors."""
+        stored = await self._store.async_load()
+        for home_id, data in (stored or {}).get("homes", {}).items():
+            self.homes[home_id] = ConsumptionHistory.from_dict(data)
+        if self.homes:
+            _LOGGER.debug("Restored consumption for %s home(s)", len(self.homes))
+            self.async_set_updated_data(self.homes)
+
+    def _data_to_save(self) -> dict:
+        """Return the stored hours and cursors of all homes."""
+        return {"homes": {home_id: history.as_dict() for home_id, history in self.homes.items()}}
+
+    def _unit_price(self, home_id, start: float) -> float | None:
+        """Return the mean price of the hour from the held price timeline."""
+        home_data = (self.prices.data or {}).get(home_id)
+        if not home_data:
+            return None
+        stats = home_data["prices"].between(start, start + 3600).stats("total")
+        return stats[2] if stats else None
+
+    def _ingest_page(self, home_id, history, connection) -> tuple[int, bool]:
+        """Write one page into the history and return (added, complete).
+
+        ``complete`` is False when the page ends with hours that are not
+        metered yet; the cursor stays before them so they are fetched
+        again on the next update. Missing hours followed by metered ones
+        are gaps and are skipped.
+        """
+        edges = connection.get("edges") or []
+        metered = [
+            index for index, edge in enumerate(edges)
+            if (edge.get("node") or {}).get("consumption") is not None
+        ]
+        if not metered:
+            return 0, not edges
+
+        added = 0
+        for edge in edges[:metered[-1] + 1]:
+            node = edge.get("node") or {}
+            consumption = node.get("consumption")
+            if consumption is None:
+                continue
+
+            start = dt_util.parse_datetime(node["from"]).timestamp()
+            cost = node.get("cost")
+            if cost is None:
+                # Kostnad saknas - räkna från timpriset, i andra hand från hållna priser
+                unit_price = node.get("unitPrice")
+                if unit_price is None:
+                    unit_price = self._unit_price(home_id, start)
+                cost = consumption * unit_price if unit_price is not None else 0.0
+
+            if history.append(start, float(consumption), float(cost)):
+                added += 1
+            history.cursor = edge["cursor"]
+        return added, metered[-1] == len(edges) - 1
+
+    async def _async_fetch_home(self, home_id, history) -> int:
+        """Fetch the pages after the home's cursor and return the number of new hours."""
+        added = 0
+        for _ in range(MAX_PAGES):
+            if history.cursor is None:
+                query = BACKFILL_QUERY
+                variables = {"homeId": home_id, "last": CONSUMPTION_BACKFILL}
+            else:
+                query = PAGE_QUERY
+                variables = {"homeId": home_id, "first": PAGE_SIZE, "after": history.cursor}
+
+            data = await self.client.async_query(query, variables)
+            connection = ((data.get("viewer") or {}).get("home") or {}).get("consumption") or {}
+            page_added, complete = self._ingest_page(home_id, history, connection)
+            added += page_added
+
+            # Bakåthämtningen är en enda sida, och ofullständiga timmar väntar till nästa gång
+            if query is BACKFILL_QUERY or not complete:
+                break
+            if not (connection.get("pageInfo") or {}).get("hasNextPage"):
+                break
+        else:
+            _LOGGER.debug("More consumption pending for home %s, continuing next update", home_id)
+
+        return added
+
+    async def _async_update_data(self):
+        """Fetch new consumption for every home of the price coordinator."""
+        for home_id in self.prices.data or {}:
+            history = self.homes.setdefault(home_id, ConsumptionHistory())
+            try:
+                added = await self._async_fetch_home(home_id, history)
+            except TibberUnavailableError as err:
+                # Anropsgräns eller öppen kretsbrytare - behåll det som finns
+                _LOGGER.warning("%s, keeping stored consumption", err)
+                break
+            except TibberGraphQLError as err:
+                if history.cursor is None:
+                    raise UpdateFailed(f"GraphQL error: {err}")
+                # Cursorn kan ha blivit ogiltig - börja om med bakåthämtningen
+                _LOGGER.warning("Consumption query failed for home %s, resetting cursor: %s", home_id, err)
+                history.cursor = None
+                continue
+            except (TibberApiError, aiohttp.ClientError, asyncio.TimeoutError) as err:
+                raise UpdateFailed(f"Error fetching consumption: {err}")
+
+            _LOGGER.debug("Home %s: %s new consumption hour(s)", home_id, added)
+
+        self._store.async_delay_save(self._data_to_save, CACHE_SAVE_DELAY)
+        return self.homes
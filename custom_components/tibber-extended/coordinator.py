@@ -0,0 +1,725 @@
+"""Data update coordinator for Tibber Extended."""
+import logging
+from array import array
+from bisect import bisect_right
+from datetime import datetime, timedelta, time, timezone
+from typing import Callable
+import aiohttp
+import asyncio
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import (
+    async_track_point_in_utc_time,
+    async_track_time_change,
+)
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.update_coordinator import (
+    DataUpdateCoordinator,
+    UpdateFailed,
+)
+from homeassistant.util import dt as dt_util
+
+from .api import TibberApiError, TibberGraphQLError, TibberUnavailableError
+from .const import (
+    DOMAIN,
+    CONF_ACCESS_TOKEN,
+    CONF_RESOLUTION,
+    CONF_UPDATE_TIMES,
+    CONF_UPDATE_MODE,
+    CONF_PERIOD_HOURS,
+    CONF_CHEAPEST_SLOTS,
+    CONF_CURRENCY,
+    CONF_HISTORY_DAYS,
+    CONF_CHEAPEST_COUNT,
+    CONF_PRICE_THRESHOLD,
+    CONF_HOMES,
+    CONF_HOME_NAME,
+    DEFAULT_UPDATE_TIMES,
+    DEFAULT_UPDATE_MODE,
+    DEFAULT_PERIOD_HOURS,
+    DEFAULT_CHEAPEST_SLOTS,
+    DEFAULT_CURRENCY,
+    DEFAULT_HISTORY_DAYS,
+    DEFAULT_CHEAPEST_COUNT,
+    DEFAULT_PRICE_THRESHOLD,
+    FETCH_RESOLUTION,
+    RESOLUTION_SECONDS,
+    UPDATE_MODE_ADAPTIVE,
+)
+from .fetcher import async_get_fetcher, expire_before
+from .history import PriceHistory, async_import_statistics
+from .models import PriceSeries, local_day_bounds, parse_prices
+from .periods import compute_periods
+from .ranking import (
+    RULE_BELOW_THRESHOLD,
+    RULE_CHEAPEST,
+    cheapest_windows,
+    rank_day,
+    threshold_windows,
+)
+from .scheduler import AdaptiveFetchScheduler
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+# Samla ihop skrivningar till disk
+CACHE_SAVE_DELAY = 10  # sekunder
+
+
+class TibberDataCoordinator(DataUpdateCoordinator):
+    """Class to manage fetching Tibber data."""
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+        """Initialize."""
+        self.token = entry.data[CONF_ACCESS_TOKEN]
+        self.resolution = entry.data.get(CONF_RESOLUTION, "QUARTER_HOURLY")
+        # Valda hem, None = alla hem på kontot
+        self.home_ids = entry.data.get(CONF_HOMES) or None
+        # Delad hämtare per token för alla config entries och upplösningar
+        self.fetcher = async_get_fetcher(hass, self.token)
+        self.metrics = self.fetcher.metrics
+        self.entry = entry
+        self._load_options(entry.data)
+        # Avregistrering av schemalagda hämtningar, så att de kan bytas ut
+        self._unsub_triggers = []
+        # Vyer över tidslinjen per hem och upplösning: {resolution: (today, tomorrow)}
+        self.views = {}
+        # Lokalt datum som vyerna gäller för - byts av timern vid midnatt
+        self._views_date = None
+        # Sorterat index över dagens prisintervall per hem och upplösning:
+        # {resolution: (starts, ends, points)}
+        self.slot_index = {}
+        # Index i konfigurerad upplösning (samma tupler som i slot_index)
+        self.price_index = {}
+        # Räknas upp varje gång prisdata ändras så att sensorer kan cacha
+        self.data_version = 0
+        # data_version då respektive hems data senast ändrades
+        self.home_versions = {}
+        # Hem vars data ändrades i senaste uppdateringen (None = alla)
+        self._changed_homes = None
+        self._notified_success = None
+        # Senaste hämtningen misslyckades tillfälligt men priserna behölls, och
+        # hur länge Tibber bad oss vänta (0 om okänt) - läses av schemaläggaren
+        self.kept_prices = False
+        self.retry_after = 0.0
+        # En gemensam timer vid nästa intervallgräns, som sedan väcker sensorerna
+        self._tick_listeners = {}
+        self._unsub_tick = None
+        self._tick_homes = None
+        # Billigaste/dyraste perioder per hem, beräknas en gång per datauppdatering
+        self.periods = {}
+        # Rangordning per dygn och på/av-fönster för binärsensorernas regler
+        self.rankings = {}
+        self.rule_windows = {}
+        # Realtidsströmmar per hem (startas av __init__ om aktiverat)
+        self.live_streams = {}
+        # Förbrukning och kostnad per timme (startas av __init__ om aktiverat)
+        self.consumption = None
+        # Senaste lyckade prisdata sparas på disk för snabb omstart
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}")
+        # Historiska priser per hem, fylls på med gårdagens priser vid midnatt
+        self.history = {}
+        self._history_store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.history")
+
+        # Beräkna uppdateringsintervall för sensorn baserat på resolution
+        if self.resolution == "QUARTER_HOURLY":
+            self.sensor_update_interval = timedelta(minutes=15)
+        else:  # HOURLY
+            self.sensor_update_interval = timedelta(hours=1)
+
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=DOMAIN,
+            update_interval=None,
+        )
+        
+        entry.async_on_unload(
+            self.fetcher.async_subscribe(self._handle_shared_data, self.home_ids)
+        )
+        entry.async_on_unload(self._cancel_tick)
+        entry.async_on_unload(self._cancel_time_triggers)
+        self._setup_time_triggers()
+        self._schedule_tick()
+
+    def _load_options(self, data) -> None:
+        """Read the settings that can be changed without reloading the entry."""
+        self.options = dict(data)
+        self.update_times = data.get(CONF_UPDATE_TIMES, DEFAULT_UPDATE_TIMES)
+        self.update_mode = data.get(CONF_UPDATE_MODE, DEFAULT_UPDATE_MODE)
+        self.period_hours = data.get(CONF_PERIOD_HOURS, DEFAULT_PERIOD_HOURS)
+        self.cheapest_slots = data.get(CONF_CHEAPEST_SLOTS, DEFAULT_CHEAPEST_SLOTS)
+        self.cheapest_count = data.get(CONF_CHEAPEST_COUNT, DEFAULT_CHEAPEST_COUNT)
+        self.price_threshold = data.get(CONF_PRICE_THRESHOLD, DEFAULT_PRICE_THRESHOLD)
+        self.history_days = data.get(CONF_HISTORY_DAYS, DEFAULT_HISTORY_DAYS)
+        self.currency = data.get(CONF_CURRENCY, DEFAULT_CURRENCY)
+        
+        # Konvertera update_times till time-objekt
+        self.update_times_parsed = []
+        for time_str in self.update_times:
+            try:
+                hour, minute = map(int, time_str.split(":"))
+                self.update_times_parsed.append(time(hour=hour, minute=minute))
+            except ValueError:
+                _LOGGER.error("Invalid time format: %s", time_str)
+
+    @callback
+    def async_apply_options(self, data) -> None:
+        """Apply changed settings in place, without a reload or an API call.
+
+        Fetch triggers are rescheduled and periods, rankings and rule
+        windows are recomputed from the data already held.
+        """
+        history_days = self.history_days
+        self._load_options(data)
+        self._cancel_time_triggers()
+        self._setup_time_triggers()
+        
+        if self.history_days != history_days:
+            self.history = {
+                home_id: PriceHistory.from_dict(self.history_days, history.as_dict())
+                for home_id, history in self.history.items()
+            }
+            self._async_save_history()
+        
+        if self.data:
+            self._build_price_index(self.data, force=True)
+            self.async_update_listeners()
+        _LOGGER.info("Applied changed options without reloading")
+
+    def home_name(self, home_id) -> str:
+        """Return the name prefix for a home's entities.
+
+        With several homes tracked, the home's nickname is added so their
+        entities can be told apart.
+        """
+        name = self.options.get(CONF_HOME_NAME, "Mitt Hem")
+        home_data = (self.data or {}).get(home_id)
+        if home_data and len(self.home_ids or self.data) > 1:
+            return f"{name} {home_data['name']}"
+        return name
+
+    def _select_homes(self, homes_data):
+        """Return the tracked homes of data fetched for all subscribers."""
+        if self.home_ids is None:
+            return homes_data
+        return {
+            home_id: home_data
+            for home_id, home_data in homes_data.items()
+            if home_id in self.home_ids
+        }
+
+    @callback
+    def _cancel_time_triggers(self) -> None:
+        """Cancel the scheduled fetches."""
+        while self._unsub_triggers:
+            self._unsub_triggers.pop()()
+
+    def _setup_time_triggers(self):
+        """Setup time-based update triggers."""
+        if self.update_mode == UPDATE_MODE_ADAPTIVE and self.update_times_parsed:
+            # Första uppdateringstiden används som förväntad publiceringstid
+            scheduler = AdaptiveFetchScheduler(self, self.update_times_parsed[0])
+            self._unsub_triggers.append(scheduler.async_start())
+        else:
+            # Ordinarie uppdateringstider
+            for update_time in self.update_times_parsed:
+                self._unsub_triggers.append(
+                    async_track_time_change(
+                        self.hass,
+                        self._handle_time_trigger,
+                        hour=update_time.hour,
+                        minute=update_time.minute,
+                        second=0,
+                    )
+                )
+                _LOGGER.info("Scheduled data fetch at %s", update_time.strftime("%H:%M"))
+
+    async def _handle_time_trigger(self, now):
+        """Handle time-based update trigger."""
+        _LOGGER.info("Time trigger fired at %s, fetching Tibber data", now)
+        await self.async_request_refresh()
+
+    def _build_price_index(self, homes_data, force=False):
+        """Build a sorted index of today's slot start and end times per home.
+
+        The index is rebuilt only when new data arrives or the local date
+        changes, so the sensors can look up the current slot with a binary
+        search. Price points are typed records sorted by start already, so
+        no strings are parsed. Hourly prices are derived from the fetched
+        quarter hours here and indexed next to them. ``force`` rebuilds
+        every home, for settings that change the derived data.
+        """
+        interval = self.sensor_update_interval.total_seconds()
+        today = dt_util.now().date()
+        bounds = (*local_day_bounds(today), local_day_bounds(today + timedelta(days=1))[1])
+        new_day = today != self._views_date
+        changed = None if new_day or force else self._diff_homes(homes_data)
+        if new_day:
+            # Nytt datum - alla hems vyer pekar på fel dygn, och gårdagen är klar
+            for home_id, home_data in homes_data.items():
+                prices = home_data.get("prices", PriceSeries())
+                self._record_history(home_id, home_data, prices.between(0, bounds[0]))
+            self._async_save_history()
+        self._views_date = today
+        self._changed_homes = changed
+        self.data_version += 1
+        views = {}
+        slot_index = {}
+        periods = {}
+        rankings = {}
+        rule_windows = {}
+
+        for home_id, home_data in homes_data.items():
+            if changed is not None and home_id not in changed and home_id in self.slot_index:
+                # Oförändrat hem - återanvänd index och perioder
+                views[home_id] = self.views[home_id]
+                slot_index[home_id] = self.slot_index[home_id]
+                periods[home_id] = self.periods.get(home_id)
+                rankings[home_id] = self.rankings.get(home_id)
+                rule_windows[home_id] = self.rule_windows.get(home_id)
+                continue
+            
+            self.home_versions[home_id] = self.data_version
+            views[home_id] = self._derive_views(home_data, bounds)
+            slot_index[home_id] = {}
+            for resolution, (points, _) in views[home_id].items():
+                length = RESOLUTION_SECONDS[resolution]
+                slot_index[home_id][resolution] = (
+                    points.start,
+                    array("d", (start + length for start in points.start)),
+                    points,
+                )
+            days = views[home_id][self.resolution]
+            periods[home_id] = compute_periods(
+                days[0] + days[1],
+                self.period_hours,
+                self.cheapest_slots,
+                self.sensor_update_interval,
+            )
+            rankings[home_id], rule_windows[home_id] = self._rank_home(days, interval)
+
+        # Borttagna hem har ingen version, så deras entiteter skrivs som otillgängliga
+        for home_id in self.home_versions.keys() - homes_data.keys():
+            del self.home_versions[home_id]
+        self.views = views
+        self.slot_index = slot_index
+        self.price_index = {
+            home_id: index[self.resolution] for home_id, index in slot_index.items()
+        }
+        self.periods = periods
+        self.rankings = rankings
+        self.rule_windows = rule_windows
+        self._schedule_tick()
+
+    @staticmethod
+    def _derive_views(home_data, bounds):
+        """Return today's and tomorrow's prices in every resolution.
+
+        ``bounds`` holds the local midnights starting today, tomorrow and
+        the day after. The fetched quarter hours are views over the home's
+        timeline and the coarser resolutions are averaged from them.
+        """
+        timeline = home_data.get("prices", PriceSeries())
+        days = (
+            timeline.between(bounds[0], bounds[1]),
+            timeline.between(bounds[1], bounds[2]),
+        )
+        return {
+            resolution: (
+                days
+                if resolution == FETCH_RESOLUTION
+                else tuple(prices.aggregate(length) for prices in days)
+            )
+            for resolution, length in RESOLUTION_SECONDS.items()
+        }
+
+    def _rank_home(self, days, interval):
+        """Rank each day once and precompute the on-windows of the binary sensor rules."""
+        rankings = {
+            day: rank_day(prices) for day, prices in zip(("today", "tomorrow"), days)
+        }
+        
+        windows = {}
+        if self.cheapest_count:
+            windows[RULE_CHEAPEST] = cheapest_windows(days, self.cheapest_count, interval)
+        if self.price_threshold:
+            windows[RULE_BELOW_THRESHOLD] = threshold_windows(
+                days[0] + days[1], self.price_threshold, interval
+            )
+        
+        return rankings, windows
+
+    @callback
+    def _roll_over(self) -> bool:
+        """Move the views to the current local date if it has changed.
+
+        Called by the boundary tick, which is always armed for the next
+        local midnight at the latest, so lookups never change any state.
+        Slots older than yesterday are dropped here and finished days go
+        into the history.
+        """
+        if self._views_date == dt_util.now().date() or not self.data:
+            return False
+        
+        _LOGGER.debug("Local date changed, rolling views over to %s", dt_util.now().date())
+        homes_data = self._expire_slots(self.data)
+        self._build_price_index(homes_data)
+        self.data = homes_data
+        self._async_save_cache(homes_data)
+        return True
+
+    def _expire_slots(self, homes_data):
+        """Record finished days in the history and drop slots older than yesterday."""
+        today = dt_util.now().date()
+        today_start = local_day_bounds(today)[0]
+        expired = expire_before(today)
+        result = {}
+        for home_id, home_data in homes_data.items():
+            prices = home_data.get("prices", PriceSeries())
+            self._record_history(home_id, home_data, prices.between(0, today_start))
+            # Nya dicts eftersom hemdatan delas med andra config entries via fetchern
+            result[home_id] = {**home_data, "prices": prices.since(expired)}
+        return result
+
+    def current_position(self, home_id, resolution=None):
+        """Return the index of the current slot in today's prices, if any."""
+        price_index = self.slot_index.get(home_id, {}).get(resolution or self.resolution)
+        if not price_index:
+            return None
+        
+        starts, ends, _ = price_index
+        now = dt_util.now().timestamp()
+        
+        # Binärsökning i indexet istället för att jämföra varje intervall
+        position = bisect_right(starts, now) - 1
+        if position >= 0 and now < ends[position]:
+            return position
+        return None
+
+    def _diff_homes(self, homes_data):
+        """Return the homes whose data differs from the current data, or None for all."""
+        if not self.data:
+            return None
+        return {
+            home_id
+            for home_id in homes_data.keys() | self.data.keys()
+            if homes_data.get(home_id) != self.data.get(home_id)
+        }
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Notify only the entities whose home changed.
+
+        Entities register with their home id as listener context. After a
+        data update, listeners for unchanged homes are skipped; when the
+        update success state flips, or no diff is known, everyone is told.
+        """
+        changed = self._changed_homes
+        self._changed_homes = None
+        
+        if changed is None or self._notified_success != self.last_update_success:
+            self._notified_success = self.last_update_success
+            super().async_update_listeners()
+            return
+        
+        _LOGGER.debug("Notifying listeners for %s changed home(s)", len(changed))
+        for update_callback, context in list(self._listeners.values()):
+            if context is None or context in changed:
+                update_callback()
+
+    @callback
+    def async_add_tick_listener(
+        self, update_callback: Callable[[], None], home_id: str | None = None
+    ) -> Callable[[], None]:
+        """Call back at each slot boundary of a home (None = every tick)."""
+        remove = object()
+        self._tick_listeners[remove] = (update_callback, home_id)
+
+        @callback
+        def remove_listener() -> None:
+            self._tick_listeners.pop(remove, None)
+
+        return remove_listener
+
+    def _next_boundaries(self, now: float) -> dict:
+        """Return the next slot start or end after ``now`` per home.
+
+        The fetched quarter hours include every boundary of the derived
+        resolutions, so sensors of all resolutions are woken on time.
+        """
+        boundaries = {}
+        for home_id, index in self.slot_index.items():
+            starts, ends, _ = index[FETCH_RESOLUTION]
+            position = bisect_right(starts, now)
+            candidates = []
+            if position < len(starts):
+                candidates.append(starts[position])
+            # Slutet på pågående intervall (viktigt för dagens sista intervall)
+            if position > 0 and ends[position - 1] > now:
+                candidates.append(ends[position - 1])
+            if candidates:
+                boundaries[home_id] = min(candidates)
+        return boundaries
+
+    @callback
+    def _schedule_tick(self) -> None:
+        """Arm one timer at the next slot boundary found in the price timeline.
+
+        Boundaries come from the actual startsAt values, so DST days and
+        irregular slots are handled. Without data the timer falls back to
+        the next clock-aligned interval. It never sleeps past the next
+        local midnight, where the views are rolled over.
+        """
+        self._cancel_tick()
+        now = dt_util.utcnow().timestamp()
+        boundaries = self._next_boundaries(now)
+        
+        if boundaries:
+            next_tick = min(boundaries.values())
+            self._tick_homes = {
+                home_id for home_id, boundary in boundaries.items() if boundary == next_tick
+            }
+        else:
+            interval = self.sensor_update_interval.total_seconds()
+            next_tick = now - now % interval + interval
+            self._tick_homes = None
+        
+        # Dygnsskiftet väcker alltid timern, även vid glapp i tidslinjen
+        midnight = local_day_bounds(dt_util.now().date())[1]
+        if midnight < next_tick:
+            next_tick = midnight
+            self._tick_homes = None
+        
+        self._unsub_tick = async_track_point_in_utc_time(
+            self.hass, self._handle_tick, datetime.fromtimestamp(next_tick, tz=timezone.utc)
+        )
+
+    @callback
+    def _cancel_tick(self) -> None:
+        """Cancel the armed boundary timer."""
+        if self._unsub_tick:
+            self._unsub_tick()
+            self._unsub_tick = None
+
+    @callback
+    def _handle_tick(self, now) -> None:
+        """Wake the entities of the homes whose slot just changed."""
+        self._unsub_tick = None
+        homes = self._tick_homes
+        if self._roll_over():
+            # Nytt dygn - alla entiteter, även de utan tick, har nya värden
+            homes = None
+            self.async_update_listeners()
+        _LOGGER.debug("Slot boundary at %s for %s", now, homes or "all homes")
+        
+        for update_callback, home_id in list(self._tick_listeners.values()):
+            if homes is None or home_id is None or home_id in homes:
+                update_callback()
+        
+        self._schedule_tick()
+
+    def get_prices(self, home_id, day, resolution=None):
+        """Return a home's prices for "today" or "tomorrow" in a resolution."""
+        views = self.views.get(home_id)
+        if not views:
+            return PriceSeries()
+        today, tomorrow = views[resolution or self.resolution]
+        return tomorrow if day == "tomorrow" else today
+
+    def get_horizon(self, home_id, resolution=None):
+        """Return today's and tomorrow's prices for a home as one series."""
+        return self.get_prices(home_id, "today", resolution) + self.get_prices(
+            home_id, "tomorrow", resolution
+        )
+
+    async def async_restore(self) -> bool:
+        """Restore cached prices and return True if they are still fresh.
+
+        The cache holds the price timeline, so a cache saved yesterday
+        simply gives today's view from what was tomorrow, and entities get
+        correct prices right away without an API call.
+        """
+        await self._async_restore_history()
+
+        stored = await self._store.async_load()
+        if not stored or not stored.get("homes"):
+            return False
+        if stored.get("resolution") != FETCH_RESOLUTION:
+            # Äldre cache i konfigurerad upplösning - hämta kvartspriser istället
+            _LOGGER.debug("Ignoring cached prices stored in another resolution")
+            return False
+        
+        homes_data = {}
+        for home_id, home_data in stored["homes"].items():
+            if "prices" in home_data:
+                prices = parse_prices(home_data["prices"])
+            else:
+                # Cache från före tidslinjen, med separata dagar
+                prices = parse_prices(home_data.get("today")) + parse_prices(
+                    home_data.get("tomorrow")
+                )
+            homes_data[home_id] = {"name": home_data.get("name", "Home"), "prices": prices}
+        
+        homes_data = self._expire_slots(self._select_homes(homes_data))
+        _LOGGER.info("Restored cached prices for %s home(s)", len(homes_data))
+        self.fetcher.async_seed(homes_data)
+        self._build_price_index(homes_data)
+        self.async_set_updated_data(homes_data)
+        
+        if self._is_stale():
+            return False
+        self.metrics.increment("cache_hits")
+        return True
+
+    def _is_stale(self) -> bool:
+        """Return True if today's prices are missing or tomorrow's are due."""
+        if any(not self.get_prices(home_id, "today") for home_id in self.data):
+            return True
+        if any(home_id not in self.data for home_id in self.home_ids or ()):
+            # Nyvalt hem som inte fanns i cachen
+            return True
+        
+        if not self.update_times_parsed:
+            return False
+        
+        now = dt_util.now()
+        publish_time = self.update_times_parsed[0]
+        if now.time() < publish_time:
+            return False
+        
+        return any(not self.get_prices(home_id, "tomorrow") for home_id in self.data)
+
+    async def _async_restore_history(self) -> None:
+        """Load the stored price history."""
+        if not self.history_days:
+            return
+        
+        stored = await self._history_store.async_load()
+        for home_id, columns in (stored or {}).get("homes", {}).items():
+            self.history[home_id] = PriceHistory.from_dict(self.history_days, columns)
+
+    @callback
+    def _record_history(self, home_id, home_data, prices) -> None:
+        """Add finished slots to the history and import them into statistics."""
+        if not self.history_days:
+            return
+        
+        history = self.history.get(home_id)
+        if history is None:
+            history = self.history[home_id] = PriceHistory(self.history_days)
+        
+        added = history.extend(prices)
+        if added:
+            async_import_statistics(
+                self.hass, home_id, home_data.get("name", "Home"), self.currency, added
+            )
+
+    @callback
+    def _async_save_history(self) -> None:
+        """Schedule saving the price history to disk."""
+        if self.history:
+            self._history_store.async_delay_save(
+                lambda: {
+                    "homes": {
+                        home_id: history.as_dict()
+                        for home_id, history in self.history.items()
+                    }
+                },
+                CACHE_SAVE_DELAY,
+            )
+
+    async def async_flush(self) -> None:
+        """Write the cached prices and history now, before the entry is reloaded."""
+        if self.data:
+            await self._store.async_save(self._cache_data(self.data))
+        if self.history:
+            await self._history_store.async_save(
+                {"homes": {home_id: history.as_dict() for home_id, history in self.history.items()}}
+            )
+
+    async def async_discard_cache(self) -> None:
+        """Remove the cached prices, which belong to the previous token."""
+        await self._store.async_remove()
+
+    @callback
+    def _async_save_cache(self, homes_data) -> None:
+        """Schedule saving the latest prices to disk."""
+        if homes_data:
+            self._store.async_delay_save(lambda: self._cache_data(homes_data), CACHE_SAVE_DELAY)
+
+    @staticmethod
+    def _cache_data(homes_data) -> dict:
+        """Return prices as columns for storage."""
+        return {
+            "resolution": FETCH_RESOLUTION,
+            "homes": {
+                home_id: {
+                    "name": home_data.get("name", "Home"),
+                    "prices": home_data.get("prices", PriceSeries()).as_columns(),
+                }
+                for home_id, home_data in homes_data.items()
+            }
+        }
+
+    @callback
+    def _handle_shared_data(self, homes_data):
+        """Handle price data fetched on behalf of another config entry."""
+        homes_data = self._select_homes(homes_data)
+        _LOGGER.debug("Received shared price data for %s home(s)", len(homes_data))
+        self._build_price_index(homes_data)
+        self._async_save_cache(homes_data)
+        self.async_set_updated_data(homes_data)
+
+    def _cached_fallback(self, message):
+        """Keep the current prices through a transient API failure.
+
+        Rate limiting, an open circuit breaker, HTTP and network errors
+        and timeouts are not data errors: as long as the held timeline
+        still covers the current slot of every home, entities stay
+        available and the next scheduled fetch picks up anything new.
+        ``kept_prices`` tells the adaptive scheduler to retry anyway.
+        """
+        if not self.data or any(self.current_position(home_id) is None for home_id in self.data):
+            _LOGGER.error("%s, and no current prices to keep", message)
+            raise UpdateFailed(str(message))
+        
+        _LOGGER.warning("%s, keeping current prices", message)
+        self.metrics.increment("cached_fallbacks")
+        self.kept_prices = True
+        # Inget har ändrats - inga sensorer behöver notifieras
+        self._changed_homes = set()
+        return self.data
+
+    async def _async_update_data(self):
+        """Fetch data from Tibber API."""
+        _LOGGER.debug("Fetching %s prices for %s view", FETCH_RESOLUTION, self.resolution)
+        self.kept_prices = False
+        self.retry_after = 0.0
+
+        try:
+            homes_data = await self.fetcher.async_fetch(self._handle_shared_data)
+        except TibberUnavailableError as err:
+            self.retry_after = err.retry_after
+            return self._cached_fallback(err)
+        except TibberGraphQLError as err:
+            _LOGGER.error("GraphQL error: %s", err)
+            raise UpdateFailed(f"GraphQL error: {err}")
+        except TibberApiError as err:
+            return self._cached_fallback(f"Error fetching data: {err}")
+        except asyncio.TimeoutError as err:
+            return self._cached_fallback(f"Timeout fetching data: {err}")
+        except aiohttp.ClientError as err:
+            return self._cached_fallback(f"Network error: {err}")
+        except KeyError as err:
+            _LOGGER.error("Unexpected API response structure: %s", err)
+            raise UpdateFailed(f"Invalid API response: {err}")
+        except Exception as err:
+            _LOGGER.error("Unexpected error: %s", err)
+            raise UpdateFailed(f"Unexpected error: {err}")
+
+        homes_data = self._select_homes(homes_data)
+        self._build_price_index(homes_data)
+        self._async_save_cache(homes_data)
+        return homes_data
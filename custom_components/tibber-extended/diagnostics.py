@@ -0,0 +1,93 @@
+"""Diagnostics support for Tibber Extended."""
+from homeassistant.components.diagnostics import REDACTED, async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import (
+    DOMAIN,
+    CONF_ACCESS_TOKEN,
+    CONF_ACCOUNT_HOMES,
+    CONF_HOMES,
+    FETCH_RESOLUTION,
+)
+
+# Token, hem-id:n och smeknamn, samt fält från Tibbers svar om de hamnar i utdata
+TO_REDACT = {CONF_ACCESS_TOKEN, "home_id", "id", "appNickname", "websocketSubscriptionUrl"}
+
+
+def _home_aliases(entry: ConfigEntry, coordinator) -> dict:
+    """Return a placeholder per home ID, numbered in the order of the account's homes.
+
+    Per-home data stays apart in the output without exposing the IDs.
+    Metrics are shared by the token's entries, so their homes are included.
+    """
+    home_ids = dict.fromkeys([
+        *entry.data.get(CONF_ACCOUNT_HOMES, ()),
+        *(coordinator.home_ids or ()),
+        *(coordinator.data or {}),
+        *coordinator.metrics.last_success,
+    ])
+    return {home_id: f"home_{number}" for number, home_id in enumerate(home_ids, 1)}
+
+
+def _redact_entry(data: dict, aliases: dict) -> dict:
+    """Return the entry data with the token redacted and the homes replaced by placeholders."""
+    data = async_redact_data(dict(data), TO_REDACT)
+    if data.get(CONF_HOMES):
+        data[CONF_HOMES] = [aliases[home_id] for home_id in data[CONF_HOMES]]
+    if data.get(CONF_ACCOUNT_HOMES):
+        data[CONF_ACCOUNT_HOMES] = {aliases[home_id]: REDACTED for home_id in data[CONF_ACCOUNT_HOMES]}
+    return data
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict:
+    """Return diagnostics for a config entry."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    aliases = _home_aliases(entry, coordinator)
+
+    homes = {}
+    for home_id, home_data in (coordinator.data or {}).items():
+        homes[aliases[home_id]] = {
+            "timeline_count": len(home_data.get("prices", [])),
+            "today_count": len(coordinator.get_prices(home_id, "today", FETCH_RESOLUTION)),
+            "tomorrow_count": len(coordinator.get_prices(home_id, "tomorrow", FETCH_RESOLUTION)),
+            "today_count_by_resolution": {
+                resolution: len(today)
+                for resolution, (today, _) in coordinator.views.get(home_id, {}).items()
+            },
+            "history_count": len(coordinator.history.get(home_id, ())),
+            "consumption_hours": (
+                len(coordinator.consumption.homes.get(home_id, ()))
+                if coordinator.consumption is not None
+                else None
+            ),
+            "live_measurement": (
+                coordinator.live_streams[home_id].data
+                if home_id in coordinator.live_streams
+                else None
+            ),
+        }
+
+    metrics = coordinator.metrics.as_dict()
+    metrics["last_success"] = {
+        aliases[home_id]: timestamp for home_id, timestamp in metrics["last_success"].items()
+    }
+
+    return async_redact_data({
+        "entry": _redact_entry(entry.data, aliases),
+        "coordinator": {
+            "resolution": coordinator.resolution,
+            "fetch_resolution": FETCH_RESOLUTION,
+            "tracked_homes": (
+                [aliases[home_id] for home_id in coordinator.home_ids]
+                if coordinator.home_ids is not None
+                else None
+            ),
+            "update_mode": coordinator.update_mode,
+            "last_update_success": coordinator.last_update_success,
+            "last_exception": repr(coordinator.last_exception) if coordinator.last_exception else None,
+            "data_version": coordinator.data_version,
+        },
+        "homes": homes,
+        "metrics": metrics,
+    }, TO_REDACT)
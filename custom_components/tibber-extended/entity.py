@@ -0,0 +1,131 @@
+"""Base entities for Tibber Extended."""
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import CONF_CURRENCY, CONF_HOME_NAME, DEFAULT_CURRENCY, SIGNAL_OPTIONS_UPDATED
+
+
+class TibberOptionsMixin:
+    """Follow option changes that are applied without reloading the entry.
+
+    The home name in the entity name and the currency in the unit are
+    swapped in place, so the entity keeps its entity_id and history.
+    """
+
+    async def async_added_to_hass(self):
+        """Listen for applied options when added to hass."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_OPTIONS_UPDATED.format(self.platform.config_entry.entry_id),
+                self._handle_options_update,
+            )
+        )
+
+    @callback
+    def _handle_options_update(self, old, new):
+        """Apply the new options and write the state."""
+        self._apply_options(old, new)
+        self.async_write_ha_state()
+
+    def _apply_options(self, old, new):
+        """Swap the home name and currency that were set at creation."""
+        old_name = old.get(CONF_HOME_NAME, "Mitt Hem")
+        new_name = new.get(CONF_HOME_NAME, "Mitt Hem")
+        if old_name != new_name and self._attr_name.startswith(f"{old_name} "):
+            self._attr_name = new_name + self._attr_name[len(old_name):]
+
+        old_currency = old.get(CONF_CURRENCY, DEFAULT_CURRENCY)
+        new_currency = new.get(CONF_CURRENCY, DEFAULT_CURRENCY)
+        if old_currency != new_currency:
+            # Bara enheter som satts från valutan, inte klassernas fasta enheter
+            unit = self.__dict__.get("_attr_native_unit_of_measurement")
+            if unit == old_currency:
+                self._attr_native_unit_of_measurement = new_currency
+            elif unit == f"{old_currency}/kWh":
+                self._attr_native_unit_of_measurement = f"{new_currency}/kWh"
+            if "_currency" in self.__dict__:
+                self._currency = new_currency
+
+
+class TibberHomeEntity(TibberOptionsMixin, CoordinatorEntity):
+    """Coordinator entity for one home that skips identical state writes.
+
+    Entities that depend on the current slot set ``_tick_updates`` and are
+    woken by the coordinator's slot-boundary timer.
+
+    Coordinator updates and slot ticks are deduplicated on a cheap key
+    rather than on the written state itself, which would evaluate the
+    state and attributes twice per write. Everything a home entity shows
+    is derived from the home's data version and, for slot-driven
+    entities, the current slot. Other writes, such as registry changes of
+    the name, unit or display precision, always go through.
+    """
+
+    _tick_updates = False
+    # Upplösning för aktuellt intervall i skrivnyckeln, None = coordinatorns
+    _resolution = None
+
+    def __init__(self, coordinator, home_id):
+        """Initialize the entity."""
+        # Hem-id som lyssnarkontext så att bara ändrade hem notifieras.
+        # En "pending"-sensor vet inte sitt hem än och lyssnar på allt.
+        super().__init__(coordinator, None if home_id == "pending" else home_id)
+        self._home_id = home_id
+        self._last_written = None
+
+    async def async_added_to_hass(self):
+        """When entity is added to hass."""
+        await super().async_added_to_hass()
+
+        if self._tick_updates:
+            # Coordinatorns gemensamma timer väcker entiteten vid varje intervallgräns
+            self.async_on_remove(
+                self.coordinator.async_add_tick_listener(
+                    self._update_state, None if self._home_id == "pending" else self._home_id
+                )
+            )
+
+    @callback
+    def _update_state(self):
+        """Write the state at a slot boundary if the current slot changed."""
+        self._async_write_if_changed()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the state if the home's data or the update success changed."""
+        self._async_write_if_changed()
+
+    def _write_key(self):
+        """Return a key that changes whenever the written state can change, or None."""
+        if self._home_id == "pending":
+            # Hemmet väljs först vid skrivningen - skriv alltid
+            return None
+        coordinator = self.coordinator
+        position = (
+            coordinator.current_position(self._home_id, self._resolution)
+            if self._tick_updates
+            else None
+        )
+        return (
+            coordinator.last_update_success,
+            coordinator.home_versions.get(self._home_id),
+            position,
+        )
+
+    @callback
+    def _async_write_if_changed(self) -> None:
+        """Write the state unless nothing it depends on changed since the last write."""
+        written = self._write_key()
+        if written is not None and written == self._last_written:
+            return
+        self._last_written = written
+        self.async_write_ha_state()
+
+    @callback
+    def async_write_ha_state(self) -> None:
+        """Write the state and count the write."""
+        self.coordinator.metrics.record_state_write()
+        super().async_write_ha_state()
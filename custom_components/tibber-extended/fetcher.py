@@ -0,0 +1,330 @@
+"""Shared price fetcher for Tibber Extended."""
+import asyncio
+import logging
+import time
+from contextlib import suppress
+from datetime import timedelta
+from functools import lru_cache
+from typing import Callable
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import dt as dt_util
+
+from .api import async_get_client
+from .const import DOMAIN, DATA_FETCHERS, FETCH_RESOLUTION
+from .metrics import TibberMetrics
+from .models import PriceSeries, local_day_bounds, parse_prices
+
+_LOGGER = logging.getLogger(__name__)
+
+# Svar som är yngre än så här återanvänds av coordinators som frågar sent
+COALESCE_WINDOW = 5  # sekunder
+
+PRICE_FRAGMENTS = """
+fragment HomePrices on Home {
+    id
+    appNickname
+    currentSubscription {
+        priceInfo(resolution: $resolution) {
+            today @include(if: $today) {
+                ...PricePoint
+            }
+            tomorrow @include(if: $tomorrow) {
+                ...PricePoint
+            }
+        }
+    }
+}
+
+fragment PricePoint on Price {
+    total
+    energy
+    tax
+    startsAt
+    level
+}
+"""
+
+# Byggs en gång - vilka dagar som hämtas styrs med GraphQL-variabler
+PRICE_QUERY = """
+query PriceInfo($resolution: PriceInfoResolution!, $today: Boolean!, $tomorrow: Boolean!) {
+    viewer {
+        homes {
+            ...HomePrices
+        }
+    }
+}
+""" + PRICE_FRAGMENTS
+
+
+@lru_cache(maxsize=8)
+def home_price_query(count: int) -> str:
+    """Return a price query for ``count`` homes selected by id.
+
+    Each home is an alias ``home0``, ``home1`` ... of ``viewer.home(id:)``
+    with its id as a variable, so the query text only depends on the
+    number of homes and all of them are fetched in one request.
+    """
+    variables = "".join(f", $home{index}: ID!" for index in range(count))
+    aliases = "".join(
+        f"\n        home{index}: home(id: $home{index}) {{\n            ...HomePrices\n        }}"
+        for index in range(count)
+    )
+    return (
+        "\nquery PriceInfo($resolution: PriceInfoResolution!, $today: Boolean!, "
+        f"$tomorrow: Boolean!{variables}) {{\n    viewer {{{aliases}\n    }}\n}}\n"
+        + PRICE_FRAGMENTS
+    )
+
+
+def expire_before(today):
+    """Return the epoch seconds before which slots are dropped: yesterday's midnight."""
+    return local_day_bounds(today - timedelta(days=1))[0]
+
+
+class TibberPriceFetcher:
+    """Fetch and parse price data once for all entries sharing a query.
+
+    Config entries with the same token share one fetcher. Prices are
+    always fetched per quarter hour; coarser resolutions are derived by
+    the coordinators, so one request and one parse serve them all.
+    Concurrent refreshes join the request that is already in flight, and
+    the parsed result is pushed to every subscribed coordinator that did
+    not ask for it itself.
+
+    The fetcher holds each home's price timeline from yesterday through
+    tomorrow, only asks Tibber for the days missing from it and merges
+    the response into it.
+
+    Subscribers may track a subset of the account's homes. Only the union
+    of those homes is queried, so the payload and the parse scale with
+    the tracked homes rather than the size of the account. A result is
+    only reused, joined or pushed where it covers every home the
+    subscriber tracks; a subscriber added since gets a query of its own.
+    """
+
+    def __init__(self, hass: HomeAssistant, token: str) -> None:
+        """Initialize the fetcher."""
+        self.hass = hass
+        self.token = token
+        # Mätvärden delas av alla config entries som använder hämtaren
+        self.metrics = TibberMetrics()
+        self.client = async_get_client(hass, token, self.metrics)
+        # Senast kända prisdata per hem: {"name", "prices"}
+        self._homes = {}
+        self._subscribers = []
+        # Hem per prenumerant, None = alla hem på kontot
+        self._tracked = {}
+        self._inflight = None
+        self._waiters = set()
+        self._last_result = None
+        self._last_fetch = 0.0
+        # Hem som pågående och senaste fråga gällde, None = alla hem på kontot
+        self._inflight_homes = None
+        self._last_homes = None
+
+    @callback
+    def async_subscribe(
+        self, update_callback: Callable[[dict], None], home_ids: list | None = None
+    ) -> Callable[[], None]:
+        """Subscribe to fetched data for ``home_ids`` (all homes if None).
+
+        Returns a function that unsubscribes.
+        """
+        self._subscribers.append(update_callback)
+        self._tracked[update_callback] = frozenset(home_ids) if home_ids else None
+
+        @callback
+        def remove_subscriber() -> None:
+            self._subscribers.remove(update_callback)
+            self._tracked.pop(update_callback, None)
+            if not self._subscribers:
+                domain_data = self.hass.data.get(DOMAIN, {})
+                fetchers = domain_data.get(DATA_FETCHERS, {})
+                if fetchers.get(self.token) is self:
+                    # Klienten behålls så att paus och brytarläge överlever en omladdning
+                    fetchers.pop(self.token)
+
+        return remove_subscriber
+
+    @callback
+    def async_seed(self, homes_data: dict) -> None:
+        """Seed the held timelines from restored data if nothing is held yet."""
+        if not self._homes:
+            self._homes = {home_id: dict(home_data) for home_id, home_data in homes_data.items()}
+
+    def _tracked_homes(self) -> list | None:
+        """Return the sorted ids of the homes to query, or None for all homes."""
+        if not self._tracked or None in self._tracked.values():
+            return None
+        return sorted(frozenset().union(*self._tracked.values()))
+
+    def _covers(self, subscriber, home_ids: frozenset | None) -> bool:
+        """Return True if a query for ``home_ids`` (None = all) has every home of ``subscriber``."""
+        if home_ids is None:
+            return True
+        tracked = self._tracked.get(subscriber)
+        return tracked is not None and tracked <= home_ids
+
+    def _missing_days(self, home_ids: list | None) -> tuple[bool, bool]:
+        """Return which of today and tomorrow must be fetched."""
+        if not self._homes or any(home_id not in self._homes for home_id in home_ids or ()):
+            return True, True
+
+        today = dt_util.now().date()
+        today_start, tomorrow_start = local_day_bounds(today)
+        tomorrow_end = local_day_bounds(today + timedelta(days=1))[1]
+        need_today = need_tomorrow = False
+
+        # Dygnsskiftet är bara en ny tidpunkt på tidslinjen - inget flyttas
+        for home_id in home_ids or self._homes:
+            prices = self._homes[home_id].get("prices", PriceSeries())
+            if not prices.between(today_start, tomorrow_start):
+                need_today = True
+            if not prices.between(tomorrow_start, tomorrow_end):
+                need_tomorrow = True
+
+        return need_today, need_tomorrow
+
+    async def async_fetch(self, requester: Callable[[dict], None] | None = None) -> dict:
+        """Return parsed price data, joining any request already in flight.
+
+        A recent result or a request in flight is only used if it covers
+        the requester's homes; otherwise a new query is sent.
+        """
+        if (
+            self._last_result is not None
+            and time.monotonic() - self._last_fetch < COALESCE_WINDOW
+            and self._covers(requester, self._last_homes)
+        ):
+            _LOGGER.debug("Reusing price data fetched %.1f s ago", time.monotonic() - self._last_fetch)
+            self.metrics.increment("cache_hits")
+            return self._last_result
+
+        while self._inflight is not None and not self._covers(requester, self._inflight_homes):
+            # Pågående fråga saknar hem som den här prenumeranten följer - fråga efter den
+            _LOGGER.debug("Request in flight does not cover the requester's homes, waiting")
+            with suppress(Exception):
+                await asyncio.shield(self._inflight)
+
+        if requester is not None:
+            self._waiters.add(requester)
+
+        if self._inflight is None:
+            self.metrics.increment("cache_misses")
+            home_ids = self._tracked_homes()
+            self._inflight_homes = None if home_ids is None else frozenset(home_ids)
+            self._inflight = self.hass.async_create_task(self._async_fetch_and_publish(home_ids))
+        else:
+            _LOGGER.debug("Joining in-flight Tibber request")
+            self.metrics.increment("cache_hits")
+
+        # shield så att en avbruten coordinator inte avbryter de andras hämtning
+        return await asyncio.shield(self._inflight)
+
+    async def _async_fetch_and_publish(self, home_ids: list | None) -> dict:
+        """Fetch ``home_ids`` once and push the result to covered subscribers that did not ask."""
+        covered = self._inflight_homes
+        try:
+            need_today, need_tomorrow = self._missing_days(home_ids)
+            if not need_today and not need_tomorrow:
+                # Allt finns redan - hämta ändå morgondagen för att upptäcka ändringar
+                need_tomorrow = True
+            _LOGGER.debug(
+                "Fetching prices for %s (today: %s, tomorrow: %s)",
+                f"{len(home_ids)} home(s)" if home_ids else "all homes",
+                need_today,
+                need_tomorrow,
+            )
+            variables = {
+                "resolution": FETCH_RESOLUTION,
+                "today": need_today,
+                "tomorrow": need_tomorrow,
+            }
+            if home_ids:
+                query = home_price_query(len(home_ids))
+                variables.update(
+                    (f"home{index}", home_id) for index, home_id in enumerate(home_ids)
+                )
+            else:
+                query = PRICE_QUERY
+            data = await self.client.async_query(query, variables)
+            started = time.perf_counter()
+            homes_data = self._parse(data, need_today, need_tomorrow)
+            self.metrics.record_parse((time.perf_counter() - started) * 1000, homes_data)
+        finally:
+            waiters = self._waiters
+            self._waiters = set()
+            self._inflight = None
+
+        self._last_result = homes_data
+        self._last_homes = covered
+        self._last_fetch = time.monotonic()
+
+        for update_callback in list(self._subscribers):
+            if update_callback not in waiters and self._covers(update_callback, covered):
+                update_callback(homes_data)
+
+        return homes_data
+
+    def _parse(self, data: dict, has_today: bool, has_tomorrow: bool) -> dict:
+        """Merge the GraphQL response with the days already held.
+
+        The response shape is validated here and every price point is
+        turned into a typed record, so nothing downstream parses strings.
+        """
+        homes_data = {}
+        expired = expire_before(dt_util.now().date())
+        viewer_data = data.get("viewer") or {}
+        if "homes" in viewer_data:
+            homes = viewer_data["homes"] or []
+        else:
+            # Valda hem som alias home0, home1 ... - null om ett id inte finns längre
+            homes = [home for home in viewer_data.values() if home]
+
+        if not homes:
+            _LOGGER.warning("No homes found in Tibber account")
+            return homes_data
+
+        for home in homes:
+            home_id = home["id"]
+            subscription = home.get("currentSubscription")
+
+            if not subscription:
+                _LOGGER.warning("No subscription found for home %s", home_id)
+                continue
+
+            price_info = subscription.get("priceInfo") or {}
+            held = self._homes.get(home_id, {}).get("prices", PriceSeries())
+            fetched = (
+                parse_prices(price_info.get("today") if has_today else None)
+                + parse_prices(price_info.get("tomorrow") if has_tomorrow else None)
+            )
+
+            homes_data[home_id] = {
+                "name": home.get("appNickname", "Home"),
+                # Hämtade dagar ersätter samma tidsintervall, utgångna intervall släpps
+                "prices": held.merge(fetched).since(expired),
+            }
+
+            _LOGGER.debug(
+                "Home %s: %s fetched prices, %s in timeline",
+                home_id,
+                len(fetched),
+                len(homes_data[home_id]["prices"]),
+            )
+
+        _LOGGER.info("Successfully fetched data for %s home(s)", len(homes_data))
+        self._homes = {home_id: dict(home_data) for home_id, home_data in homes_data.items()}
+        return homes_data
+
+
+@callback
+def async_get_fetcher(hass: HomeAssistant, token: str) -> TibberPriceFetcher:
+    """Return the shared fetcher for a token."""
+    fetchers = hass.data.setdefault(DOMAIN, {}).setdefault(DATA_FETCHERS, {})
+
+    if token not in fetchers:
+        fetchers[token] = TibberPriceFetcher(hass, token)
+
+    return fetchers[token]
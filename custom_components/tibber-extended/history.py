@@ -0,0 +1,169 @@
+"""Local price history for Tibber Extended."""
+import logging
+from array import array
+from bisect import bisect_right
+from datetime import datetime, timezone
+
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .models import PriceLevel, PricePoint
+
+_LOGGER = logging.getLogger(__name__)
+
+# Största antalet intervall per dygn (QUARTER_HOURLY en dag med sommartidsomställning)
+MAX_SLOTS_PER_DAY = 100
+
+# Fält som importeras som externa statistik i Home Assistant
+STATISTIC_FIELDS = ("total", "energy")
+
+
+class PriceHistory:
+    """Rolling, array-backed store of past slot prices for one home.
+
+    Slots are kept in a fixed-size ring of typed arrays (start time,
+    total, energy, tax and level code), so the memory use is bounded by
+    the configured number of days and does not grow with boxed dicts.
+    """
+
+    __slots__ = ("capacity", "_starts", "_total", "_energy", "_tax", "_level", "_head", "_size")
+
+    def __init__(self, days: int) -> None:
+        """Initialize an empty history holding ``days`` days of slots."""
+        self.capacity = max(1, days) * MAX_SLOTS_PER_DAY
+        self._starts = array("d", bytes(8 * self.capacity))
+        self._total = array("d", bytes(8 * self.capacity))
+        self._energy = array("d", bytes(8 * self.capacity))
+        self._tax = array("d", bytes(8 * self.capacity))
+        self._level = array("b", bytes(self.capacity))
+        self._head = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        """Return the number of stored slots."""
+        return self._size
+
+    @property
+    def last_start(self) -> float | None:
+        """Return the start timestamp of the newest slot."""
+        if not self._size:
+            return None
+        return self._starts[(self._head + self._size - 1) % self.capacity]
+
+    def append(self, start: float, total: float, energy: float, tax: float, level: int) -> None:
+        """Add one slot, overwriting the oldest when full."""
+        if self._size < self.capacity:
+            index = (self._head + self._size) % self.capacity
+            self._size += 1
+        else:
+            index = self._head
+            self._head = (self._head + 1) % self.capacity
+
+        self._starts[index] = start
+        self._total[index] = total
+        self._energy[index] = energy
+        self._tax[index] = tax
+        self._level[index] = level
+
+    def extend(self, prices):
+        """Add the slots of a series newer than the stored ones, return those added."""
+        last_start = self.last_start
+        first = bisect_right(prices.start, last_start) if last_start is not None else 0
+        added = prices[first:]
+
+        for price_point in added:
+            self.append(*price_point)
+
+        return added
+
+    def _indices(self):
+        """Yield ring positions from oldest to newest."""
+        for offset in range(self._size):
+            yield (self._head + offset) % self.capacity
+
+    def as_dict(self) -> dict:
+        """Return the history as columns for storage."""
+        indices = list(self._indices())
+        return {
+            "start": [self._starts[i] for i in indices],
+            "total": [self._total[i] for i in indices],
+            "energy": [self._energy[i] for i in indices],
+            "tax": [self._tax[i] for i in indices],
+            "level": [self._level[i] for i in indices],
+        }
+
+    @classmethod
+    def from_dict(cls, days: int, data: dict) -> "PriceHistory":
+        """Restore a history from stored columns, keeping the newest slots."""
+        history = cls(days)
+        columns = zip(data["start"], data["total"], data["energy"], data["tax"], data["level"])
+        for start, total, energy, tax, level in columns:
+            history.append(start, total, energy, tax, level)
+        return history
+
+    def prices(self) -> list:
+        """Return the stored slots as price points."""
+        return [
+            PricePoint(
+                self._starts[i],
+                self._total[i],
+                self._energy[i],
+                self._tax[i],
+                PriceLevel(self._level[i]),
+            )
+            for i in self._indices()
+        ]
+
+
+def _hourly_statistics(prices, field):
+    """Aggregate price points into hourly mean/min/max rows."""
+    hours = {}
+    for price_point in prices:
+        hours.setdefault(price_point.start - price_point.start % 3600, []).append(
+            getattr(price_point, field)
+        )
+
+    return [
+        (datetime.fromtimestamp(hour, tz=timezone.utc), values)
+        for hour, values in sorted(hours.items())
+    ]
+
+
+def statistic_id(home_id: str, field: str) -> str:
+    """Return the external statistic id for a home and price field."""
+    return f"{DOMAIN}:{home_id.lower().replace('-', '_')}_price_{field}"
+
+
+def async_import_statistics(hass: HomeAssistant, home_id: str, home_name: str, currency: str, prices) -> None:
+    """Bulk import past prices into long-term statistics as hourly rows."""
+    if "recorder" not in hass.config.components or not prices:
+        return
+
+    from homeassistant.components.recorder.models import (
+        StatisticData,
+        StatisticMeanType,
+        StatisticMetaData,
+    )
+    from homeassistant.components.recorder.statistics import async_add_external_statistics
+
+    for field in STATISTIC_FIELDS:
+        metadata = StatisticMetaData(
+            has_sum=False,
+            mean_type=StatisticMeanType.ARITHMETIC,
+            name=f"{home_name} Electricity Price ({field})",
+            source=DOMAIN,
+            statistic_id=statistic_id(home_id, field),
+            unit_of_measurement=f"{currency}/kWh",
+        )
+        statistics = [
+            StatisticData(
+                start=start,
+                mean=sum(values) / len(values),
+                min=min(values),
+                max=max(values),
+            )
+            for start, values in _hourly_statistics(prices, field)
+        ]
+        async_add_external_statistics(hass, metadata, statistics)
+
+    _LOGGER.debug("Imported %s price slots into statistics for %s", len(prices), home_id)
@@ -0,0 +1,253 @@
+"""Real-time liveMeasurement streaming for Tibber Extended."""
+import asyncio
+import logging
+import random
+from datetime import timedelta
+from typing import Callable
+
+import aiohttp
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.event import async_track_time_interval
+
+from .api import async_get_client
+
+_LOGGER = logging.getLogger(__name__)
+
+WEBSOCKET_URL_QUERY = """
+{
+    viewer {
+        websocketSubscriptionUrl
+    }
+}
+"""
+
+LIVE_SUBSCRIPTION = """
+subscription LiveMeasurement($homeId: ID!) {
+    liveMeasurement(homeId: $homeId) {
+        timestamp
+        power
+        powerProduction
+        accumulatedConsumption
+        accumulatedProduction
+        accumulatedCost
+        currency
+    }
+}
+"""
+
+WS_PROTOCOL = "graphql-transport-ws"
+SUBSCRIPTION_ID = "1"
+# Stängningskoder då servern avvisar token - att ansluta igen hjälper inte
+REJECTED_CLOSE_CODES = (4401, 4403)
+
+# Återanslutning: 5 s, 10 s, 20 s ... max 5 min
+RECONNECT_BASE_DELAY = 5
+RECONNECT_MAX_DELAY = 300
+
+
+class LiveStreamRejectedError(Exception):
+    """The websocket server rejected the connection or the token."""
+
+
+class MeasurementBuffer:
+    """Coalesce live measurements between two state writes.
+
+    Power is downsampled to the mean (with min/max) of all samples in the
+    window, while accumulated values keep their latest reading.
+    """
+
+    __slots__ = ("_count", "_power_sum", "_power_min", "_power_max", "_latest")
+
+    def __init__(self) -> None:
+        """Initialize an empty buffer."""
+        self._reset()
+
+    def _reset(self) -> None:
+        """Forget all buffered samples."""
+        self._count = 0
+        self._power_sum = 0.0
+        self._power_min = None
+        self._power_max = None
+        self._latest = None
+
+    def add(self, measurement: dict) -> None:
+        """Add one liveMeasurement payload."""
+        self._latest = measurement
+        power = measurement.get("power")
+        if power is None:
+            return
+        self._count += 1
+        self._power_sum += power
+        self._power_min = power if self._power_min is None else min(self._power_min, power)
+        self._power_max = power if self._power_max is None else max(self._power_max, power)
+
+    def flush(self) -> dict | None:
+        """Return the coalesced window and reset, or None if empty."""
+        if self._latest is None:
+            return None
+
+        snapshot = dict(self._latest)
+        if self._count:
+            snapshot["power"] = round(self._power_sum / self._count, 1)
+            snapshot["power_min"] = self._power_min
+            snapshot["power_max"] = self._power_max
+        snapshot["samples"] = self._count
+
+        self._reset()
+        return snapshot
+
+
+class TibberLiveStream:
+    """Stream liveMeasurement for one home over a GraphQL websocket.
+
+    Measurements are buffered and handed to listeners at most once per
+    throttle interval, so a Pulse sending every couple of seconds does
+    not flood the state machine and recorder. The connection is retried
+    with exponential backoff until the stream is stopped, or until the
+    server rejects the token.
+    """
+
+    def __init__(self, hass: HomeAssistant, token: str, home_id: str, throttle: int) -> None:
+        """Initialize the stream."""
+        self.hass = hass
+        self.home_id = home_id
+        self.data = None
+        self._token = token
+        self._throttle = timedelta(seconds=throttle)
+        self._buffer = MeasurementBuffer()
+        self._listeners = []
+        self._task = None
+        self._remove_flush = None
+
+    @callback
+    def async_add_listener(self, update_callback: Callable[[], None]) -> Callable[[], None]:
+        """Listen for throttled updates and return a function that stops it."""
+        self._listeners.append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            self._listeners.remove(update_callback)
+
+        return remove_listener
+
+    @callback
+    def async_start(self) -> None:
+        """Start streaming in the background."""
+        self._remove_flush = async_track_time_interval(
+            self.hass, self._async_flush, self._throttle
+        )
+        self._task = self.hass.async_create_background_task(
+            self._async_run(), f"tibber_extended_live_{self.home_id}"
+        )
+
+    async def async_stop(self) -> None:
+        """Stop streaming and close the connection."""
+        if self._remove_flush:
+            self._remove_flush()
+            self._remove_flush = None
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @callback
+    def _async_flush(self, _now=None) -> None:
+        """Publish the buffered window to listeners."""
+        snapshot = self._buffer.flush()
+        if snapshot is None:
+            return
+
+        self.data = snapshot
+        for update_callback in list(self._listeners):
+            update_callback()
+
+    async def _async_run(self) -> None:
+        """Keep the subscription alive, reconnecting with backoff."""
+        attempt = 0
+        while True:
+            try:
+                received = await self._async_stream()
+            except asyncio.CancelledError:
+                raise
+            except LiveStreamRejectedError as err:
+                _LOGGER.error(
+                    "Live measurement stream for %s rejected, not reconnecting: %s", self.home_id, err
+                )
+                return
+            except Exception as err:
+                received = False
+                _LOGGER.warning("Live measurement stream for %s failed: %s", self.home_id, err)
+
+            if received:
+                attempt = 0
+
+            delay = min(RECONNECT_BASE_DELAY * (2 ** attempt), RECONNECT_MAX_DELAY)
+            delay += random.uniform(0, delay / 2)
+            attempt += 1
+            _LOGGER.debug("Reconnecting live stream for %s in %.0f s", self.home_id, delay)
+            await asyncio.sleep(delay)
+
+    async def _async_get_url(self) -> str:
+        """Return the websocket address to connect to."""
+        # Prishämtningens klient, utan att lämna en kvar om strömmen överlever den
+        client = async_get_client(self.hass, self._token, keep=False)
+        data = await client.async_query(WEBSOCKET_URL_QUERY)
+        return data["viewer"]["websocketSubscriptionUrl"]
+
+    async def _async_stream(self) -> bool:
+        """Run one websocket session and return True if data was received."""
+        url = await self._async_get_url()
+        session = async_get_clientsession(self.hass)
+        received = False
+
+        async with session.ws_connect(url, protocols=(WS_PROTOCOL,), heartbeat=30) as ws:
+            await ws.send_json({"type": "connection_init", "payload": {"token": self._token}})
+
+            async for msg in ws:
+                if msg.type != aiohttp.WSMsgType.TEXT:
+                    break
+
+                message = msg.json()
+                msg_type = message.get("type")
+
+                if msg_type == "connection_ack":
+                    await ws.send_json(
+                        {
+                            "id": SUBSCRIPTION_ID,
+                            "type": "subscribe",
+                            "payload": {
+                                "query": LIVE_SUBSCRIPTION,
+                                "variables": {"homeId": self.home_id},
+                            },
+                        }
+                    )
+                    _LOGGER.info("Live measurement stream connected for %s", self.home_id)
+                elif msg_type == "next":
+                    payload = message.get("payload", {})
+                    if payload.get("errors"):
+                        _LOGGER.error(
+                            "Live measurement error: %s",
+                            payload["errors"][0].get("message", "Unknown error"),
+                        )
+                        continue
+                    measurement = (payload.get("data") or {}).get("liveMeasurement")
+                    if measurement:
+                        self._buffer.add(measurement)
+                        received = True
+                elif msg_type == "ping":
+                    await ws.send_json({"type": "pong"})
+                elif msg_type == "error":
+                    _LOGGER.error("Live measurement subscription error: %s", message.get("payload"))
+                    break
+                elif msg_type == "complete":
+                    break
+
+        if ws.close_code in REJECTED_CLOSE_CODES:
+            raise LiveStreamRejectedError(f"closed with code {ws.close_code}")
+        _LOGGER.info("Live measurement stream closed for %s", self.home_id)
+        return received
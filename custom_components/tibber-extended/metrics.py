@@ -0,0 +1,139 @@
+"""Runtime metrics for Tibber Extended."""
+import time
+from bisect import bisect_left
+from collections import deque
+
+from homeassistant.util import dt as dt_util
+
+# Övre gränser för histogrammens hinkar
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+PARSE_BUCKETS_MS = (0.5, 1, 2.5, 5, 10, 25, 50, 100)
+PAYLOAD_BUCKETS_BYTES = (1024, 4096, 16384, 65536, 262144, 1048576)
+
+# Fönster för skrivningar per timme
+STATE_WRITE_WINDOW = 3600  # sekunder
+
+
+class Histogram:
+    """Fixed-bucket histogram with count, sum, min and max."""
+
+    __slots__ = ("bounds", "buckets", "count", "total", "minimum", "maximum", "last")
+
+    def __init__(self, bounds) -> None:
+        """Initialize an empty histogram."""
+        self.bounds = tuple(bounds)
+        # Sista hinken samlar allt över högsta gränsen
+        self.buckets = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+        self.last = None
+
+    def observe(self, value: float) -> None:
+        """Add one observation."""
+        self.buckets[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.minimum = value if self.minimum is None else min(self.minimum, value)
+        self.maximum = value if self.maximum is None else max(self.maximum, value)
+        self.last = value
+
+    @property
+    def mean(self) -> float | None:
+        """Return the mean of all observations."""
+        return self.total / self.count if self.count else None
+
+    def as_dict(self) -> dict:
+        """Return the histogram for diagnostics and attributes."""
+        labels = [f"<={bound}" for bound in self.bounds] + [f">{self.bounds[-1]}"]
+        return {
+            "count": self.count,
+            "last": self.last,
+            "mean": round(self.mean, 3) if self.count else None,
+            "min": self.minimum,
+            "max": self.maximum,
+            "buckets": dict(zip(labels, self.buckets)),
+        }
+
+
+class TibberMetrics:
+    """Counters and histograms for fetches, parsing and state writes.
+
+    Recording is a few additions per event, so metrics are always on and
+    can be read from diagnostics or the diagnostic sensors without
+    enabling debug logging.
+    """
+
+    def __init__(self) -> None:
+        """Initialize empty metrics."""
+        self.fetch_latency = Histogram(LATENCY_BUCKETS_MS)
+        self.payload_bytes = Histogram(PAYLOAD_BUCKETS_BYTES)
+        self.parse_time = Histogram(PARSE_BUCKETS_MS)
+        self.counters = {
+            "fetches": 0,
+            "api_errors": 0,
+            "graphql_errors": 0,
+            "rate_limited": 0,
+            "cached_fallbacks": 0,
+            "cache_hits": 0,
+            "cache_misses": 0,
+            "state_writes": 0,
+        }
+        self.last_success = {}
+        self._state_writes = deque()
+
+    def increment(self, counter: str) -> None:
+        """Increment a counter."""
+        self.counters[counter] += 1
+
+    def record_fetch(self, latency_ms: float, payload_bytes: int) -> None:
+        """Record one successful API round trip."""
+        self.counters["fetches"] += 1
+        self.fetch_latency.observe(round(latency_ms, 1))
+        self.payload_bytes.observe(payload_bytes)
+
+    def record_parse(self, parse_ms: float, home_ids) -> None:
+        """Record parsing a response and the homes it contained."""
+        self.parse_time.observe(round(parse_ms, 3))
+        now = dt_util.utcnow()
+        for home_id in home_ids:
+            self.last_success[home_id] = now
+
+    def record_state_write(self) -> None:
+        """Record one entity state write."""
+        now = time.monotonic()
+        self.counters["state_writes"] += 1
+        self._state_writes.append(now)
+        while self._state_writes[0] < now - STATE_WRITE_WINDOW:
+            self._state_writes.popleft()
+
+    @property
+    def state_writes_per_hour(self) -> int:
+        """Return how many state writes happened during the last hour."""
+        cutoff = time.monotonic() - STATE_WRITE_WINDOW
+        while self._state_writes and self._state_writes[0] < cutoff:
+            self._state_writes.popleft()
+        return len(self._state_writes)
+
+    @property
+    def cache_hit_rate(self) -> float | None:
+        """Return the share of price requests served without an API call, in percent."""
+        hits = self.counters["cache_hits"]
+        total = hits + self.counters["cache_misses"]
+        return round(100 * hits / total, 1) if total else None
+
+    def as_dict(self) -> dict:
+        """Return all metrics for diagnostics."""
+        return {
+            "counters": dict(self.counters),
+            "fetch_latency_ms": self.fetch_latency.as_dict(),
+            "payload_bytes": self.payload_bytes.as_dict(),
+            "parse_time_ms": self.parse_time.as_dict(),
+            "state_writes_per_hour": self.state_writes_per_hour,
+            "cache_hit_rate": self.cache_hit_rate,
+            "last_success": {
+                home_id: timestamp.isoformat()
+                for home_id, timestamp in self.last_success.items()
+            },
+        }
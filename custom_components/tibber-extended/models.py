@@ -0,0 +1,277 @@
+"""Typed price records for Tibber Extended."""
+import logging
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta, timezone
+from enum import IntEnum
+from itertools import chain
+from typing import NamedTuple
+
+from homeassistant.util import dt as dt_util
+
+from .const import PRICE_LEVEL_CODES
+
+_LOGGER = logging.getLogger(__name__)
+
+PriceLevel = IntEnum("PriceLevel", PRICE_LEVEL_CODES)
+
+# Nivå per kod, för snabb uppslagning utan att anropa enum-konstruktorn
+_LEVELS = tuple(sorted(PriceLevel))
+
+# Kolumner i PriceSeries
+SERIES_COLUMNS = ("start", "total", "energy", "tax", "level")
+
+
+class PricePoint(NamedTuple):
+    """One price slot, converted once when the response is ingested.
+
+    ``start`` is epoch seconds, so sensors compare and sort slots with
+    plain float arithmetic instead of parsing startsAt on every tick.
+    """
+
+    start: float
+    total: float
+    energy: float
+    tax: float
+    level: PriceLevel
+
+    @property
+    def starts_at(self) -> str:
+        """Return the start as a local ISO 8601 string."""
+        return dt_util.as_local(datetime.fromtimestamp(self.start, tz=timezone.utc)).isoformat()
+
+    def as_dict(self) -> dict:
+        """Return the slot in the Tibber API format used for attributes and storage."""
+        return {
+            "total": self.total,
+            "energy": self.energy,
+            "tax": self.tax,
+            "startsAt": self.starts_at,
+            "level": self.level.name,
+        }
+
+
+def parse_price_point(raw: dict) -> PricePoint:
+    """Validate one raw price point and return it as a typed record."""
+    start_time = dt_util.parse_datetime(raw["startsAt"])
+    if start_time is None:
+        raise ValueError(f"Invalid startsAt: {raw['startsAt']}")
+
+    return PricePoint(
+        start_time.timestamp(),
+        float(raw["total"]),
+        float(raw.get("energy") or 0.0),
+        float(raw.get("tax") or 0.0),
+        PriceLevel[raw["level"]] if raw.get("level") in PriceLevel.__members__ else PriceLevel.UNKNOWN,
+    )
+
+
+def local_day_bounds(day: date) -> tuple[float, float]:
+    """Return the epoch seconds of the local midnights starting and ending ``day``.
+
+    The day is 23 or 25 hours long on DST days.
+    """
+    return (
+        dt_util.start_of_local_day(day).timestamp(),
+        dt_util.start_of_local_day(day + timedelta(days=1)).timestamp(),
+    )
+
+
+class PriceSeries:
+    """Price slots stored as contiguous typed columns, sorted by start.
+
+    This is the coordinator's data model for a home's price timeline:
+    five ``array`` columns instead of one dict per slot, so many homes
+    with quarter-hour data stay small and create little work for the
+    garbage collector. Indexing and iteration give ``PricePoint`` views,
+    and ``as_dicts`` produces the Tibber API format on demand.
+
+    ``between`` returns a read-only view whose columns are memoryviews
+    of this series, so per-day views cost no copying. A series is never
+    resized once views of it exist; ``merge`` and ``since`` return new
+    series instead.
+    """
+
+    __slots__ = SERIES_COLUMNS
+
+    def __init__(self, start=(), total=(), energy=(), tax=(), level=()) -> None:
+        """Initialize the series from column iterables."""
+        self.start = array("d", start)
+        self.total = array("d", total)
+        self.energy = array("d", energy)
+        self.tax = array("d", tax)
+        self.level = array("b", level)
+
+    @classmethod
+    def from_points(cls, points) -> "PriceSeries":
+        """Return a series holding ``points`` in the given order."""
+        series = cls()
+        for price_point in points:
+            series.append(price_point)
+        return series
+
+    @classmethod
+    def from_columns(cls, data: dict) -> "PriceSeries":
+        """Return a series from stored columns."""
+        return cls(*(data[name] for name in SERIES_COLUMNS))
+
+    def as_columns(self) -> dict:
+        """Return the columns as lists for storage."""
+        return {name: getattr(self, name).tolist() for name in SERIES_COLUMNS}
+
+    def append(self, price_point: PricePoint) -> None:
+        """Add one slot at the end."""
+        self.start.append(price_point.start)
+        self.total.append(price_point.total)
+        self.energy.append(price_point.energy)
+        self.tax.append(price_point.tax)
+        self.level.append(price_point.level)
+
+    def __len__(self) -> int:
+        """Return the number of slots."""
+        return len(self.start)
+
+    def __getitem__(self, index):
+        """Return one slot as a PricePoint, or a slice as a new series."""
+        if isinstance(index, slice):
+            return PriceSeries(*(getattr(self, name)[index] for name in SERIES_COLUMNS))
+        return PricePoint(
+            self.start[index],
+            self.total[index],
+            self.energy[index],
+            self.tax[index],
+            _LEVELS[self.level[index]],
+        )
+
+    def __iter__(self):
+        """Iterate over the slots as PricePoints."""
+        for start, total, energy, tax, level in zip(
+            self.start, self.total, self.energy, self.tax, self.level
+        ):
+            yield PricePoint(start, total, energy, tax, _LEVELS[level])
+
+    def __add__(self, other: "PriceSeries") -> "PriceSeries":
+        """Return the slots of both series in one series."""
+        return PriceSeries(
+            *(chain(getattr(self, name), getattr(other, name)) for name in SERIES_COLUMNS)
+        )
+
+    def __eq__(self, other) -> bool:
+        """Compare column by column."""
+        if not isinstance(other, PriceSeries):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in SERIES_COLUMNS)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        """Return a short description."""
+        return f"<PriceSeries {len(self)} slots>"
+
+    def between(self, start: float, end: float) -> "PriceSeries":
+        """Return a view of the slots starting in [start, end)."""
+        first = bisect_left(self.start, start)
+        last = bisect_left(self.start, end, first)
+        view = PriceSeries.__new__(PriceSeries)
+        for name in SERIES_COLUMNS:
+            setattr(view, name, memoryview(getattr(self, name))[first:last])
+        return view
+
+    def since(self, start: float) -> "PriceSeries":
+        """Return the slots starting at or after ``start``, dropping older ones."""
+        first = bisect_left(self.start, start)
+        return self[first:] if first else self
+
+    def merge(self, other: "PriceSeries") -> "PriceSeries":
+        """Return this series with the time range of ``other`` replaced by its slots."""
+        if not other:
+            return self
+        first = bisect_left(self.start, other.start[0])
+        last = bisect_right(self.start, other.start[-1])
+        return self[:first] + other + self[last:]
+
+    def stats(self, field: str) -> tuple | None:
+        """Return (min, max, avg) of a price column, or None if empty."""
+        column = getattr(self, field)
+        if not column:
+            return None
+        return min(column), max(column), sum(column) / len(column)
+
+    def as_dicts(self) -> list:
+        """Return the slots in the Tibber API format (legacy attribute view)."""
+        return [price_point.as_dict() for price_point in self]
+
+    def aggregate(self, length: float) -> "PriceSeries":
+        """Return the slots averaged into buckets of ``length`` seconds.
+
+        Buckets are aligned to whole multiples of ``length`` in absolute
+        time, which gives local hours in every zone Tibber operates in,
+        DST days included. Prices are the mean of the slots in a bucket
+        (equal-length slots, so this is the time-weighted mean). Slots
+        already as long as ``length`` are kept.
+
+        Tibber sets a slot's level from fixed ratios to a reference price,
+        so within one day the level rises with the total and the slots of
+        a level span that level's price band. A bucket gets the level of
+        the known slot of this series priced nearest to its averaged total,
+        which places it in the band holding that total (between two bands,
+        the closer one); the series should therefore be one day. The level
+        is UNKNOWN if no slot has a known level.
+        """
+        series = PriceSeries()
+        # Prisgränserna för nivåerna, tagna från dagens kända slottar
+        known = sorted((total, level) for total, level in zip(self.total, self.level) if level)
+        known_totals = array("d", (total for total, _ in known))
+        bucket = None
+        sums = None
+
+        def flush():
+            count = sums[0]
+            total = sums[1] / count
+            series.start.append(bucket)
+            series.total.append(total)
+            series.energy.append(sums[2] / count)
+            series.tax.append(sums[3] / count)
+            if not known:
+                series.level.append(PriceLevel.UNKNOWN)
+                return
+            index = bisect_left(known_totals, total)
+            if index == len(known) or (index and total - known_totals[index - 1] <= known_totals[index] - total):
+                index -= 1
+            series.level.append(known[index][1])
+
+        for start, total, energy, tax in zip(self.start, self.total, self.energy, self.tax):
+            slot_bucket = start - start % length
+            if slot_bucket != bucket:
+                if sums is not None:
+                    flush()
+                bucket = slot_bucket
+                # antal, total, energy, tax
+                sums = [0, 0.0, 0.0, 0.0]
+            sums[0] += 1
+            sums[1] += total
+            sums[2] += energy
+            sums[3] += tax
+
+        if sums is not None:
+            flush()
+        return series
+
+
+def parse_prices(raw_prices) -> PriceSeries:
+    """Return the valid price points of a raw list as a series sorted by start.
+
+    Stored caches in the column format are loaded directly.
+    """
+    if isinstance(raw_prices, dict):
+        return PriceSeries.from_columns(raw_prices)
+
+    prices = []
+    for raw in raw_prices or []:
+        try:
+            prices.append(parse_price_point(raw))
+        except (KeyError, ValueError, TypeError) as err:
+            _LOGGER.error("Error parsing price point: %s", err)
+
+    prices.sort()
+    return PriceSeries.from_points(prices)
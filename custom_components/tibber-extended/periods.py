@@ -0,0 +1,107 @@
+"""Cheapest and most expensive price periods for Tibber Extended."""
+import heapq
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+
+from homeassistant.util import dt as dt_util
+
+MODE_CHEAPEST_WINDOW = "cheapest_window"
+MODE_EXPENSIVE_WINDOW = "expensive_window"
+MODE_CHEAPEST_SLOTS = "cheapest_slots"
+
+PERIOD_MODES = [MODE_CHEAPEST_WINDOW, MODE_EXPENSIVE_WINDOW, MODE_CHEAPEST_SLOTS]
+
+
+def _slot_end(price_point, interval):
+    """Return the ISO end time of a slot."""
+    end = datetime.fromtimestamp(price_point.start + interval.total_seconds(), tz=timezone.utc)
+    return dt_util.as_local(end).isoformat()
+
+
+def find_window(prices, slots, interval, cheapest=True):
+    """Return the contiguous window of ``slots`` slots with the lowest or highest sum.
+
+    Uses prefix sums over the series' total column so every window sum is
+    one subtraction, O(n) in total instead of re-summing each window.
+    """
+    if slots <= 0 or len(prices) < slots:
+        return None
+
+    prefix = [0.0, *accumulate(prices.total)]
+    best_start = None
+    best_sum = None
+    for start in range(len(prices) - slots + 1):
+        window_sum = prefix[start + slots] - prefix[start]
+        if best_sum is None or (window_sum < best_sum if cheapest else window_sum > best_sum):
+            best_start = start
+            best_sum = window_sum
+
+    return {
+        "start": prices[best_start].starts_at,
+        "end": _slot_end(prices[best_start + slots - 1], interval),
+        "average": round(best_sum / slots, 4),
+        "slots": slots,
+    }
+
+
+def find_cheapest_slots(prices, count, interval):
+    """Return the ``count`` cheapest slots, not necessarily contiguous, in time order."""
+    if count <= 0 or not prices:
+        return None
+
+    totals = prices.total
+    selected = heapq.nsmallest(count, range(len(prices)), key=totals.__getitem__)
+    selected.sort()
+    average = sum(totals[i] for i in selected) / len(selected)
+
+    return {
+        "average": round(average, 4),
+        "slots": [
+            {
+                "start": prices[i].starts_at,
+                "end": _slot_end(prices[i], interval),
+                "total": totals[i],
+            }
+            for i in selected
+        ],
+    }
+
+
+def hours_to_slots(hours, interval: timedelta) -> int:
+    """Return how many slots of ``interval`` make up ``hours``."""
+    return max(1, round(timedelta(hours=hours) / interval))
+
+
+def compute_periods(prices, period_hours, cheapest_slots, interval):
+    """Compute all configured periods for one home in a single pass over the data."""
+    periods = {"cheapest": {}, "expensive": {}, "cheapest_slots": None}
+
+    for hours in period_hours:
+        slots = hours_to_slots(hours, interval)
+        periods["cheapest"][hours] = find_window(prices, slots, interval, cheapest=True)
+        periods["expensive"][hours] = find_window(prices, slots, interval, cheapest=False)
+
+    if cheapest_slots:
+        periods["cheapest_slots"] = find_cheapest_slots(prices, cheapest_slots, interval)
+
+    return periods
+
+
+def find_period(prices, mode, hours, count, interval, start=None, end=None):
+    """Run one period search over the slots that lie within ``start``..``end``."""
+    if start is not None or end is not None:
+        # Serien är sorterad på start, så urvalet är ett sammanhängande stycke
+        first = bisect_left(prices.start, start.timestamp()) if start is not None else 0
+        last = (
+            bisect_right(prices.start, end.timestamp() - interval.total_seconds())
+            if end is not None
+            else len(prices)
+        )
+        prices = prices[first:last]
+
+    if mode == MODE_CHEAPEST_SLOTS:
+        return find_cheapest_slots(prices, count, interval)
+
+    slots = hours_to_slots(hours, interval)
+    return find_window(prices, slots, interval, cheapest=mode == MODE_CHEAPEST_WINDOW)
@@ -0,0 +1,74 @@
+"""Price ranking and rule windows for Tibber Extended."""
+import heapq
+from array import array
+from typing import NamedTuple
+
+RULE_CHEAPEST = "cheapest"
+RULE_BELOW_THRESHOLD = "below_threshold"
+
+
+class DayRanking(NamedTuple):
+    """Rank of every slot of one day, 1 being the cheapest."""
+
+    ranks: array
+    average: float
+    count: int
+
+    def percentile(self, position: int) -> float:
+        """Return the slot's percentile, 0 for the cheapest and 100 for the most expensive."""
+        if self.count < 2:
+            return 0.0
+        return round(100 * (self.ranks[position] - 1) / (self.count - 1), 1)
+
+
+def rank_day(prices) -> DayRanking | None:
+    """Rank all slots of one day by total price in a single sort.
+
+    Equal prices share the same rank (1, 2, 2, 4 ...).
+    """
+    totals = prices.total
+    count = len(totals)
+    if not count:
+        return None
+
+    ranks = array("H", bytes(2 * count))
+    rank = 0
+    previous = None
+    for position, index in enumerate(sorted(range(count), key=totals.__getitem__)):
+        if totals[index] != previous:
+            rank = position + 1
+            previous = totals[index]
+        ranks[index] = rank
+
+    return DayRanking(ranks, sum(totals) / count, count)
+
+
+def merge_windows(starts, length: float) -> tuple:
+    """Merge sorted slot starts into (starts, ends) arrays of on-windows."""
+    window_starts = array("d")
+    window_ends = array("d")
+    for start in starts:
+        if window_ends and window_ends[-1] == start:
+            window_ends[-1] = start + length
+        else:
+            window_starts.append(start)
+            window_ends.append(start + length)
+    return window_starts, window_ends
+
+
+def cheapest_windows(days, count: int, length: float) -> tuple:
+    """Return the windows covering the ``count`` cheapest slots of each day."""
+    starts = []
+    for prices in days:
+        totals = prices.total
+        selected = heapq.nsmallest(count, range(len(totals)), key=totals.__getitem__)
+        starts.extend(prices.start[index] for index in selected)
+    return merge_windows(sorted(starts), length)
+
+
+def threshold_windows(prices, threshold: float, length: float) -> tuple:
+    """Return the windows where the total price is below ``threshold``."""
+    return merge_windows(
+        (start for start, total in zip(prices.start, prices.total) if total < threshold),
+        length,
+    )
@@ -0,0 +1,174 @@
+"""Adaptive fetch scheduling for Tibber Extended."""
+import logging
+import random
+from datetime import datetime, time
+
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_call_later, async_track_time_change
+from homeassistant.util import dt as dt_util
+
+_LOGGER = logging.getLogger(__name__)
+
+# Slumpmässig fördröjning så att alla installationer inte anropar samtidigt
+JITTER_MAX = 120  # sekunder
+
+# Pollning efter morgondagens priser: 5, 10, 20, 40 min, sedan var 60:e min
+POLL_BASE_DELAY = 300
+POLL_MAX_DELAY = 3600
+
+# Omförsök efter misslyckad hämtning: 30 s, 1, 2, 4 ... max 30 min
+RETRY_BASE_DELAY = 30
+RETRY_MAX_DELAY = 1800
+
+# Sluta leta efter morgondagens priser efter denna tid
+POLL_CUTOFF = time(23, 0)
+
+# Kontroll strax efter midnatt om dagens priser saknas
+MIDNIGHT_CHECK = time(0, 1)
+
+
+def backoff_delay(attempt: int, base: float, maximum: float) -> float:
+    """Return a capped exponential delay with jitter for an attempt."""
+    delay = min(base * (2 ** attempt), maximum)
+    return delay + random.uniform(0, min(JITTER_MAX, delay / 2))
+
+
+class AdaptiveFetchScheduler:
+    """Poll for tomorrow's prices from their expected publication time.
+
+    Polling starts at the publication time plus a random offset, backs
+    off exponentially while Tibber has not published yet and stops as
+    soon as every home has tomorrow's prices. Failed fetches, including
+    those where the coordinator kept its current prices, are retried on a
+    separate, bounded exponential schedule, never before the Retry-After
+    Tibber asked for.
+    """
+
+    def __init__(self, coordinator, publish_time: time) -> None:
+        """Initialize the scheduler."""
+        self.coordinator = coordinator
+        self.hass = coordinator.hass
+        self.publish_time = publish_time
+        self._poll_attempt = 0
+        self._retry_attempt = 0
+        self._cancel_poll = None
+        self._remove_daily = []
+
+    @callback
+    def async_start(self):
+        """Start scheduling and return a function that stops it."""
+        for check_time in (self.publish_time, MIDNIGHT_CHECK):
+            self._remove_daily.append(
+                async_track_time_change(
+                    self.hass,
+                    self._handle_daily_check,
+                    hour=check_time.hour,
+                    minute=check_time.minute,
+                    second=0,
+                )
+            )
+        _LOGGER.info(
+            "Adaptive fetch scheduled from %02d:%02d",
+            self.publish_time.hour,
+            self.publish_time.minute,
+        )
+
+        # Efter omstart: leta direkt om priser saknas
+        if self._needs_fetch(dt_util.now()):
+            self._schedule_poll(random.uniform(0, JITTER_MAX))
+
+        return self.async_stop
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop all scheduled fetches."""
+        for remove in self._remove_daily:
+            remove()
+        self._remove_daily = []
+        self._cancel_pending()
+
+    @callback
+    def _cancel_pending(self) -> None:
+        """Cancel the next scheduled poll, if any."""
+        if self._cancel_poll:
+            self._cancel_poll()
+            self._cancel_poll = None
+
+    @callback
+    def _schedule_poll(self, delay: float) -> None:
+        """Run a poll after delay seconds."""
+        self._cancel_pending()
+        _LOGGER.debug("Next Tibber poll in %.0f s", delay)
+        self._cancel_poll = async_call_later(self.hass, delay, self._async_poll)
+
+    @callback
+    def _handle_daily_check(self, now: datetime) -> None:
+        """Start a new polling round if prices are missing."""
+        self._poll_attempt = 0
+        self._retry_attempt = 0
+        if self._needs_fetch(now):
+            self._schedule_poll(random.uniform(0, JITTER_MAX))
+        else:
+            _LOGGER.debug("Tomorrow's prices already cached, skipping poll")
+
+    def _needs_fetch(self, now: datetime) -> bool:
+        """Return True if data is missing or tomorrow's prices are due."""
+        data = self.coordinator.data
+        if not data or not self.coordinator.last_update_success:
+            return True
+
+        # Dagens priser saknas eller är gamla (t.ex. om morgondagens aldrig kom)
+        timestamp = now.timestamp()
+        for home_id in data:
+            price_index = self.coordinator.price_index.get(home_id)
+            if not price_index or not price_index[1] or price_index[1][-1] <= timestamp:
+                return True
+
+        publish_time = now.replace(
+            hour=self.publish_time.hour,
+            minute=self.publish_time.minute,
+            second=0,
+            microsecond=0,
+        )
+        if now < publish_time or now.time() >= POLL_CUTOFF:
+            return False
+
+        return any(not self.coordinator.get_prices(home_id, "tomorrow") for home_id in data)
+
+    async def _async_poll(self, _now: datetime) -> None:
+        """Fetch once and schedule the next poll if still needed."""
+        self._cancel_poll = None
+
+        # Data kan ha kommit sedan pollningen schemalades (t.ex. första hämtningen)
+        if not self._needs_fetch(dt_util.now()):
+            self._poll_attempt = 0
+            return
+
+        await self.coordinator.async_refresh()
+
+        # Behållna priser efter ett tillfälligt fel räknas också som misslyckad hämtning
+        if not self.coordinator.last_update_success or self.coordinator.kept_prices:
+            delay = max(
+                backoff_delay(self._retry_attempt, RETRY_BASE_DELAY, RETRY_MAX_DELAY),
+                self.coordinator.retry_after,
+            )
+            self._retry_attempt += 1
+            _LOGGER.warning(
+                "Fetch failed (attempt %s), retrying in %.0f s",
+                self._retry_attempt,
+                delay,
+            )
+            self._schedule_poll(delay)
+            return
+
+        self._retry_attempt = 0
+
+        if not self._needs_fetch(dt_util.now()):
+            _LOGGER.info("Tibber prices complete, polling stopped")
+            self._poll_attempt = 0
+            return
+
+        delay = backoff_delay(self._poll_attempt, POLL_BASE_DELAY, POLL_MAX_DELAY)
+        self._poll_attempt += 1
+        _LOGGER.info("Tomorrow's prices not published yet, polling again in %.0f s", delay)
+        self._schedule_poll(delay)
@@ -1,35 +1,52 @@
 """Sensor platform for Tibber Extended."""
 import logging
-from datetime import datetime, timedelta, time
-import aiohttp
-import asyncio
+from datetime import datetime, timezone
 
-from homeassistant.components.sensor import SensorEntity, SensorDeviceClass
+from homeassistant.components.sensor import (
+    SensorEntity,
+    SensorDeviceClass,
+    SensorStateClass,
+)
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import (
-    CoordinatorEntity,
-    DataUpdateCoordinator,
-    UpdateFailed,
+from homeassistant.const import (
+    PERCENTAGE,
+    EntityCategory,
+    UnitOfEnergy,
+    UnitOfInformation,
+    UnitOfPower,
+    UnitOfTime,
 )
-from homeassistant.helpers.event import async_track_time_change, async_track_time_interval
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.util import dt as dt_util
 
 from .const import (
     DOMAIN,
-    CONF_ACCESS_TOKEN,
-    CONF_RESOLUTION,
-    CONF_UPDATE_TIMES,
     CONF_HOME_NAME,
     CONF_CURRENCY,
-    DEFAULT_UPDATE_TIMES,
+    CONF_ATTRIBUTE_MODE,
     DEFAULT_CURRENCY,
-    TIBBER_API_URL,
+    DEFAULT_ATTRIBUTE_MODE,
+    ATTRIBUTE_MODE_FULL,
+    ATTRIBUTE_MODE_COMPACT,
+    FETCH_RESOLUTION,
+    RESOLUTION_OPTIONS,
+    RESOLUTION_SECONDS,
 )
+from .entity import TibberHomeEntity, TibberOptionsMixin
+from .models import PriceLevel, local_day_bounds
 
 _LOGGER = logging.getLogger(__name__)
 
+LEVEL_ICONS = {
+    PriceLevel.VERY_CHEAP: "mdi:arrow-down-bold",
+    PriceLevel.CHEAP: "mdi:arrow-down",
+    PriceLevel.NORMAL: "mdi:minus",
+    PriceLevel.EXPENSIVE: "mdi:arrow-up",
+    PriceLevel.VERY_EXPENSIVE: "mdi:arrow-up-bold",
+}
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -37,291 +54,140 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up Tibber Extended sensors."""
-    coordinator = TibberDataCoordinator(hass, entry)
-    
-    # Försök hämta data första gången
-    try:
-        await coordinator.async_config_entry_first_refresh()
-    except Exception as err:
-        _LOGGER.error("Failed to fetch initial data: %s", err)
+    coordinator = hass.data[DOMAIN][entry.entry_id]
     
     home_name = entry.data.get(CONF_HOME_NAME, "Mitt Hem")
     currency = entry.data.get(CONF_CURRENCY, DEFAULT_CURRENCY)
+    attribute_mode = entry.data.get(CONF_ATTRIBUTE_MODE, DEFAULT_ATTRIBUTE_MODE)
     entities = []
     
     # Skapa sensor även om ingen data finns än
     if coordinator.data:
         for home_id, home_data in coordinator.data.items():
-            _LOGGER.info(f"Creating sensor for home: {home_id}")
-            entities.append(TibberPriceSensor(coordinator, home_id, home_name, currency))
+            _LOGGER.info("Creating sensor for home: %s", home_id)
+            entities.append(
+                TibberPriceSensor(
+                    coordinator, home_id, coordinator.home_name(home_id), currency, attribute_mode
+                )
+            )
     else:
         _LOGGER.warning("No data available yet, creating sensor anyway")
-        entities.append(TibberPriceSensor(coordinator, "pending", home_name, currency))
-
-    async_add_entities(entities, True)
-    _LOGGER.info(f"Added {len(entities)} Tibber sensors")
-
-
-class TibberDataCoordinator(DataUpdateCoordinator):
-    """Class to manage fetching Tibber data."""
-
-    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
-        """Initialize."""
-        self.token = entry.data[CONF_ACCESS_TOKEN]
-        self.resolution = entry.data.get(CONF_RESOLUTION, "QUARTER_HOURLY")
-        self.update_times = entry.data.get(CONF_UPDATE_TIMES, DEFAULT_UPDATE_TIMES)
-        self.entry = entry
-        self._last_midnight_shift = None  # Håll koll på när vi senast flyttade data
-        
-        # Konvertera update_times till time-objekt
-        self.update_times_parsed = []
-        for time_str in self.update_times:
-            try:
-                hour, minute = map(int, time_str.split(":"))
-                self.update_times_parsed.append(time(hour=hour, minute=minute))
-            except ValueError:
-                _LOGGER.error(f"Invalid time format: {time_str}")
-
-        # Beräkna uppdateringsintervall för sensorn baserat på resolution
-        if self.resolution == "QUARTER_HOURLY":
-            self.sensor_update_interval = timedelta(minutes=15)
-        else:  # HOURLY
-            self.sensor_update_interval = timedelta(hours=1)
-
-        super().__init__(
-            hass,
-            _LOGGER,
-            name=DOMAIN,
-            update_interval=None,
+        entities.append(
+            TibberPriceSensor(coordinator, "pending", home_name, currency, attribute_mode)
         )
-        
-        self._setup_time_triggers()
-
-    def _setup_time_triggers(self):
-        """Setup time-based update triggers."""
-        # Ordinarie uppdateringstider
-        for update_time in self.update_times_parsed:
-            async_track_time_change(
-                self.hass,
-                self._handle_time_trigger,
-                hour=update_time.hour,
-                minute=update_time.minute,
-                second=0,
+
+    # Billigaste/dyraste perioder och rangordning beräknade av coordinatorn
+    for home_id in coordinator.data or {}:
+        name = coordinator.home_name(home_id)
+        # Övriga upplösningar räknas fram ur samma hämtade data
+        entities.extend(
+            TibberResolutionPriceSensor(
+                coordinator, home_id, name, currency, attribute_mode, resolution
             )
-            _LOGGER.info(f"Scheduled data fetch at {update_time.hour:02d}:{update_time.minute:02d}")
-        
-        # Flytta tomorrow → today 5 sekunder före midnatt (UTAN API-anrop)
-        async_track_time_change(
-            self.hass,
-            self._handle_midnight_shift,
-            hour=23,
-            minute=59,
-            second=55,  # 5 sekunder före midnatt
+            for resolution in RESOLUTION_SECONDS
+            if resolution != coordinator.resolution
+        )
+        entities.extend(
+            [
+                TibberDailyAveragePriceSensor(coordinator, home_id, name, currency),
+                TibberPriceRankSensor(coordinator, home_id, name),
+                TibberPricePercentileSensor(coordinator, home_id, name),
+                TibberPriceDeviationSensor(coordinator, home_id, name, currency),
+            ]
         )
-        _LOGGER.info("Scheduled price shift 5 seconds before midnight (23:59:55)")
+        for hours in coordinator.period_hours:
+            entities.extend(
+                [
+                    TibberPeriodSensor(coordinator, home_id, name, "cheapest", hours),
+                    TibberPeriodSensor(coordinator, home_id, name, "expensive", hours),
+                ]
+            )
+        if coordinator.cheapest_slots:
+            entities.append(
+                TibberCheapestSlotsSensor(coordinator, home_id, name, currency)
+            )
 
-    async def _handle_time_trigger(self, now):
-        """Handle time-based update trigger."""
-        _LOGGER.info(f"Time trigger fired at {now}, fetching Tibber data")
-        await self.async_request_refresh()
+    # Realtidssensorer för Tibber Pulse
+    for home_id, stream in coordinator.live_streams.items():
+        name = coordinator.home_name(home_id)
+        entities.extend(
+            [
+                TibberLivePowerSensor(stream, name, currency),
+                TibberLiveEnergySensor(stream, name, currency),
+                TibberLiveCostSensor(stream, name, currency),
+            ]
+        )
 
-    async def _handle_midnight_shift(self, now):
-        """Shift tomorrow prices to today at midnight."""
-        current_date = now.date()
-        
-        # Kontrollera så vi inte kör flera gånger samma natt
-        if self._last_midnight_shift == current_date:
-            _LOGGER.debug("Midnight shift already performed today")
-            return
-        
-        _LOGGER.info(f"Midnight shift triggered at {now}")
-        
-        if not self.data:
-            _LOGGER.warning("No data to shift at midnight")
-            return
-        
-        # Flytta tomorrow → today för alla hem
-        for home_id in self.data.keys():
-            tomorrow_prices = self.data[home_id].get("tomorrow", [])
-            
-            if tomorrow_prices:
-                _LOGGER.info(
-                    f"Shifting {len(tomorrow_prices)} prices from tomorrow to today "
-                    f"for home {home_id}"
-                )
-                
-                # Flytta morgondagens priser till idag
-                self.data[home_id]["today"] = tomorrow_prices
-                # Töm morgondagens priser
-                self.data[home_id]["tomorrow"] = []
-            else:
-                _LOGGER.warning(
-                    f"No tomorrow prices available to shift for home {home_id}"
+    # Förbrukning och kostnad från den stegvisa hämtningen
+    if coordinator.consumption is not None:
+        for home_id in coordinator.data or {}:
+            name = coordinator.home_name(home_id)
+            entities.extend(
+                sensor_class(coordinator.consumption, home_id, name, currency)
+                for sensor_class in (
+                    TibberConsumptionTodaySensor,
+                    TibberConsumptionMonthSensor,
+                    TibberCostTodaySensor,
+                    TibberCostMonthSensor,
                 )
-        
-        # Markera att vi gjort shiften
-        self._last_midnight_shift = current_date
-        
-        # Trigga uppdatering av alla sensorer
-        self.async_set_updated_data(self.data)
-        _LOGGER.info("Midnight shift completed, sensors updated")
+            )
 
-    async def _async_update_data(self):
-        """Fetch data from Tibber API."""
-        _LOGGER.debug(f"Fetching data with resolution: {self.resolution}")
-        
-        query = """
-        {
-            viewer {
-                homes {
-                    id
-                    appNickname
-                    currentSubscription {
-                        priceInfo(resolution: %s) {
-                            today {
-                                total
-                                energy
-                                tax
-                                startsAt
-                                level
-                            }
-                            tomorrow {
-                                total
-                                energy
-                                tax
-                                startsAt
-                                level
-                            }
-                        }
-                    }
-                }
-            }
-        }
-        """ % self.resolution
+    # Diagnostiksensorer för hämtningar och skrivningar (avstängda som standard)
+    entities.extend(
+        sensor_class(coordinator, home_name)
+        for sensor_class in (
+            TibberFetchLatencySensor,
+            TibberPayloadSizeSensor,
+            TibberParseTimeSensor,
+            TibberApiErrorsSensor,
+            TibberStateWritesSensor,
+            TibberCacheHitRateSensor,
+            TibberLastFetchSensor,
+        )
+    )
 
-        headers = {
-            "Authorization": f"Bearer {self.token}",
-            "Content-Type": "application/json",
-        }
+    # Ingen update_before_add - data finns redan (cache eller första hämtningen)
+    async_add_entities(entities)
+    _LOGGER.info("Added %s Tibber sensors", len(entities))
 
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    TIBBER_API_URL,
-                    json={"query": query},
-                    headers=headers,
-                    timeout=aiohttp.ClientTimeout(total=30),
-                ) as response:
-                    if response.status != 200:
-                        raise UpdateFailed(f"API error: {response.status}")
-                    
-                    data = await response.json()
-                    
-                    if "errors" in data:
-                        error_msg = data['errors'][0].get('message', 'Unknown error')
-                        _LOGGER.error(f"GraphQL error: {error_msg}")
-                        raise UpdateFailed(f"GraphQL error: {error_msg}")
-                    
-                    homes_data = {}
-                    viewer_data = data.get("data", {}).get("viewer", {})
-                    homes = viewer_data.get("homes", [])
-                    
-                    if not homes:
-                        _LOGGER.warning("No homes found in Tibber account")
-                        return homes_data
-                    
-                    for home in homes:
-                        home_id = home["id"]
-                        subscription = home.get("currentSubscription")
-                        
-                        if not subscription:
-                            _LOGGER.warning(f"No subscription found for home {home_id}")
-                            continue
-                        
-                        price_info = subscription.get("priceInfo", {})
-                        
-                        homes_data[home_id] = {
-                            "name": home.get("appNickname", "Home"),
-                            "today": price_info.get("today", []),
-                            "tomorrow": price_info.get("tomorrow", []),
-                        }
-                        
-                        _LOGGER.debug(
-                            f"Home {home_id}: {len(homes_data[home_id]['today'])} today prices, "
-                            f"{len(homes_data[home_id]['tomorrow'])} tomorrow prices"
-                        )
-                    
-                    _LOGGER.info(f"Successfully fetched data for {len(homes_data)} home(s)")
-                    return homes_data
-
-        except asyncio.TimeoutError as err:
-            _LOGGER.error(f"Timeout fetching data: {err}")
-            raise UpdateFailed(f"Timeout fetching data: {err}")
-        except aiohttp.ClientError as err:
-            _LOGGER.error(f"Network error: {err}")
-            raise UpdateFailed(f"Error fetching data: {err}")
-        except KeyError as err:
-            _LOGGER.error(f"Unexpected API response structure: {err}")
-            raise UpdateFailed(f"Invalid API response: {err}")
-        except Exception as err:
-            _LOGGER.error(f"Unexpected error: {err}")
-            raise UpdateFailed(f"Unexpected error: {err}")
-
-
-class TibberPriceSensor(CoordinatorEntity, SensorEntity):
+
+class TibberPriceSensor(TibberHomeEntity, SensorEntity):
     """Unified sensor for Tibber electricity prices."""
 
-    def __init__(self, coordinator, home_id, home_name, currency):
+    # Kolumnära prisserier är stora och ska inte sparas av recorder
+    _unrecorded_attributes = frozenset({"today_series", "tomorrow_series"})
+    _tick_updates = True
+
+    def __init__(
+        self,
+        coordinator,
+        home_id,
+        home_name,
+        currency,
+        attribute_mode=DEFAULT_ATTRIBUTE_MODE,
+        resolution=None,
+    ):
         """Initialize the sensor."""
-        super().__init__(coordinator)
-        self._home_id = home_id
+        super().__init__(coordinator, home_id)
+        self._resolution = resolution or coordinator.resolution
         self._home_name = home_name
         self._currency = currency
+        self._attribute_mode = attribute_mode
         self._attr_name = f"{home_name} Electricity Price"
         self._attr_unique_id = f"{home_id}_electricity_price"
         self._attr_native_unit_of_measurement = f"{currency}/kWh"
         self._attr_device_class = SensorDeviceClass.MONETARY
         self._attr_icon = "mdi:flash"
         self._attr_available = False
-        self._update_listeners = []
-        
-        _LOGGER.info(f"Initialized sensor: {self._attr_name} (ID: {self._attr_unique_id})")
-
-    async def async_added_to_hass(self):
-        """When entity is added to hass."""
-        await super().async_added_to_hass()
-
-        # Schedule updates to align with the clock
-        if self.coordinator.resolution == "QUARTER_HOURLY":
-            minutes = [0, 15, 30, 45]
-            _LOGGER.debug(
-                f"Scheduling state updates at minutes {minutes} for {self._attr_name}"
-            )
-        else:  # HOURLY
-            minutes = [0]
-            _LOGGER.debug(
-                f"Scheduling state updates at minute 0 for {self._attr_name}"
-            )
-
-        for minute in minutes:
-            self._update_listeners.append(
-                async_track_time_change(
-                    self.hass, self._update_state, minute=minute, second=1
-                )
-            )
-
-    async def async_will_remove_from_hass(self):
-        """When entity will be removed from hass."""
-        await super().async_will_remove_from_hass()
+        self._day_attrs_cache = None  # (home_version, home_id, day_attrs)
         
-        for remover in self._update_listeners:
-            remover()
-        self._update_listeners = []
+        _LOGGER.info("Initialized sensor: %s (ID: %s)", self._attr_name, self._attr_unique_id)
 
-    async def _update_state(self, now=None):
-        """Force sensor state update."""
-        self.async_write_ha_state()
-        _LOGGER.debug(f"State updated for {self._attr_name}")
+    def _apply_options(self, old, new):
+        """Apply a changed attribute mode along with the name and currency."""
+        super()._apply_options(old, new)
+        self._attribute_mode = new.get(CONF_ATTRIBUTE_MODE, DEFAULT_ATTRIBUTE_MODE)
+        self._day_attrs_cache = None
 
     @property
     def available(self) -> bool:
@@ -336,7 +202,7 @@ class TibberPriceSensor(CoordinatorEntity, SensorEntity):
             first_home_id = list(self.coordinator.data.keys())[0]
             self._home_id = first_home_id
             self._attr_unique_id = f"{first_home_id}_electricity_price"
-            _LOGGER.info(f"Updated home_id from pending to {first_home_id}")
+            _LOGGER.info("Updated home_id from pending to %s", first_home_id)
         
         return self._home_id in self.coordinator.data
 
@@ -345,36 +211,18 @@ class TibberPriceSensor(CoordinatorEntity, SensorEntity):
         if not self.available:
             return None
         
-        now = dt_util.now()
-        today_prices = self.coordinator.data[self._home_id]["today"]
-        
-        # Ingen kombinering behövs - today har alltid rätt data tack vare midnight shift!
-        if not today_prices:
+        # Dagens vy byts automatiskt vid första uppslaget efter midnatt
+        position = self.coordinator.current_position(self._home_id, self._resolution)
+        if position is None:
             return None
-        
-        for price_point in today_prices:
-            try:
-                start_time = dt_util.parse_datetime(price_point["startsAt"])
-                if not start_time:
-                    continue
-                    
-                interval = 15 if self.coordinator.resolution == "QUARTER_HOURLY" else 60
-                end_time = start_time + timedelta(minutes=interval)
-                
-                if start_time <= now < end_time:
-                    return price_point
-            except (KeyError, ValueError, TypeError) as err:
-                _LOGGER.error(f"Error parsing price point: {err}")
-                continue
-        
-        return None
+        return self.coordinator.slot_index[self._home_id][self._resolution][2][position]
 
     @property
     def native_value(self):
         """Return the current total price."""
         price_point = self._get_current_price_point()
         if price_point:
-            return round(price_point.get("total", 0), 4)
+            return round(price_point.total, 4)
         return None
 
     @property
@@ -382,19 +230,67 @@ class TibberPriceSensor(CoordinatorEntity, SensorEntity):
         """Return icon based on current price level."""
         price_point = self._get_current_price_point()
         if price_point:
-            level = price_point.get("level", "UNKNOWN")
-            if level == "VERY_CHEAP":
-                return "mdi:arrow-down-bold"
-            elif level == "CHEAP":
-                return "mdi:arrow-down"
-            elif level == "NORMAL":
-                return "mdi:minus"
-            elif level == "EXPENSIVE":
-                return "mdi:arrow-up"
-            elif level == "VERY_EXPENSIVE":
-                return "mdi:arrow-up-bold"
+            return LEVEL_ICONS.get(price_point.level, "mdi:flash")
         return "mdi:flash"
 
+    def _get_day_attributes(self):
+        """Return the today/tomorrow attributes, cached per home data version.
+
+        The per-day lists and statistics only change when the coordinator
+        gets new data for this home, so they are built once per version
+        instead of on every state write.
+        """
+        data_version = self.coordinator.home_versions.get(self._home_id)
+        cache = self._day_attrs_cache
+        if cache and cache[0] == data_version and cache[1] == self._home_id:
+            return cache[2]
+        
+        today_prices = self.coordinator.get_prices(self._home_id, "today", self._resolution)
+        tomorrow_prices = self.coordinator.get_prices(self._home_id, "tomorrow", self._resolution)
+        
+        def calculate_stats(prices, field):
+            """Calculate min/max/avg for a specific field."""
+            stats = prices.stats(field)
+            if stats:
+                return {
+                    "min": round(stats[0], 4),
+                    "max": round(stats[1], 4),
+                    "avg": round(stats[2], 4),
+                }
+            return {}
+        
+        day_attrs = {}
+        for day, prices in (("today", today_prices), ("tomorrow", tomorrow_prices)):
+            day_attrs[day] = {
+                "count": len(prices),
+                "total": calculate_stats(prices, "total"),
+                "energy": calculate_stats(prices, "energy"),
+            }
+            if self._attribute_mode == ATTRIBUTE_MODE_FULL:
+                day_attrs[day] = {"prices": prices.as_dicts(), **day_attrs[day]}
+            elif self._attribute_mode == ATTRIBUTE_MODE_COMPACT:
+                day_attrs[f"{day}_series"] = self._build_series(prices)
+        
+        self._day_attrs_cache = (data_version, self._home_id, day_attrs)
+        return day_attrs
+
+    def _build_series(self, prices):
+        """Return prices as parallel columns with one base timestamp.
+
+        Slot i starts at ``start + i * interval`` minutes, which keeps the
+        payload small and is correct on DST days since the offsets are in
+        absolute time.
+        """
+        interval = RESOLUTION_SECONDS[self._resolution] // 60
+        return {
+            "start": prices[0].starts_at if prices else None,
+            "interval": interval,
+            "total": prices.total.tolist(),
+            "energy": prices.energy.tolist(),
+            "tax": prices.tax.tolist(),
+            "level": prices.level.tolist(),
+        }
+
     @property
     def extra_state_attributes(self):
         """Return the state attributes."""
@@ -406,51 +302,26 @@ class TibberPriceSensor(CoordinatorEntity, SensorEntity):
                 "current_level": "UNKNOWN",
                 "current_starts_at": None,
                 "currency": self._currency,
-                "resolution": self.coordinator.resolution,
+                "resolution": self._resolution,
                 "today": {"prices": [], "count": 0},
                 "tomorrow": {"prices": [], "count": 0},
             }
         
-        today_prices = self.coordinator.data[self._home_id]["today"]
-        tomorrow_prices = self.coordinator.data[self._home_id]["tomorrow"]
-        
         current_price_point = self._get_current_price_point()
         
-        def calculate_stats(prices, field):
-            """Calculate min/max/avg for a specific field."""
-            values = [p.get(field, 0) for p in prices if field in p]
-            if values:
-                return {
-                    "min": round(min(values), 4),
-                    "max": round(max(values), 4),
-                    "avg": round(sum(values) / len(values), 4),
-                }
-            return {}
-        
         attrs = {
             "currency": self._currency,
-            "resolution": self.coordinator.resolution,
-            "today": {
-                "prices": today_prices,
-                "count": len(today_prices),
-                "total": calculate_stats(today_prices, "total"),
-                "energy": calculate_stats(today_prices, "energy"),
-            },
-            "tomorrow": {
-                "prices": tomorrow_prices,
-                "count": len(tomorrow_prices),
-                "total": calculate_stats(tomorrow_prices, "total"),
-                "energy": calculate_stats(tomorrow_prices, "energy"),
-            },
+            "resolution": self._resolution,
+            **self._get_day_attributes(),
         }
         
         if current_price_point:
             attrs.update({
-                "current_total": round(current_price_point.get("total", 0), 4),
-                "current_energy": round(current_price_point.get("energy", 0), 4),
-                "current_tax": round(current_price_point.get("tax", 0), 4),
-                "current_level": current_price_point.get("level", "UNKNOWN"),
-                "current_starts_at": current_price_point.get("startsAt"),
+                "current_total": round(current_price_point.total, 4),
+                "current_energy": round(current_price_point.energy, 4),
+                "current_tax": round(current_price_point.tax, 4),
+                "current_level": current_price_point.level.name,
+                "current_starts_at": current_price_point.starts_at,
             })
         else:
             attrs.update({
@@ -462,3 +333,630 @@ class TibberPriceSensor(CoordinatorEntity, SensorEntity):
             })
         
         return attrs
+
+
+class TibberResolutionPriceSensor(TibberPriceSensor):
+    """Price sensor for a resolution other than the configured one.
+
+    Hourly prices are averaged from the fetched quarter hours by the
+    coordinator, so this needs neither another API call nor another
+    config entry. Disabled by default since most users only need one.
+    """
+
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(self, coordinator, home_id, home_name, currency, attribute_mode, resolution):
+        """Initialize the sensor."""
+        super().__init__(coordinator, home_id, home_name, currency, attribute_mode, resolution)
+        self._attr_name = f"{home_name} Electricity Price {RESOLUTION_OPTIONS[resolution]}"
+        self._attr_unique_id = f"{home_id}_electricity_price_{resolution.lower()}"
+
+
+class TibberDailyAveragePriceSensor(TibberHomeEntity, SensorEntity):
+    """Today's average price, averaged from the fetched quarter hours."""
+
+    _attr_icon = "mdi:chart-line-variant"
+
+    def __init__(self, coordinator, home_id, home_name, currency):
+        """Initialize the sensor."""
+        super().__init__(coordinator, home_id)
+        self._attr_name = f"{home_name} Average Electricity Price Today"
+        self._attr_unique_id = f"{home_id}_average_price_today"
+        self._attr_native_unit_of_measurement = f"{currency}/kWh"
+
+    def _get_stats(self, day):
+        """Return (min, max, avg) of a day's total price."""
+        return self.coordinator.get_prices(self._home_id, day, FETCH_RESOLUTION).stats("total")
+
+    @property
+    def available(self) -> bool:
+        """Return if entity is available."""
+        return super().available and self._get_stats("today") is not None
+
+    @property
+    def native_value(self):
+        """Return today's average price."""
+        stats = self._get_stats("today")
+        return round(stats[2], 4) if stats else None
+
+    @property
+    def extra_state_attributes(self):
+        """Return today's range and tomorrow's average and range."""
+        today = self._get_stats("today")
+        tomorrow = self._get_stats("tomorrow")
+        return {
+            "today_min": round(today[0], 4) if today else None,
+            "today_max": round(today[1], 4) if today else None,
+            "tomorrow_average": round(tomorrow[2], 4) if tomorrow else None,
+            "tomorrow_min": round(tomorrow[0], 4) if tomorrow else None,
+            "tomorrow_max": round(tomorrow[1], 4) if tomorrow else None,
+        }
+
+
+class TibberPeriodSensor(TibberHomeEntity, SensorEntity):
+    """Start time of the cheapest or most expensive period of a given length."""
+
+    _attr_device_class = SensorDeviceClass.TIMESTAMP
+
+    def __init__(self, coordinator, home_id, home_name, kind, hours):
+        """Initialize the sensor."""
+        super().__init__(coordinator, home_id)
+        self._kind = kind
+        self._hours = hours
+        label = "Cheapest" if kind == "cheapest" else "Most Expensive"
+        self._attr_name = f"{home_name} {label} {hours}h Period"
+        self._attr_unique_id = f"{home_id}_{kind}_{hours}h_period"
+        self._attr_icon = "mdi:cash-clock" if kind == "cheapest" else "mdi:cash-remove"
+
+    def _get_period(self):
+        """Return the precomputed period, if any."""
+        return self.coordinator.periods.get(self._home_id, {}).get(self._kind, {}).get(self._hours)
+
+    @property
+    def available(self) -> bool:
+        """Return if entity is available."""
+        return super().available and self._get_period() is not None
+
+    @property
+    def native_value(self):
+        """Return when the period starts."""
+        period = self._get_period()
+        if period:
+            return dt_util.parse_datetime(period["start"])
+        return None
+
+    @property
+    def extra_state_attributes(self):
+        """Return end time and average price of the period."""
+        period = self._get_period()
+        if not period:
+            return {}
+        return {
+            "end": period["end"],
+            "average": period["average"],
+            "hours": self._hours,
+        }
+
+
+class TibberCheapestSlotsSensor(TibberHomeEntity, SensorEntity):
+    """Average price of the N cheapest slots, which need not be contiguous."""
+
+    _attr_icon = "mdi:sort-numeric-ascending"
+
+    def __init__(self, coordinator, home_id, home_name, currency):
+        """Initialize the sensor."""
+        super().__init__(coordinator, home_id)
+        self._attr_name = f"{home_name} Cheapest Slots"
+        self._attr_unique_id = f"{home_id}_cheapest_slots"
+        self._attr_native_unit_of_measurement = f"{currency}/kWh"
+
+    def _get_slots(self):
+        """Return the precomputed cheapest slots, if any."""
+        return self.coordinator.periods.get(self._home_id, {}).get("cheapest_slots")
+
+    @property
+    def available(self) -> bool:
+        """Return if entity is available."""
+        return super().available and self._get_slots() is not None
+
+    @property
+    def native_value(self):
+        """Return the average price of the selected slots."""
+        slots = self._get_slots()
+        return slots["average"] if slots else None
+
+    @property
+    def extra_state_attributes(self):
+        """Return the selected slots in time order."""
+        slots = self._get_slots()
+        if not slots:
+            return {}
+        return {"count": len(slots["slots"]), "slots": slots["slots"]}
+
+
+class TibberRankingSensor(TibberHomeEntity, SensorEntity):
+    """Base sensor describing the current slot within today's ranking."""
+
+    _tick_updates = True
+
+    def __init__(self, coordinator, home_id, home_name):
+        """Initialize the sensor."""
+        super().__init__(coordinator, home_id)
+        self._attr_name = f"{home_name} {self._name_suffix}"
+        self._attr_unique_id = f"{home_id}_{self._unique_suffix}"
+
+    def _get_current(self):
+        """Return today's ranking and the current slot's position, if known."""
+        ranking = self.coordinator.rankings.get(self._home_id, {}).get("today")
+        position = self.coordinator.current_position(self._home_id)
+        if ranking is None or position is None:
+            return None, None
+        return ranking, position
+
+    @property
+    def available(self) -> bool:
+        """Return if entity is available."""
+        return super().available and self._get_current()[0] is not None
+
+
+class TibberPriceRankSensor(TibberRankingSensor):
+    """Rank of the current slot among today's slots, 1 being the cheapest."""
+
+    _name_suffix = "Price Rank"
+    _unique_suffix = "price_rank"
+    _attr_icon = "mdi:podium"
+
+    @property
+    def native_value(self):
+        """Return the current slot's rank."""
+        ranking, position = self._get_current()
+        return ranking.ranks[position] if ranking else None
+
+    @property
+    def extra_state_attributes(self):
+        """Return how many slots today has."""
+        ranking, _ = self._get_current()
+        return {"count": ranking.count if ranking else None}
+
+
+class TibberPricePercentileSensor(TibberRankingSensor):
+    """Percentile of the current slot, 0 for today's cheapest."""
+
+    _name_suffix = "Price Percentile"
+    _unique_suffix = "price_percentile"
+    _attr_icon = "mdi:percent-outline"
+    _attr_native_unit_of_measurement = PERCENTAGE
+
+    @property
+    def native_value(self):
+        """Return the current slot's percentile."""
+        ranking, position = self._get_current()
+        return ranking.percentile(position) if ranking else None
+
+
+class TibberPriceDeviationSensor(TibberRankingSensor):
+    """Difference between the current price and today's average."""
+
+    _name_suffix = "Price Deviation"
+    _unique_suffix = "price_deviation"
+    _attr_icon = "mdi:plus-minus-variant"
+
+    def __init__(self, coordinator, home_id, home_name, currency):
+        """Initialize the sensor."""
+        super().__init__(coordinator, home_id, home_name)
+        self._attr_native_unit_of_measurement = f"{currency}/kWh"
+
+    def _get_deviation(self):
+        """Return (deviation, average) for the current slot."""
+        ranking, position = self._get_current()
+        if ranking is None:
+            return None, None
+        total = self.coordinator.price_index[self._home_id][2].total[position]
+        return total - ranking.average, ranking.average
+
+    @property
+    def native_value(self):
+        """Return the deviation from today's average."""
+        deviation, _ = self._get_deviation()
+        return round(deviation, 4) if deviation is not None else None
+
+    @property
+    def extra_state_attributes(self):
+        """Return the average and the deviation in percent."""
+        deviation, average = self._get_deviation()
+        if deviation is None:
+            return {}
+        return {
+            "average": round(average, 4),
+            "deviation_percent": round(100 * deviation / average, 1) if average else None,
+        }
+
+
+class TibberLiveSensor(TibberOptionsMixin, SensorEntity):
+    """Base sensor fed by a throttled liveMeasurement stream."""
+
+    _attr_should_poll = False
+    _measurement_key = None
+
+    def __init__(self, stream, home_name, currency):
+        """Initialize the sensor."""
+        self._stream = stream
+        self._currency = currency
+        self._attr_name = f"{home_name} {self._name_suffix}"
+        self._attr_unique_id = f"{stream.home_id}_{self._unique_suffix}"
+
+    async def async_added_to_hass(self):
+        """Listen for stream updates when added to hass."""
+        await super().async_added_to_hass()
+        self.async_on_remove(self._stream.async_add_listener(self._handle_stream_update))
+
+    @callback
+    def _handle_stream_update(self):
+        """Write state once per throttle window."""
+        self.async_write_ha_state()
+
+    @property
+    def available(self) -> bool:
+        """Return if a measurement has been received."""
+        return self._stream.data is not None
+
+    @property
+    def native_value(self):
+        """Return the latest value for this measurement."""
+        if self._stream.data is None:
+            return None
+        return self._stream.data.get(self._measurement_key)
+
+
+class TibberLivePowerSensor(TibberLiveSensor):
+    """Current power consumption from Tibber Pulse."""
+
+    _name_suffix = "Power"
+    _unique_suffix = "live_power"
+    _measurement_key = "power"
+    _attr_device_class = SensorDeviceClass.POWER
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = UnitOfPower.WATT
+
+    @property
+    def extra_state_attributes(self):
+        """Return min/max of the coalesced window."""
+        data = self._stream.data or {}
+        return {
+            "power_min": data.get("power_min"),
+            "power_max": data.get("power_max"),
+            "power_production": data.get("powerProduction"),
+            "samples": data.get("samples", 0),
+            "timestamp": data.get("timestamp"),
+        }
+
+
+class TibberLiveEnergySensor(TibberLiveSensor):
+    """Accumulated consumption since midnight from Tibber Pulse."""
+
+    _name_suffix = "Accumulated Consumption"
+    _unique_suffix = "live_accumulated_consumption"
+    _measurement_key = "accumulatedConsumption"
+    _attr_device_class = SensorDeviceClass.ENERGY
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
+
+
+class TibberLiveCostSensor(TibberLiveSensor):
+    """Accumulated cost since midnight from Tibber Pulse."""
+
+    _name_suffix = "Accumulated Cost"
+    _unique_suffix = "live_accumulated_cost"
+    _measurement_key = "accumulatedCost"
+    _attr_device_class = SensorDeviceClass.MONETARY
+    _attr_state_class = SensorStateClass.TOTAL
+
+    def __init__(self, stream, home_name, currency):
+        """Initialize the sensor."""
+        super().__init__(stream, home_name, currency)
+        self._attr_native_unit_of_measurement = currency
+
+    @property
+    def last_reset(self):
+        """Return the local midnight where Tibber restarts the sum."""
+        # Mätningens dygn, så att ett värde från före midnatt inte hamnar på det nya dygnet
+        timestamp = (self._stream.data or {}).get("timestamp")
+        measured = dt_util.parse_datetime(timestamp) if timestamp else None
+        return dt_util.start_of_local_day(dt_util.as_local(measured).date() if measured else None)
+
+
+class TibberConsumptionSensor(TibberOptionsMixin, CoordinatorEntity, SensorEntity):
+    """Base sensor summing a home's stored hourly consumption over a period.
+
+    Tibber meters hours with a delay, so the sum covers the hours received
+    so far; ``data_until`` tells how far that is.
+    """
+
+    _attr_device_class = SensorDeviceClass.ENERGY
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
+    _month = False
+
+    def __init__(self, coordinator, home_id, home_name, currency):
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self._home_id = home_id
+        self._currency = currency
+        self._attr_name = f"{home_name} {self._name_suffix}"
+        self._attr_unique_id = f"{home_id}_{self._unique_suffix}"
+
+    def _get_period(self) -> tuple[float, float]:
+        """Return the (start, end) epoch seconds of today or this month."""
+        today = dt_util.now().date()
+        start, end = local_day_bounds(today)
+        if self._month:
+            start = local_day_bounds(today.replace(day=1))[0]
+        return start, end
+
+    def _get_totals(self):
+        """Return (consumption, cost, hours) of the period, or None without data."""
+        history = self.coordinator.homes.get(self._home_id)
+        if history is None:
+            return None
+        return history.totals(*self._get_period())
+
+    @property
+    def available(self) -> bool:
+        """Return if entity is available."""
+        return super().available and self._home_id in self.coordinator.homes
+
+    @property
+    def native_value(self):
+        """Return the consumption of the period in kWh."""
+        totals = self._get_totals()
+        return round(totals[0], 3) if totals else None
+
+    @property
+    def extra_state_attributes(self):
+        """Return the number of metered hours and the end of the newest one."""
+        totals = self._get_totals()
+        if totals is None:
+            return {}
+        last_start = self.coordinator.homes[self._home_id].last_start
+        return {
+            "hours": totals[2],
+            "data_until": _as_local(last_start + 3600).isoformat() if last_start is not None else None,
+        }
+
+
+class TibberConsumptionTodaySensor(TibberConsumptionSensor):
+    """Metered consumption today."""
+
+    _name_suffix = "Consumption Today"
+    _unique_suffix = "consumption_today"
+
+
+class TibberConsumptionMonthSensor(TibberConsumptionSensor):
+    """Metered consumption this month."""
+
+    _name_suffix = "Consumption This Month"
+    _unique_suffix = "consumption_month"
+    _month = True
+
+
+class TibberCostSensor(TibberConsumptionSensor):
+    """Base sensor for the cost of the period's metered consumption.
+
+    The cost is Tibber's per hour, or computed from the hour's price when
+    Tibber has none.
+    """
+
+    _attr_device_class = SensorDeviceClass.MONETARY
+    _attr_state_class = SensorStateClass.TOTAL
+
+    def __init__(self, coordinator, home_id, home_name, currency):
+        """Initialize the sensor."""
+        super().__init__(coordinator, home_id, home_name, currency)
+        self._attr_native_unit_of_measurement = currency
+
+    @property
+    def last_reset(self):
+        """Return the start of the period."""
+        return _as_local(self._get_period()[0])
+
+    @property
+    def native_value(self):
+        """Return the cost of the period."""
+        totals = self._get_totals()
+        return round(totals[1], 2) if totals else None
+
+    @property
+    def extra_state_attributes(self):
+        """Return the average price paid along with the metered hours."""
+        totals = self._get_totals()
+        if totals is None:
+            return {}
+        consumption, cost, _ = totals
+        return {
+            **super().extra_state_attributes,
+            "consumption": round(consumption, 3),
+            "average_price": round(cost / consumption, 4) if consumption else None,
+        }
+
+
+class TibberCostTodaySensor(TibberCostSensor):
+    """Cost of the metered consumption today."""
+
+    _name_suffix = "Cost Today"
+    _unique_suffix = "cost_today"
+
+
+class TibberCostMonthSensor(TibberCostSensor):
+    """Cost of the metered consumption this month."""
+
+    _name_suffix = "Cost This Month"
+    _unique_suffix = "cost_month"
+    _month = True
+
+
+class TibberDiagnosticSensor(TibberOptionsMixin, CoordinatorEntity, SensorEntity):
+    """Base sensor exposing one of the coordinator's runtime metrics."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(self, coordinator, home_name):
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self._metrics = coordinator.metrics
+        self._attr_name = f"{home_name} {self._name_suffix}"
+        self._attr_unique_id = f"{coordinator.entry.entry_id}_{self._unique_suffix}"
+
+    @property
+    def available(self) -> bool:
+        """Metrics are available even when the last fetch failed."""
+        return True
+
+
+class TibberHistogramSensor(TibberDiagnosticSensor):
+    """Last observed value of a histogram, with the histogram as attributes."""
+
+    _histogram = None
+
+    @property
+    def native_value(self):
+        """Return the last observation."""
+        return getattr(self._metrics, self._histogram).last
+
+    @property
+    def extra_state_attributes(self):
+        """Return count, mean, min, max and bucket counts."""
+        return getattr(self._metrics, self._histogram).as_dict()
+
+
+class TibberFetchLatencySensor(TibberHistogramSensor):
+    """Round-trip time of the latest Tibber API request."""
+
+    _name_suffix = "Fetch Latency"
+    _unique_suffix = "fetch_latency"
+    _histogram = "fetch_latency"
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+
+
+class TibberPayloadSizeSensor(TibberHistogramSensor):
+    """Size of the latest Tibber API response."""
+
+    _name_suffix = "Payload Size"
+    _unique_suffix = "payload_size"
+    _histogram = "payload_bytes"
+    _attr_device_class = SensorDeviceClass.DATA_SIZE
+    _attr_native_unit_of_measurement = UnitOfInformation.BYTES
+
+
+class TibberParseTimeSensor(TibberHistogramSensor):
+    """Time spent parsing the latest price response."""
+
+    _name_suffix = "Parse Time"
+    _unique_suffix = "parse_time"
+    _histogram = "parse_time"
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+
+
+class TibberApiErrorsSensor(TibberDiagnosticSensor):
+    """Number of GraphQL errors, with HTTP/network errors as attributes."""
+
+    _name_suffix = "API Errors"
+    _unique_suffix = "api_errors"
+    _attr_icon = "mdi:alert-circle-outline"
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    @property
+    def native_value(self):
+        """Return the number of GraphQL errors."""
+        return self._metrics.counters["graphql_errors"]
+
+    @property
+    def extra_state_attributes(self):
+        """Return the other request counters."""
+        return {
+            "api_errors": self._metrics.counters["api_errors"],
+            "rate_limited": self._metrics.counters["rate_limited"],
+            "cached_fallbacks": self._metrics.counters["cached_fallbacks"],
+            "fetches": self._metrics.counters["fetches"],
+        }
+
+
+class TibberStateWritesSensor(TibberDiagnosticSensor):
+    """State writes of the home entities during the last hour.
+
+    Counts every home entity of the config entries sharing the token, and
+    is refreshed at each slot boundary so the count does not wait for the
+    next fetch.
+    """
+
+    _name_suffix = "State Writes per Hour"
+    _unique_suffix = "state_writes_per_hour"
+    _attr_icon = "mdi:database-edit-outline"
+    _attr_native_unit_of_measurement = "writes/h"
+
+    async def async_added_to_hass(self):
+        """Refresh the count at every slot boundary when added to hass."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.coordinator.async_add_tick_listener(self.async_write_ha_state)
+        )
+
+    @property
+    def native_value(self):
+        """Return the number of writes during the last hour."""
+        return self._metrics.state_writes_per_hour
+
+    @property
+    def extra_state_attributes(self):
+        """Return the total number of writes."""
+        return {"total": self._metrics.counters["state_writes"]}
+
+
+class TibberCacheHitRateSensor(TibberDiagnosticSensor):
+    """Share of price requests served without calling the API."""
+
+    _name_suffix = "Cache Hit Rate"
+    _unique_suffix = "cache_hit_rate"
+    _attr_icon = "mdi:cached"
+    _attr_native_unit_of_measurement = PERCENTAGE
+
+    @property
+    def native_value(self):
+        """Return the hit rate in percent."""
+        return self._metrics.cache_hit_rate
+
+    @property
+    def extra_state_attributes(self):
+        """Return hits and misses."""
+        return {
+            "hits": self._metrics.counters["cache_hits"],
+            "misses": self._metrics.counters["cache_misses"],
+        }
+
+
+class TibberLastFetchSensor(TibberDiagnosticSensor):
+    """Time of the latest successful fetch, per home as attributes."""
+
+    _name_suffix = "Last Successful Fetch"
+    _unique_suffix = "last_successful_fetch"
+    _attr_device_class = SensorDeviceClass.TIMESTAMP
+
+    @property
+    def native_value(self):
+        """Return the latest successful fetch for any home."""
+        return max(self._metrics.last_success.values(), default=None)
+
+    @property
+    def extra_state_attributes(self):
+        """Return the latest successful fetch per home."""
+        return {
+            home_id: timestamp.isoformat()
+            for home_id, timestamp in self._metrics.last_success.items()
+        }
+
+
+def _as_local(timestamp: float) -> datetime:
+    """Return an epoch timestamp as a local datetime."""
+    return dt_util.as_local(datetime.fromtimestamp(timestamp, tz=timezone.utc))
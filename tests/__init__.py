@@ -0,0 +1 @@
+"""Tests for Tibber Extended."""
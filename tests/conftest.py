@@ -0,0 +1,70 @@
+"""Fixtures for Tibber Extended tests."""
+import sys
+import types
+from pathlib import Path
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from aiohttp import web
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+ROOT = Path(__file__).resolve().parent.parent
+PACKAGE = "tibber_extended"
+
+# Katalognamnet har bindestreck - ladda modulerna som ett namnrymdspaket,
+# så att setup-koden i __init__.py inte körs
+_package = types.ModuleType(PACKAGE)
+_package.__path__ = [str(ROOT / "custom_components" / "tibber-extended")]
+sys.modules.setdefault(PACKAGE, _package)
+from .helpers.mock_server import GRAPHQL_PATH, MockOptions, create_app  # noqa: E402
+from tibber_extended import api  # noqa: E402
+from tibber_extended.const import DOMAIN  # noqa: E402
+from tibber_extended.coordinator import TibberDataCoordinator  # noqa: E402
+from tibber_extended.models import PriceLevel, PricePoint, PriceSeries  # noqa: E402
+
+HOME_ID = "home"
+QUARTER = 900.0
+# Kvartspriser från dagens lokala midnatt: 00:00 kostar 0, 00:15 kostar 1 ...
+PRICE_DAYS = 2
+
+
+@pytest.fixture
+async def mock_tibber(socket_enabled):
+    """Run the local Tibber stand-in and point the API client at it."""
+    app, mock = create_app(MockOptions(live_interval=0.01))
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    host, port = runner.addresses[0][:2]
+    with patch.object(api, "TIBBER_API_URL", f"http://{host}:{port}{GRAPHQL_PATH}"):
+        yield mock
+    await runner.cleanup()
+
+
+@pytest.fixture
+async def price_coordinator(hass: HomeAssistant, freezer) -> TibberDataCoordinator:
+    """Return a price coordinator holding today's and tomorrow's quarter hours for HOME_ID.
+
+    Time is frozen at 06:00 local time on the first day.
+    """
+    today = dt_util.now().date()
+    freezer.move_to(dt_util.start_of_local_day(today) + timedelta(hours=6))
+    start = dt_util.start_of_local_day(today).timestamp()
+    end = dt_util.start_of_local_day(today + timedelta(days=PRICE_DAYS)).timestamp()
+    timeline = PriceSeries.from_points(
+        PricePoint(start + index * QUARTER, float(index), index / 2, 0.25, PriceLevel.NORMAL)
+        for index in range(int((end - start) // QUARTER))
+    )
+
+    entry = MockConfigEntry(domain=DOMAIN, data={"access_token": "token", "resolution": "QUARTER_HOURLY"})
+    coordinator = TibberDataCoordinator(hass, entry)
+    # Inga schemalagda hämtningar när tiden flyttas
+    coordinator._cancel_time_triggers()
+    data = {HOME_ID: {"prices": timeline, "name": "Home", "currency": "SEK"}}
+    coordinator._build_price_index(data)
+    coordinator.data = data
+    yield coordinator
+    coordinator._cancel_tick()
@@ -0,0 +1 @@
+"""Local Tibber stand-in and synthetic payloads, shared by the tests and benchmarks."""
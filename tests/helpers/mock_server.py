@@ -0,0 +1,424 @@
+"""Local stand-in for the Tibber GraphQL API.
+
+Serves synthetic ``priceInfo`` (all homes via ``viewer.homes`` or selected
+homes via ``viewer.home(id:)`` aliases), the account's home list,
+cursor-paginated hourly ``consumption`` and a minimal graphql-transport-ws
+endpoint streaming ``liveMeasurement``, with no network access. Faults
+can be injected to check how the integration behaves under load:
+
+- latency per request (mean and jitter)
+- HTTP 429 with ``Retry-After``, from a per-token limit and/or at random
+- HTTP 500 and GraphQL errors at random
+- late publication of tomorrow's prices
+- live streams that complete after a number of measurements, and
+  websocket connections rejected with close code 4403
+
+The server does not parse GraphQL. It tells the integration's queries
+apart by their fields and variables, which is enough to serve them.
+``benchmarks/load_test.py`` runs it in-process and points the integration's client
+at it; it can also be run on its own::
+
+    python -m tests.helpers.mock_server --homes 10 --port 8910
+
+``GET /stats`` returns request counters. The token ``invalid`` is always
+rejected, any other token is accepted. Every token is its own account,
+with home ids of its own, so entries with different tokens never share
+homes.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import math
+import random
+import re
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+from aiohttp import WSMsgType, web
+
+from .payloads import day_prices, home_id
+
+GRAPHQL_PATH = "/v1-beta/gql"
+WEBSOCKET_PATH = "/v1-beta/gql/subscriptions"
+WS_PROTOCOL = "graphql-transport-ws"
+# Stängningskoder enligt graphql-transport-ws
+WS_UNAUTHORIZED = 4401
+WS_FORBIDDEN = 4403
+INVALID_TOKEN = "invalid"
+# Alias för valda hem i integrationens frågor: home0, home1 ...
+HOME_VARIABLE = re.compile(r"^home\d+$")
+
+
+@dataclass
+class MockOptions:
+    """Account shape and faults served by the mock."""
+
+    homes: int = 1
+    time_zone: str = "Europe/Stockholm"
+    latency: float = 0.0  # sekunder, medel
+    jitter: float = 0.0  # sekunder, +/- runt medel
+    rate_limit: int = 0  # anrop per rate_period och token, 0 = av
+    rate_period: float = 300.0
+    retry_after: int = 60
+    http_429_rate: float = 0.0
+    error_rate: float = 0.0
+    graphql_error_rate: float = 0.0
+    tomorrow_at: str = "00:00"  # lokal tid då morgondagens priser publiceras
+    consumption_delay: int = 2  # timmar innan förbrukning är uppmätt
+    consumption_days: int = 8
+    live_interval: float = 2.0  # sekunder mellan mätningar
+    live_measurements: int = 0  # mätningar innan prenumerationen avslutas, 0 = aldrig
+    live_reject: bool = False  # avvisa connection_init med 4403
+
+
+class MockTibber:
+    """Request handlers and counters of the stand-in server."""
+
+    def __init__(self, options: MockOptions) -> None:
+        """Initialize the mock."""
+        self.options = options
+        self.tz = ZoneInfo(options.time_zone)
+        hour, minute = map(int, options.tomorrow_at.split(":"))
+        self._publish_at = (hour, minute)
+        self._requests = {}
+        self._accounts = {}
+        self.stats = Counter()
+
+    def _rate_limited(self, token: str) -> bool:
+        """Return True if the token has used up its requests in the window."""
+        if not self.options.rate_limit:
+            return False
+        now = time.monotonic()
+        window = self._requests.setdefault(token, deque())
+        while window and window[0] <= now - self.options.rate_period:
+            window.popleft()
+        if len(window) >= self.options.rate_limit:
+            return True
+        window.append(now)
+        return False
+
+    def _account(self, token: str) -> int:
+        """Return the account number of a token, in order of first use."""
+        return self._accounts.setdefault(token, len(self._accounts))
+
+    async def handle_graphql(self, request: web.Request) -> web.Response:
+        """Answer one GraphQL POST, with the configured faults."""
+        self.stats["requests"] += 1
+        options = self.options
+        if options.latency or options.jitter:
+            await asyncio.sleep(max(0.0, random.uniform(-1, 1) * options.jitter + options.latency))
+
+        token = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        if random.random() < options.http_429_rate or self._rate_limited(token):
+            self.stats["http_429"] += 1
+            return web.Response(status=429, headers={"Retry-After": str(options.retry_after)})
+        if random.random() < options.error_rate:
+            self.stats["http_500"] += 1
+            return web.Response(status=500)
+
+        body = await request.json()
+        query = body.get("query", "")
+        variables = body.get("variables") or {}
+        if token == INVALID_TOKEN or random.random() < options.graphql_error_rate:
+            self.stats["graphql_errors"] += 1
+            return web.json_response({"errors": [{"message": "Mock GraphQL error"}]})
+
+        account = self._account(token)
+        if "consumption(" in query:
+            kind, data = "consumption", self._consumption(variables, account)
+        elif "priceInfo" in query:
+            kind, data = "prices", self._prices(query, variables, account)
+        elif "websocketSubscriptionUrl" in query:
+            url = request.url.with_scheme("ws").with_path(WEBSOCKET_PATH)
+            kind, data = "websocket", {"viewer": {"websocketSubscriptionUrl": str(url)}}
+        else:
+            kind, data = "homes", {
+                "viewer": {
+                    "homes": [
+                        {"id": home_id(home, account), "appNickname": f"Home {home}"}
+                        for home in range(options.homes)
+                    ]
+                }
+            }
+
+        payload = json.dumps({"data": data}).encode()
+        self.stats[kind] += 1
+        self.stats["bytes_sent"] += len(payload)
+        return web.Response(body=payload, content_type="application/json")
+
+    async def handle_websocket(self, request: web.Request) -> web.WebSocketResponse:
+        """Serve liveMeasurement subscriptions over graphql-transport-ws.
+
+        Supports what the integration uses: connection_init/connection_ack,
+        subscribe with ``next`` messages until the configured number of
+        measurements has been sent, then ``complete``, and ping/pong.
+        """
+        ws = web.WebSocketResponse(protocols=(WS_PROTOCOL,))
+        await ws.prepare(request)
+        self.stats["ws_connections"] += 1
+        account = None
+        subscriptions = {}
+
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    break
+                message = msg.json()
+                msg_type = message.get("type")
+
+                if msg_type == "connection_init":
+                    token = (message.get("payload") or {}).get("token", "")
+                    if self.options.live_reject or token == INVALID_TOKEN:
+                        self.stats["ws_rejected"] += 1
+                        await ws.close(code=WS_FORBIDDEN, message=b"Forbidden")
+                        break
+                    account = self._account(token)
+                    await ws.send_json({"type": "connection_ack"})
+                elif msg_type == "subscribe":
+                    if account is None:
+                        await ws.close(code=WS_UNAUTHORIZED, message=b"Unauthorized")
+                        break
+                    variables = (message.get("payload") or {}).get("variables") or {}
+                    home = self._home_index(variables.get("homeId", ""), account)
+                    if home is None:
+                        await ws.send_json(
+                            {
+                                "id": message["id"],
+                                "type": "error",
+                                "payload": [{"message": "Home not found"}],
+                            }
+                        )
+                        continue
+                    subscriptions[message["id"]] = asyncio.create_task(
+                        self._stream_measurements(ws, message["id"], home)
+                    )
+                elif msg_type == "complete":
+                    task = subscriptions.pop(message.get("id"), None)
+                    if task:
+                        task.cancel()
+                elif msg_type == "ping":
+                    await ws.send_json({"type": "pong"})
+        finally:
+            for task in subscriptions.values():
+                task.cancel()
+
+        return ws
+
+    async def _stream_measurements(self, ws: web.WebSocketResponse, subscription_id: str, home: int) -> None:
+        """Send synthetic measurements for one subscription, then complete it."""
+        accumulated = 0.0
+        sent = 0
+        while not ws.closed:
+            power = round(1500 + 1000 * math.sin(time.time() / 60 + home), 1)
+            accumulated += power * self.options.live_interval / 3600000
+            await ws.send_json(
+                {
+                    "id": subscription_id,
+                    "type": "next",
+                    "payload": {
+                        "data": {
+                            "liveMeasurement": {
+                                "timestamp": datetime.now(self.tz).isoformat(),
+                                "power": power,
+                                "powerProduction": 0,
+                                "accumulatedConsumption": round(accumulated, 4),
+                                "accumulatedProduction": 0,
+                                "accumulatedCost": round(accumulated * 1.2, 4),
+                                "currency": "SEK",
+                            }
+                        }
+                    },
+                }
+            )
+            self.stats["live_measurements"] += 1
+            sent += 1
+            if sent == self.options.live_measurements:
+                await ws.send_json({"id": subscription_id, "type": "complete"})
+                return
+            await asyncio.sleep(self.options.live_interval)
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        """Return the request counters."""
+        return web.json_response(dict(self.stats))
+
+    def _home_index(self, requested_id: str, account: int) -> int | None:
+        """Return the number of an account's home id, or None if unknown."""
+        for home in range(self.options.homes):
+            if home_id(home, account) == requested_id:
+                return home
+        return None
+
+    def _tomorrow_published(self, now: datetime) -> bool:
+        """Return True once tomorrow's prices are published."""
+        return (now.hour, now.minute) >= self._publish_at
+
+    def _prices(self, query: str, variables: dict, account: int) -> dict:
+        """Return priceInfo for all homes or for the aliased homes."""
+        resolution = variables.get("resolution", "HOURLY")
+        now = datetime.now(self.tz)
+        today = now.date()
+        include_today = variables.get("today", True)
+        include_tomorrow = variables.get("tomorrow", True)
+        tomorrow_published = self._tomorrow_published(now)
+
+        def home_prices(home):
+            price_info = {}
+            if include_today:
+                price_info["today"] = _day_prices(today, resolution, self.options.time_zone, home)
+            if include_tomorrow:
+                price_info["tomorrow"] = (
+                    _day_prices(today + timedelta(days=1), resolution, self.options.time_zone, home)
+                    if tomorrow_published
+                    else []
+                )
+            return {
+                "id": home_id(home, account),
+                "appNickname": f"Home {home}",
+                "currentSubscription": {"priceInfo": price_info},
+            }
+
+        if "homes {" in query:
+            return {"viewer": {"homes": [home_prices(home) for home in range(self.options.homes)]}}
+
+        viewer = {}
+        for name, value in variables.items():
+            if HOME_VARIABLE.match(name):
+                home = self._home_index(value, account)
+                viewer[name] = home_prices(home) if home is not None else None
+        return {"viewer": viewer}
+
+    def _consumption(self, variables: dict, account: int) -> dict:
+        """Return one page of hourly consumption for a home.
+
+        Cursors are the base64 encoded epoch of the node's hour. Hours
+        newer than ``consumption_delay`` have null consumption, like
+        hours Tibber has not metered yet.
+        """
+        home = self._home_index(variables.get("homeId", ""), account)
+        if home is None:
+            return {"viewer": {"home": None}}
+
+        now = datetime.now(timezone.utc)
+        current_hour = int(now.timestamp()) // 3600 * 3600
+        first_hour = current_hour - self.options.consumption_days * 86400
+        metered_until = current_hour - self.options.consumption_delay * 3600
+        hours = range(first_hour, current_hour, 3600)
+
+        if variables.get("after"):
+            after = int(base64.b64decode(variables["after"]))
+            start = max(0, (after - first_hour) // 3600 + 1)
+            selected = hours[start:start + variables.get("first", 100)]
+            has_next = start + len(selected) < len(hours)
+        else:
+            selected = hours[-variables.get("last", 100):]
+            has_next = False
+
+        edges = []
+        for hour in selected:
+            consumption = None
+            cost = unit_price = None
+            if hour < metered_until:
+                phase = (hour // 3600 + home) / 24 * 2 * math.pi
+                consumption = round(0.8 + 0.5 * math.sin(phase), 3)
+                unit_price = round(1.0 + 0.4 * math.sin(phase + 1), 4)
+                cost = round(consumption * unit_price, 4)
+            start = datetime.fromtimestamp(hour, tz=self.tz)
+            edges.append(
+                {
+                    "cursor": base64.b64encode(str(hour).encode()).decode(),
+                    "node": {
+                        "from": start.isoformat(),
+                        "to": (start + timedelta(hours=1)).isoformat(),
+                        "consumption": consumption,
+                        "cost": cost,
+                        "unitPrice": unit_price,
+                    },
+                }
+            )
+
+        return {
+            "viewer": {
+                "home": {
+                    "consumption": {"pageInfo": {"hasNextPage": has_next}, "edges": edges}
+                }
+            }
+        }
+
+
+@lru_cache(maxsize=4096)
+def _day_prices(day: date, resolution: str, time_zone: str, home: int) -> list:
+    """Return the synthetic prices of one home and day, built once."""
+    return day_prices(day, resolution, ZoneInfo(time_zone), seed=home)
+
+
+def create_app(options: MockOptions) -> tuple[web.Application, MockTibber]:
+    """Return the aiohttp application and its mock state."""
+    mock = MockTibber(options)
+    app = web.Application()
+    app.router.add_post(GRAPHQL_PATH, mock.handle_graphql)
+    app.router.add_get(WEBSOCKET_PATH, mock.handle_websocket)
+    app.router.add_get("/stats", mock.handle_stats)
+    return app, mock
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the account and fault options to an argument parser."""
+    defaults = MockOptions()
+    parser.add_argument("--homes", type=int, default=defaults.homes, help="homes on the account")
+    parser.add_argument("--time-zone", default=defaults.time_zone)
+    parser.add_argument("--latency", type=float, default=defaults.latency, help="mean latency (s)")
+    parser.add_argument("--jitter", type=float, default=defaults.jitter, help="latency jitter (s)")
+    parser.add_argument("--rate-limit", type=int, default=defaults.rate_limit, help="requests per period and token (0 = off)")
+    parser.add_argument("--rate-period", type=float, default=defaults.rate_period, help="rate limit window (s)")
+    parser.add_argument("--retry-after", type=int, default=defaults.retry_after, help="Retry-After of 429 responses (s)")
+    parser.add_argument("--http-429-rate", type=float, default=defaults.http_429_rate, help="share of requests answered with 429")
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate, help="share of requests answered with 500")
+    parser.add_argument("--graphql-error-rate", type=float, default=defaults.graphql_error_rate, help="share of requests answered with GraphQL errors")
+    parser.add_argument("--tomorrow-at", default=defaults.tomorrow_at, help="local HH:MM when tomorrow's prices are published")
+    parser.add_argument("--consumption-delay", type=int, default=defaults.consumption_delay, help="hours before consumption is metered")
+    parser.add_argument("--live-interval", type=float, default=defaults.live_interval, help="seconds between live measurements")
+    parser.add_argument("--live-measurements", type=int, default=defaults.live_measurements, help="measurements before a live subscription completes (0 = never)")
+    parser.add_argument("--live-reject", action="store_true", help="reject websocket connections with 4403")
+
+
+def options_from_args(args: argparse.Namespace) -> MockOptions:
+    """Return the mock options parsed by ``add_arguments``."""
+    return MockOptions(
+        homes=args.homes,
+        time_zone=args.time_zone,
+        latency=args.latency,
+        jitter=args.jitter,
+        rate_limit=args.rate_limit,
+        rate_period=args.rate_period,
+        retry_after=args.retry_after,
+        http_429_rate=args.http_429_rate,
+        error_rate=args.error_rate,
+        graphql_error_rate=args.graphql_error_rate,
+        tomorrow_at=args.tomorrow_at,
+        consumption_delay=args.consumption_delay,
+        live_interval=args.live_interval,
+        live_measurements=args.live_measurements,
+        live_reject=args.live_reject,
+    )
+
+
+def main():
+    """Run the stand-in server."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8910)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    app, _ = create_app(options_from_args(args))
+    print(f"Serving mock Tibber API at http://{args.host}:{args.port}{GRAPHQL_PATH}")
+    web.run_app(app, host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Synthetic Tibber price payloads for the tests and benchmarks."""
+import math
+from datetime import date, datetime, timedelta, timezone
+
+LEVELS = ["VERY_CHEAP", "CHEAP", "NORMAL", "EXPENSIVE", "VERY_EXPENSIVE"]
+
+RESOLUTION_INTERVALS = {
+    "HOURLY": timedelta(hours=1),
+    "QUARTER_HOURLY": timedelta(minutes=15),
+}
+
+# Upplösningen integrationen hämtar från Tibber
+FETCH_RESOLUTION = "QUARTER_HOURLY"
+
+
+def day_prices(day: date, resolution: str, tz, seed: int = 0) -> list:
+    """Return one local day of price points, 92/100 quarters on DST days.
+
+    Slots are generated in absolute time from local midnight to the next
+    local midnight, so the slot count follows the time zone exactly like
+    the Tibber API does.
+    """
+    interval = RESOLUTION_INTERVALS[resolution]
+    start = datetime(day.year, day.month, day.day, tzinfo=tz).astimezone(timezone.utc)
+    next_day = day + timedelta(days=1)
+    end = datetime(next_day.year, next_day.month, next_day.day, tzinfo=tz).astimezone(timezone.utc)
+
+    prices = []
+    slot_start = start
+    index = 0
+    while slot_start < end:
+        # Dygnsvariation med två toppar, förskjuten per hem
+        phase = (index + seed) * interval / timedelta(hours=24) * 2 * math.pi
+        energy = round(0.6 + 0.4 * math.sin(phase) + 0.2 * math.sin(2 * phase), 4)
+        tax = round(energy * 0.25 + 0.1, 4)
+        prices.append(
+            {
+                "total": round(energy + tax, 4),
+                "energy": energy,
+                "tax": tax,
+                "startsAt": slot_start.astimezone(tz).isoformat(timespec="milliseconds"),
+                "level": LEVELS[min(int((energy + 0.2) / 0.4), len(LEVELS) - 1)],
+            }
+        )
+        slot_start += interval
+        index += 1
+
+    return prices
+
+
+def home_id(home: int, account: int = 0) -> str:
+    """Return the synthetic id of home number ``home`` of account number ``account``."""
+    return f"00000000-0000-0000-{account:04d}-{home:012d}"
+
+
+def price_response(homes: int, resolution: str, today: date, tz) -> dict:
+    """Return the GraphQL data object for ``homes`` homes with today and tomorrow."""
+    tomorrow = today + timedelta(days=1)
+    return {
+        "viewer": {
+            "homes": [
+                {
+                    "id": home_id(home),
+                    "appNickname": f"Home {home}",
+                    "currentSubscription": {
+                        "priceInfo": {
+                            "today": day_prices(today, resolution, tz, seed=home),
+                            "tomorrow": day_prices(tomorrow, resolution, tz, seed=home),
+                        }
+                    },
+                }
+                for home in range(homes)
+            ]
+        }
+    }
@@ -0,0 +1,159 @@
+"""Tests for the Tibber API client and its shared instances."""
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from tibber_extended import api
+from tibber_extended.api import (
+    CIRCUIT_BASE_DELAY,
+    CIRCUIT_FAILURE_THRESHOLD,
+    DEFAULT_RETRY_AFTER,
+    MAX_RETRY_AFTER,
+    CircuitBreaker,
+    TibberCircuitOpenError,
+    TibberRateLimitError,
+    TokenBucket,
+    async_drop_client,
+    async_get_client,
+    parse_retry_after,
+)
+from tibber_extended.const import DATA_CLIENTS, DOMAIN
+from tibber_extended.fetcher import async_get_fetcher
+
+
+class FakeClock:
+    """Monotonic clock advanced by hand."""
+
+    def __init__(self) -> None:
+        """Start at an arbitrary time."""
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        """Return the current time."""
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    """Replace the API module's clock, and the backoff jitter, with fixed values."""
+    fake = FakeClock()
+    monkeypatch.setattr(api, "time", SimpleNamespace(monotonic=fake.monotonic))
+    monkeypatch.setattr(api, "backoff_delay", lambda attempt, base, maximum: min(base * 2 ** attempt, maximum))
+    return fake
+
+
+def _clients(hass: HomeAssistant) -> dict:
+    """Return the kept clients."""
+    return hass.data.get(DOMAIN, {}).get(DATA_CLIENTS, {})
+
+
+async def test_client_outlives_last_fetcher(hass: HomeAssistant, clock) -> None:
+    """The token's client and its rate-limit pause survive a reload, until the token is unused."""
+    fetcher = async_get_fetcher(hass, "token")
+    unsubscribe_first = fetcher.async_subscribe(lambda data: None)
+    unsubscribe_second = fetcher.async_subscribe(lambda data: None)
+    assert _clients(hass) == {"token": fetcher.client}
+    assert async_get_client(hass, "token") is fetcher.client
+
+    unsubscribe_first()
+    fetcher.client._retry_at = clock.now + 60
+    unsubscribe_second()
+    assert _clients(hass) == {"token": fetcher.client}
+
+    reloaded = async_get_fetcher(hass, "token")
+    assert reloaded is not fetcher
+    assert reloaded.client is fetcher.client
+    with pytest.raises(TibberRateLimitError):
+        await reloaded.async_fetch()
+
+    # Ingen config entry använder token längre
+    async_drop_client(hass, "token")
+    assert _clients(hass) == {}
+
+
+async def test_validation_client_not_kept(hass: HomeAssistant) -> None:
+    """A brief client is shared when the token is in use and not kept otherwise."""
+    client = async_get_client(hass, "token", keep=False)
+    assert "token" not in _clients(hass)
+    assert async_get_client(hass, "token", keep=False) is not client
+
+    fetcher = async_get_fetcher(hass, "token")
+    fetcher.async_subscribe(lambda data: None)
+    assert async_get_client(hass, "token", keep=False) is fetcher.client
+
+
+def test_token_bucket_spreads_reservations(clock: FakeClock) -> None:
+    """A full bucket serves the burst at once, then each caller waits for its own place."""
+    bucket = TokenBucket(rate=2.0, capacity=3)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert [bucket.reserve() for _ in range(2)] == [0.5, 1.0]
+
+    # En oanvänd reservation lämnas tillbaka
+    bucket.release()
+    assert bucket.reserve() == 1.0
+
+    clock.now += 10
+    assert bucket.reserve() == 0.0
+    assert bucket.tokens == 2.0
+
+
+def test_circuit_breaker_opens_and_lets_one_probe(clock: FakeClock) -> None:
+    """The breaker opens at the threshold and then lets one probe through at a time."""
+    breaker = CircuitBreaker()
+    for _ in range(CIRCUIT_FAILURE_THRESHOLD - 1):
+        breaker.check()
+        breaker.record_failure()
+    breaker.check()
+    breaker.record_failure()
+
+    with pytest.raises(TibberCircuitOpenError) as err:
+        breaker.check()
+    assert err.value.retry_after == CIRCUIT_BASE_DELAY
+
+    clock.now += CIRCUIT_BASE_DELAY
+    breaker.check()
+    with pytest.raises(TibberCircuitOpenError):
+        breaker.check()
+
+    # Misslyckat provanrop - längre paus
+    breaker.record_failure()
+    with pytest.raises(TibberCircuitOpenError) as err:
+        breaker.check()
+    assert err.value.retry_after == 2 * CIRCUIT_BASE_DELAY
+
+    # Ett obesvarat provanrop släpper platsen till nästa
+    clock.now += 2 * CIRCUIT_BASE_DELAY
+    breaker.check()
+    breaker.release()
+    breaker.check()
+
+    breaker.record_success()
+    breaker.check()
+    breaker.check()
+    assert breaker.failures == 0
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [
+        (None, DEFAULT_RETRY_AFTER),
+        ("", DEFAULT_RETRY_AFTER),
+        ("120", 120.0),
+        ("-5", 0.0),
+        ("999999", MAX_RETRY_AFTER),
+        ("soon", DEFAULT_RETRY_AFTER),
+    ],
+)
+def test_parse_retry_after(value, expected) -> None:
+    """Delays are clamped and invalid values fall back to the default pause."""
+    assert parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_http_date() -> None:
+    """An HTTP date gives the seconds until that time."""
+    when = dt_util.utcnow() + timedelta(minutes=5)
+    value = when.strftime("%a, %d %b %Y %H:%M:%S GMT")
+    assert parse_retry_after(value) == pytest.approx(300, abs=2)
@@ -0,0 +1,30 @@
+"""Tests for the options flow."""
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from tibber_extended.config_flow import TibberExtendedOptionsFlow
+from tibber_extended.const import CONF_ACCOUNT_HOMES, CONF_HOMES, DOMAIN
+
+
+async def test_options_require_a_home(hass: HomeAssistant) -> None:
+    """Deselecting every home is rejected, as in the config flow, instead of meaning all homes."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            "access_token": "token",
+            CONF_ACCOUNT_HOMES: {"first": "First", "second": "Second"},
+            CONF_HOMES: ["first"],
+        },
+    )
+    entry.add_to_hass(hass)
+    flow = TibberExtendedOptionsFlow(entry)
+    flow.hass = hass
+
+    result = await flow.async_step_init({CONF_HOMES: []})
+    assert result["type"] == "form"
+    assert result["errors"] == {"base": "no_homes"}
+    assert entry.data[CONF_HOMES] == ["first"]
+
+    result = await flow.async_step_init({CONF_HOMES: ["second"]})
+    assert result["type"] == "create_entry"
+    assert entry.data[CONF_HOMES] == ["second"]
@@ -0,0 +1,136 @@
+"""Tests for the consumption history ring and its ingestion."""
+import base64
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from tibber_extended.const import DOMAIN
+from tibber_extended.consumption import (
+    CONSUMPTION_BACKFILL,
+    ConsumptionHistory,
+    TibberConsumptionCoordinator,
+)
+
+from .helpers.payloads import home_id
+
+HOUR = 3600.0
+
+
+def _scan(hours, start, end):
+    """Return the totals of [start, end) by summing every hour."""
+    inside = [(consumption, cost) for hour, consumption, cost in hours if start <= hour < end]
+    return sum(c for c, _ in inside), sum(c for _, c in inside), len(inside)
+
+
+def test_totals_match_scan_after_wraparound() -> None:
+    """Totals of any period equal a plain sum, also after the ring has wrapped."""
+    history = ConsumptionHistory(days=1)
+    hours = [(index * HOUR, 0.5 + index % 7, 1.25 * (index % 5)) for index in range(60)]
+    for hour in hours:
+        assert history.append(*hour)
+
+    assert len(history) == history.capacity == 25
+    kept = hours[-history.capacity:]
+    for start, end in ((0, 60), (35, 60), (40, 45), (40, 41), (59, 80), (10, 35), (50, 50)):
+        consumption, cost, count = history.totals(start * HOUR, end * HOUR)
+        expected = _scan(kept, start * HOUR, end * HOUR)
+        assert count == expected[2]
+        assert consumption == pytest.approx(expected[0])
+        assert cost == pytest.approx(expected[1])
+
+
+def test_append_rejects_stored_hours() -> None:
+    """Hours at or before the newest one are not stored again."""
+    history = ConsumptionHistory(days=1)
+    assert history.append(HOUR, 1.0, 2.0)
+    assert not history.append(HOUR, 5.0, 5.0)
+    assert not history.append(0.0, 5.0, 5.0)
+    assert history.totals(0.0, 10 * HOUR) == (1.0, 2.0, 1)
+
+
+def test_storage_round_trip() -> None:
+    """Stored columns hold per-hour values and restore the same totals."""
+    history = ConsumptionHistory(days=1)
+    history.cursor = "cursor-30"
+    for index in range(30):
+        history.append(index * HOUR, 0.1 * index, 0.2 * index)
+
+    data = history.as_dict()
+    assert data["start"][0] == 5 * HOUR
+    assert data["consumption"][:2] == pytest.approx([0.5, 0.6])
+
+    restored = ConsumptionHistory.from_dict(data)
+    assert restored.cursor == "cursor-30"
+    assert restored.totals(0.0, 30 * HOUR) == pytest.approx(history.totals(0.0, 30 * HOUR))
+
+
+@pytest.fixture
+async def coordinator(hass: HomeAssistant) -> TibberConsumptionCoordinator:
+    """Return a consumption coordinator without a price coordinator behind it."""
+    prices = SimpleNamespace(token="token", metrics=None, data={})
+    return TibberConsumptionCoordinator(hass, MockConfigEntry(domain=DOMAIN), prices)
+
+
+def _edge(hour: int, consumption=None, cost=None, unit_price=None) -> dict:
+    """Return one consumption edge for an hour of the day."""
+    start = datetime(2025, 1, 15, hour, tzinfo=timezone.utc)
+    return {
+        "cursor": f"cursor-{hour}",
+        "node": {"from": start.isoformat(), "consumption": consumption, "cost": cost, "unitPrice": unit_price},
+    }
+
+
+def test_ingest_page_stops_cursor_before_unmetered_hours(coordinator) -> None:
+    """Gaps are skipped, and the cursor stays before the trailing hours without data."""
+    history = ConsumptionHistory()
+    page = {"edges": [_edge(0, 1.0, 2.0), _edge(1), _edge(2, 0.5, 1.0), _edge(3), _edge(4)]}
+
+    assert coordinator._ingest_page("home", history, page) == (2, False)
+    assert history.cursor == "cursor-2"
+    assert history.totals(0.0, float("inf")) == (1.5, 3.0, 2)
+
+    # Samma sida igen, som när nästa hämtning börjar vid samma cursor
+    assert coordinator._ingest_page("home", history, page) == (0, False)
+    assert history.cursor == "cursor-2"
+
+    assert coordinator._ingest_page("home", history, {"edges": [_edge(3), _edge(4)]}) == (0, False)
+    assert coordinator._ingest_page("home", history, {"edges": []}) == (0, True)
+    assert history.cursor == "cursor-2"
+
+    metered = {"edges": [_edge(3, 1.0, 1.0), _edge(4, 1.0, 1.0)]}
+    assert coordinator._ingest_page("home", history, metered) == (2, True)
+    assert history.cursor == "cursor-4"
+
+
+def test_ingest_page_cost_fallbacks(coordinator) -> None:
+    """A missing cost comes from the unit price, then from the held prices."""
+    history = ConsumptionHistory()
+    coordinator._unit_price = lambda home, start: 3.0
+    page = {"edges": [_edge(0, 2.0, unit_price=0.5), _edge(1, 2.0)]}
+
+    assert coordinator._ingest_page("home", history, page) == (2, True)
+    assert history.as_dict()["cost"] == [1.0, 6.0]
+
+
+async def test_fetch_home_backfills_then_pages(coordinator, mock_tibber) -> None:
+    """The first fetch takes the last week, later ones page on from the cursor."""
+    history = ConsumptionHistory()
+    metered = CONSUMPTION_BACKFILL - mock_tibber.options.consumption_delay
+    assert await coordinator._async_fetch_home(home_id(0), history) == metered
+    cursor = history.cursor
+    assert base64.b64decode(cursor) == str(int(history.last_start)).encode()
+
+    # Inget nytt är uppmätt - cursorn står kvar
+    assert await coordinator._async_fetch_home(home_id(0), history) == 0
+    assert history.cursor == cursor
+
+    # Från en cursor 150 timmar bakåt: två sidor, den andra slutar med ej uppmätta timmar
+    resumed = ConsumptionHistory()
+    resumed.cursor = base64.b64encode(str(int(history.last_start - 150 * HOUR)).encode()).decode()
+    requests = mock_tibber.stats["requests"]
+    assert await coordinator._async_fetch_home(home_id(0), resumed) == 150
+    assert mock_tibber.stats["requests"] - requests == 2
+    assert resumed.cursor == cursor
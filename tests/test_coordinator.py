@@ -0,0 +1,179 @@
+"""Tests for the price coordinator's current-slot lookup, boundary tick and price cache."""
+from datetime import datetime, time, timedelta, timezone
+from unittest.mock import patch
+
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from tibber_extended import coordinator as coordinator_module
+from tibber_extended.api import TibberRateLimitError
+from tibber_extended.const import CONF_CHEAPEST_COUNT, CONF_PERIOD_HOURS, CONF_UPDATE_TIMES
+from tibber_extended.coordinator import TibberDataCoordinator
+from tibber_extended.ranking import RULE_CHEAPEST
+
+from .conftest import HOME_ID, QUARTER
+
+
+def _move_to_slot(freezer, quarter: int, seconds: float = 0.0, days: int = 0) -> None:
+    """Move the frozen time into a quarter hour from a local midnight."""
+    midnight = dt_util.start_of_local_day(dt_util.now().date() + timedelta(days=days))
+    freezer.move_to(midnight + timedelta(seconds=quarter * QUARTER + seconds))
+
+
+def _slot_time(quarter: int):
+    """Return the UTC start of a quarter hour of the frozen day."""
+    midnight = dt_util.start_of_local_day(dt_util.now().date())
+    return dt_util.as_utc(midnight + timedelta(seconds=quarter * QUARTER))
+
+
+async def test_current_position(price_coordinator, freezer) -> None:
+    """The current slot is found in both resolutions, from its first second to its last."""
+    assert price_coordinator.current_position(HOME_ID) == 24
+    assert price_coordinator.current_position(HOME_ID, "HOURLY") == 6
+
+    _move_to_slot(freezer, 41)
+    assert price_coordinator.current_position(HOME_ID) == 41
+    _move_to_slot(freezer, 41, QUARTER - 0.001)
+    assert price_coordinator.current_position(HOME_ID) == 41
+    assert price_coordinator.current_position(HOME_ID, "HOURLY") == 10
+
+    assert price_coordinator.current_position("other") is None
+
+
+async def test_current_position_outside_prices(price_coordinator, freezer) -> None:
+    """A moment without a slot gives no position."""
+    views = price_coordinator.slot_index[HOME_ID]
+    starts, ends, points = views["QUARTER_HOURLY"]
+    # Bara förmiddagens priser
+    views["QUARTER_HOURLY"] = (starts[:48], ends[:48], points[:48])
+
+    _move_to_slot(freezer, 47, 60)
+    assert price_coordinator.current_position(HOME_ID) == 47
+    _move_to_slot(freezer, 48)
+    assert price_coordinator.current_position(HOME_ID) is None
+
+
+async def test_midnight_tick_rolls_over(hass, price_coordinator, freezer) -> None:
+    """Lookups change nothing; the tick at midnight rolls the views over to the new day."""
+    first_day = len(price_coordinator.get_prices(HOME_ID, "today"))
+    _move_to_slot(freezer, 3, days=1)
+    version = price_coordinator.data_version
+    assert price_coordinator.current_position(HOME_ID) is None
+    assert len(price_coordinator.get_prices(HOME_ID, "today")) == first_day
+    assert price_coordinator.data_version == version
+
+    async_fire_time_changed(hass)
+    await hass.async_block_till_done()
+    assert price_coordinator.current_position(HOME_ID) == 3
+    # Priset är kvartens nummer räknat från första dagens midnatt
+    assert price_coordinator.get_prices(HOME_ID, "today")[3].total == first_day + 3
+    assert not price_coordinator.get_prices(HOME_ID, "tomorrow")
+
+
+async def test_restore_from_cache(hass, price_coordinator, freezer) -> None:
+    """Cached prices saved yesterday give today's prices after a restart without a fetch."""
+    first_day = len(price_coordinator.get_prices(HOME_ID, "today"))
+    await price_coordinator.async_flush()
+
+    _move_to_slot(freezer, 3, days=1)
+    restored = TibberDataCoordinator(hass, price_coordinator.entry)
+    restored._cancel_time_triggers()
+    # Gårdagens morgondag är dagens priser, och morgondagens är inte publicerade än
+    assert await restored.async_restore()
+    assert restored.current_position(HOME_ID) == 3
+    assert restored.get_prices(HOME_ID, "today")[3].total == first_day + 3
+    assert not restored.get_prices(HOME_ID, "tomorrow")
+    restored._cancel_tick()
+
+    _move_to_slot(freezer, 3, days=2)
+    stale = TibberDataCoordinator(hass, price_coordinator.entry)
+    stale._cancel_time_triggers()
+    # Cachen saknar dagens priser - en hämtning behövs
+    assert not await stale.async_restore()
+    stale._cancel_tick()
+
+
+async def test_one_tick_per_boundary(hass, price_coordinator, freezer) -> None:
+    """One timer at the next slot boundary wakes the home's listeners once each."""
+    woken = []
+    for index in range(10):
+        price_coordinator.async_add_tick_listener(lambda index=index: woken.append(index), HOME_ID)
+    price_coordinator.async_add_tick_listener(lambda: woken.append("other"), "other")
+    price_coordinator.async_add_tick_listener(lambda: woken.append("all"))
+
+    with patch.object(
+        coordinator_module,
+        "async_track_point_in_utc_time",
+        wraps=coordinator_module.async_track_point_in_utc_time,
+    ) as track:
+        _move_to_slot(freezer, 24, QUARTER - 1)
+        async_fire_time_changed(hass)
+        await hass.async_block_till_done()
+        assert woken == []
+
+        _move_to_slot(freezer, 25)
+        async_fire_time_changed(hass)
+        await hass.async_block_till_done()
+        assert woken == [*range(10), "all"]
+        # Nästa gräns armeras med en enda timer
+        assert track.call_count == 1
+        assert track.call_args.args[2] == _slot_time(26)
+
+
+async def test_rate_limit_keeps_prices(price_coordinator, freezer) -> None:
+    """A rate-limited fetch keeps the current prices and tells the scheduler when to retry."""
+    with patch.object(
+        price_coordinator.fetcher,
+        "async_fetch",
+        side_effect=TibberRateLimitError("Tibber rate limit, retry in 120 s", 120.0),
+    ):
+        await price_coordinator.async_refresh()
+    assert price_coordinator.last_update_success
+    assert price_coordinator.kept_prices
+    assert price_coordinator.retry_after == 120.0
+    assert price_coordinator.current_position(HOME_ID) == 24
+
+
+async def test_tick_never_sleeps_past_midnight(price_coordinator, freezer) -> None:
+    """A fallback timer that would sleep past midnight is cut at midnight."""
+    home_data = price_coordinator.data[HOME_ID]
+    midnight = price_coordinator.get_prices(HOME_ID, "tomorrow").start[0]
+    # Kvällens priser saknas, och reservtimern går per dygn i UTC
+    data = {HOME_ID: {**home_data, "prices": home_data["prices"].between(0, midnight - 7200)}}
+    price_coordinator._build_price_index(data, force=True)
+    price_coordinator.data = data
+    price_coordinator.sensor_update_interval = timedelta(days=1)
+
+    _move_to_slot(freezer, 90)
+    with patch.object(
+        coordinator_module,
+        "async_track_point_in_utc_time",
+        wraps=coordinator_module.async_track_point_in_utc_time,
+    ) as track:
+        price_coordinator._schedule_tick()
+    assert track.call_args.args[2] == datetime.fromtimestamp(midnight, tz=timezone.utc)
+    assert price_coordinator._tick_homes is None
+
+
+async def test_apply_options_in_place(price_coordinator) -> None:
+    """Changed periods, rules and fetch times take effect from the held prices, without a fetch."""
+    notified = []
+    price_coordinator.async_add_listener(lambda: notified.append(HOME_ID), HOME_ID)
+    assert 2 not in price_coordinator.periods[HOME_ID]["cheapest"]
+    options = {
+        **price_coordinator.options,
+        CONF_PERIOD_HOURS: [2],
+        CONF_CHEAPEST_COUNT: 4,
+        CONF_UPDATE_TIMES: ["14:00"],
+    }
+
+    with patch.object(price_coordinator.fetcher, "async_fetch") as fetch:
+        price_coordinator.async_apply_options(options)
+    price_coordinator._cancel_time_triggers()
+    fetch.assert_not_called()
+    assert notified == [HOME_ID]
+    assert price_coordinator.periods[HOME_ID]["cheapest"][2]["average"] == 3.5
+    starts, ends = price_coordinator.rule_windows[HOME_ID][RULE_CHEAPEST]
+    # De fyra billigaste kvartarna är dygnets första timme
+    assert ends[0] - starts[0] == 4 * QUARTER
+    assert price_coordinator.update_times_parsed == [time(14, 0)]
@@ -0,0 +1,57 @@
+"""Tests for the diagnostics redaction."""
+import json
+from types import SimpleNamespace
+
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from tibber_extended.const import DOMAIN, FETCH_RESOLUTION
+from tibber_extended.diagnostics import async_get_config_entry_diagnostics
+from tibber_extended.metrics import TibberMetrics
+from tibber_extended.models import PriceSeries
+
+from .helpers.payloads import home_id
+
+
+async def test_diagnostics_hide_token_and_homes(hass: HomeAssistant) -> None:
+    """Home IDs, nicknames and the token are replaced, per-home data stays apart."""
+    first, second, other = home_id(0), home_id(1), home_id(0, account=1)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            "access_token": "secret-token",
+            "homes": [second],
+            "account_homes": {first: "Sommarstugan", second: "Villa Solgläntan"},
+        },
+    )
+    metrics = TibberMetrics()
+    # Mätvärdena delas av tokenens alla entries, även hem som inte följs här
+    metrics.record_parse(1.0, [second, other])
+    hass.data[DOMAIN] = {
+        entry.entry_id: SimpleNamespace(
+            data={second: {"prices": PriceSeries(), "name": "Villa Solgläntan"}},
+            home_ids=[second],
+            views={},
+            history={},
+            consumption=None,
+            live_streams={},
+            resolution=FETCH_RESOLUTION,
+            update_mode="scheduled",
+            last_update_success=True,
+            last_exception=None,
+            data_version=1,
+            metrics=metrics,
+            get_prices=lambda home, day, resolution: [],
+        )
+    }
+
+    diagnostics = await async_get_config_entry_diagnostics(hass, entry)
+
+    dumped = json.dumps(diagnostics, default=str)
+    for secret in (first, second, other, "secret-token", "Sommarstugan", "Villa Solgläntan"):
+        assert secret not in dumped
+    assert diagnostics["entry"]["homes"] == ["home_2"]
+    assert diagnostics["entry"]["account_homes"] == {"home_1": "**REDACTED**", "home_2": "**REDACTED**"}
+    assert diagnostics["coordinator"]["tracked_homes"] == ["home_2"]
+    assert list(diagnostics["homes"]) == ["home_2"]
+    assert list(diagnostics["metrics"]["last_success"]) == ["home_2", "home_3"]
@@ -0,0 +1,28 @@
+"""Tests for the home entities' deduplicated state writes."""
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+from pytest_homeassistant_custom_component.common import MockEntityPlatform
+
+from tibber_extended.sensor import TibberPriceSensor
+
+from .conftest import HOME_ID
+
+
+async def test_registry_update_is_written(hass: HomeAssistant, price_coordinator) -> None:
+    """Unchanged coordinator updates are skipped, but a rename is written at once."""
+    price_coordinator.entry.add_to_hass(hass)
+    platform = MockEntityPlatform(hass)
+    platform.config_entry = price_coordinator.entry
+    sensor = TibberPriceSensor(price_coordinator, HOME_ID, "Home", "SEK")
+    await platform.async_add_entities([sensor])
+    metrics = price_coordinator.metrics
+
+    price_coordinator.async_update_listeners()
+    writes = metrics.counters["state_writes"]
+    price_coordinator.async_update_listeners()
+    assert metrics.counters["state_writes"] == writes
+
+    er.async_get(hass).async_update_entity(sensor.entity_id, name="Renamed")
+    await hass.async_block_till_done()
+    assert metrics.counters["state_writes"] == writes + 1
+    assert hass.states.get(sensor.entity_id).name == "Renamed"
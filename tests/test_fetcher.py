@@ -0,0 +1,99 @@
+"""Tests for the shared price fetcher."""
+import asyncio
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from tibber_extended.fetcher import COALESCE_WINDOW, TibberPriceFetcher, async_get_fetcher
+
+from .helpers.payloads import home_id
+
+
+@pytest.fixture
+async def fetcher(hass: HomeAssistant, mock_tibber) -> TibberPriceFetcher:
+    """Return the shared fetcher of a token served by the local Tibber stand-in."""
+    return async_get_fetcher(hass, "token")
+
+
+async def test_concurrent_refreshes_share_one_request(fetcher, mock_tibber) -> None:
+    """Refreshes in flight together and within the window send one request."""
+    first, second, idle = [], [], []
+    for update_callback in (first.append, second.append, idle.append):
+        fetcher.async_subscribe(update_callback)
+
+    results = await asyncio.gather(
+        fetcher.async_fetch(first.append), fetcher.async_fetch(second.append)
+    )
+    assert mock_tibber.stats["prices"] == 1
+    assert results[0] is results[1]
+    assert home_id(0) in results[0]
+    # Bara den som inte frågade själv får resultatet skickat
+    assert first == second == []
+    assert idle == [results[0]]
+
+    assert await fetcher.async_fetch(first.append) is results[0]
+    assert mock_tibber.stats["prices"] == 1
+    assert fetcher.metrics.counters["cache_hits"] == 2
+
+    fetcher._last_fetch -= COALESCE_WINDOW
+    await fetcher.async_fetch(first.append)
+    assert mock_tibber.stats["prices"] == 2
+
+
+async def test_only_missing_days_are_queried(fetcher, freezer) -> None:
+    """Days already held are left out of the query, also after midnight."""
+    received = []
+    fetcher.async_subscribe(received.append)
+    freezer.move_to(dt_util.start_of_local_day() + timedelta(hours=6))
+
+    async def fetch_days():
+        fetcher._last_fetch -= COALESCE_WINDOW
+        with patch.object(fetcher.client, "async_query", wraps=fetcher.client.async_query) as query:
+            await fetcher.async_fetch(received.append)
+        variables = query.call_args.args[1]
+        return variables["today"], variables["tomorrow"]
+
+    assert await fetch_days() == (True, True)
+    # Allt finns - bara morgondagen frågas efter, för att upptäcka ändringar
+    assert await fetch_days() == (False, True)
+
+    freezer.move_to(dt_util.start_of_local_day() + timedelta(days=1, hours=6))
+    # Gårdagens morgondag är dagens priser
+    assert await fetch_days() == (False, True)
+
+    fetcher._homes.clear()
+    assert await fetch_days() == (True, True)
+
+
+async def test_shared_result_covers_the_requesters_homes(fetcher, mock_tibber) -> None:
+    """A result without the requester's homes is neither reused nor joined nor pushed."""
+    mock_tibber.options.homes = 2
+    first, second = [], []
+    fetcher.async_subscribe(first.append, [home_id(0)])
+    data = await fetcher.async_fetch(first.append)
+    assert list(data) == [home_id(0)]
+
+    # En ny post på samma token inom fönstret får egna hem, inte den förra postens
+    fetcher.async_subscribe(second.append, [home_id(1)])
+    data = await fetcher.async_fetch(second.append)
+    assert home_id(1) in data
+    assert mock_tibber.stats["prices"] == 2
+    assert first == [data]
+    assert await fetcher.async_fetch(first.append) is data
+    assert mock_tibber.stats["prices"] == 2
+
+    # Pågående fråga utan den nya prenumerantens hem ger en fråga till
+    fetcher._last_fetch -= COALESCE_WINDOW
+    third = []
+    in_flight = asyncio.ensure_future(fetcher.async_fetch(first.append))
+    await asyncio.sleep(0)
+    fetcher.async_subscribe(third.append, [home_id(2)])
+    mock_tibber.options.homes = 3
+    results = await asyncio.gather(in_flight, fetcher.async_fetch(third.append))
+    assert home_id(2) not in results[0]
+    assert home_id(2) in results[1]
+    assert mock_tibber.stats["prices"] == 4
+    assert third == []
@@ -0,0 +1,53 @@
+"""Tests for the local price history."""
+from tibber_extended.history import MAX_SLOTS_PER_DAY, PriceHistory
+from tibber_extended.models import PriceLevel, PriceSeries
+
+QUARTER = 900.0
+
+
+def _slots(first: int, last: int) -> PriceSeries:
+    """Return quarter-hour slots numbered first..last-1, priced by their number."""
+    numbers = range(first, last)
+    return PriceSeries(
+        [number * QUARTER for number in numbers],
+        [float(number) for number in numbers],
+        [number / 2 for number in numbers],
+        [0.25] * len(numbers),
+        [PriceLevel.CHEAP] * len(numbers),
+    )
+
+
+def test_ring_wraps_around_keeping_newest() -> None:
+    """A full ring overwrites the oldest slots and still returns them in time order."""
+    history = PriceHistory(days=1)
+    assert len(history.extend(_slots(0, 60))) == 60
+    assert len(history.extend(_slots(40, 130))) == 70
+
+    assert len(history) == history.capacity == MAX_SLOTS_PER_DAY
+    assert history.last_start == 129 * QUARTER
+    prices = history.prices()
+    assert [price_point.total for price_point in prices] == [float(number) for number in range(30, 130)]
+    assert prices[0].level is PriceLevel.CHEAP
+    assert prices[0].energy == 15.0
+
+    # Inget nytt - inget läggs till
+    assert not history.extend(_slots(100, 130))
+
+
+def test_storage_round_trip_after_wraparound() -> None:
+    """Stored columns are oldest first, and a smaller history keeps the newest slots."""
+    history = PriceHistory(days=1)
+    history.extend(_slots(0, 150))
+
+    data = history.as_dict()
+    assert data["start"][0] == 50 * QUARTER
+    assert data["start"][-1] == 149 * QUARTER
+
+    restored = PriceHistory.from_dict(1, data)
+    assert restored.prices() == history.prices()
+
+    # Färre konfigurerade dagar än i lagringen
+    longer = PriceHistory(days=2)
+    longer.extend(_slots(0, 180))
+    shorter = PriceHistory.from_dict(1, longer.as_dict())
+    assert [price_point.total for price_point in shorter.prices()] == [float(number) for number in range(80, 180)]
@@ -0,0 +1,51 @@
+"""Tests for the liveMeasurement stream."""
+import asyncio
+from unittest.mock import patch
+
+from homeassistant.core import HomeAssistant
+
+from tibber_extended import live
+
+from .helpers.payloads import home_id
+
+
+async def _wait_for(condition, timeout=5.0):
+    """Wait until condition() is true."""
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+async def test_stream_reconnects_until_stopped(hass: HomeAssistant, mock_tibber) -> None:
+    """A completed subscription is reconnected with backoff, and stopping ends the loop."""
+    mock_tibber.options.live_measurements = 3
+    stream = live.TibberLiveStream(hass, "token", home_id(0), throttle=60)
+
+    with patch.object(live, "RECONNECT_BASE_DELAY", 0.01):
+        stream.async_start()
+        await _wait_for(lambda: mock_tibber.stats["ws_connections"] >= 2)
+        task = stream._task
+        await stream.async_stop()
+
+    assert task.done()
+    assert stream._task is None
+
+    stream._async_flush()
+    assert stream.data["samples"] >= 3
+    assert stream.data["power_min"] <= stream.data["power"] <= stream.data["power_max"]
+
+
+async def test_stream_ends_when_rejected(hass: HomeAssistant, mock_tibber) -> None:
+    """A rejected connection is not retried."""
+    mock_tibber.options.live_reject = True
+    stream = live.TibberLiveStream(hass, "token", home_id(0), throttle=60)
+
+    with patch.object(live, "RECONNECT_BASE_DELAY", 0.01):
+        stream.async_start()
+        async with asyncio.timeout(5):
+            await stream._task
+
+    assert mock_tibber.stats["ws_connections"] == 1
+    assert mock_tibber.stats["ws_rejected"] == 1
+    assert stream.data is None
+    await stream.async_stop()
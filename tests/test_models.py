@@ -0,0 +1,119 @@
+"""Tests for the price series."""
+from datetime import date, timedelta
+
+import pytest
+from homeassistant.util import dt as dt_util
+
+from tibber_extended.coordinator import TibberDataCoordinator
+from tibber_extended.models import PriceLevel, PricePoint, PriceSeries, local_day_bounds
+
+QUARTER = 900.0
+HOUR = 3600.0
+
+
+def _series(*slots) -> PriceSeries:
+    """Return a series of (start, total, level) slots with energy and tax split from the total."""
+    return PriceSeries.from_points(
+        PricePoint(start, total, total * 0.75, total * 0.25, level) for start, total, level in slots
+    )
+
+
+def test_merge_replaces_overlapping_range() -> None:
+    """Merged slots replace the stored ones in their time range and extend past the end."""
+    timeline = _series(*((index * QUARTER, 1.0, PriceLevel.NORMAL) for index in range(8)))
+    update = _series(*((index * QUARTER, 2.0, PriceLevel.EXPENSIVE) for index in (2, 3, 4)))
+
+    merged = timeline.merge(update)
+    assert list(merged.start) == [index * QUARTER for index in range(8)]
+    assert list(merged.total) == [1.0, 1.0, 2.0, 2.0, 2.0, 1.0, 1.0, 1.0]
+    assert merged[2].level is PriceLevel.EXPENSIVE
+
+    extended = timeline.merge(_series(*((index * QUARTER, 3.0, PriceLevel.NORMAL) for index in (7, 8, 9))))
+    assert list(extended.start) == [index * QUARTER for index in range(10)]
+    assert list(extended.total[6:]) == [1.0, 3.0, 3.0, 3.0]
+    assert timeline.merge(PriceSeries()) is timeline
+
+
+def test_since_and_between() -> None:
+    """since drops older slots and between is a view of a time range."""
+    timeline = _series(*((index * QUARTER, float(index), PriceLevel.NORMAL) for index in range(8)))
+
+    assert timeline.since(0.0) is timeline
+    assert list(timeline.since(2.5 * QUARTER).total) == [3.0, 4.0, 5.0, 6.0, 7.0]
+    assert not timeline.since(8 * QUARTER)
+
+    view = timeline.between(2 * QUARTER, 4 * QUARTER)
+    assert list(view.total) == [2.0, 3.0]
+    assert isinstance(view.total, memoryview)
+    assert view == timeline[2:4]
+    assert not timeline.between(10 * QUARTER, 12 * QUARTER)
+
+
+def test_aggregate_averages_and_levels_from_price_bands() -> None:
+    """An hour gets the mean prices and the level of the band its mean total is in."""
+    first_hour = [
+        (0.0, 0.30, PriceLevel.VERY_CHEAP),
+        (QUARTER, 0.30, PriceLevel.VERY_CHEAP),
+        (2 * QUARTER, 0.30, PriceLevel.VERY_CHEAP),
+        (3 * QUARTER, 1.50, PriceLevel.VERY_EXPENSIVE),
+    ]
+    # Resten av dagen anger nivåernas prisband
+    other_hours = [
+        (HOUR, 0.45, PriceLevel.CHEAP),
+        (HOUR + QUARTER, 0.58, PriceLevel.NORMAL),
+        (HOUR + 2 * QUARTER, 0.90, PriceLevel.NORMAL),
+        (HOUR + 3 * QUARTER, 1.20, PriceLevel.EXPENSIVE),
+    ]
+    hourly = _series(*first_hour, *other_hours).aggregate(HOUR)
+
+    assert list(hourly.start) == [0.0, HOUR]
+    assert hourly[0].total == pytest.approx(0.60)
+    assert hourly[0].energy == pytest.approx(0.45)
+    assert hourly[0].tax == pytest.approx(0.15)
+    # Medelvärdet av nivåkoderna hade gett CHEAP, men 0.60 ligger i NORMAL-bandet
+    assert hourly[0].level is PriceLevel.NORMAL
+    assert hourly[1].total == pytest.approx(0.7825)
+    assert hourly[1].level is PriceLevel.NORMAL
+
+
+def test_aggregate_without_known_levels() -> None:
+    """Buckets are UNKNOWN when no slot of the series has a level."""
+    hourly = _series(*((index * QUARTER, 1.0, PriceLevel.UNKNOWN) for index in range(8))).aggregate(HOUR)
+    assert [price_point.level for price_point in hourly] == [PriceLevel.UNKNOWN] * 2
+
+
+@pytest.fixture
+def stockholm():
+    """Use a time zone with DST as the local zone."""
+    dt_util.set_default_time_zone(dt_util.get_time_zone("Europe/Stockholm"))
+    yield
+    dt_util.set_default_time_zone(dt_util.UTC)
+
+
+@pytest.mark.parametrize(("day", "hours"), [(date(2025, 3, 30), 23), (date(2025, 10, 26), 25)])
+def test_dst_day_views(stockholm, day: date, hours: int) -> None:
+    """A DST day has 23 or 25 local hours, each the mean of its own four quarters."""
+    bounds = (
+        local_day_bounds(day)[0],
+        local_day_bounds(day + timedelta(days=1))[0],
+        local_day_bounds(day + timedelta(days=2))[0],
+    )
+    quarters = int((bounds[2] - bounds[0]) // QUARTER)
+    timeline = _series(*(
+        (bounds[0] + index * QUARTER, float(index), PriceLevel.NORMAL) for index in range(quarters)
+    ))
+
+    views = TibberDataCoordinator._derive_views({"prices": timeline}, bounds)
+    quarter_hourly, hourly = views["QUARTER_HOURLY"][0], views["HOURLY"][0]
+    assert bounds[1] - bounds[0] == hours * HOUR
+    assert len(quarter_hourly) == 4 * hours
+    assert len(hourly) == hours
+    assert len(views["HOURLY"][1]) == 24
+
+    local_hours = [dt_util.as_local(dt_util.utc_from_timestamp(start)).hour for start in hourly.start]
+    # Timmen 02 saknas på våren och finns två gånger på hösten
+    assert local_hours.count(2) == hours - 23
+    assert all(start % HOUR == 0 for start in hourly.start)
+    for hour, price_point in enumerate(hourly):
+        assert price_point.total == pytest.approx(sum(quarter_hourly.total[4 * hour:4 * hour + 4]) / 4)
+        assert price_point.level is PriceLevel.NORMAL
@@ -0,0 +1,76 @@
+"""Tests for the cheapest and most expensive periods."""
+from datetime import timedelta
+
+import pytest
+from homeassistant.util import dt as dt_util
+
+from tibber_extended.models import PriceLevel, PricePoint, PriceSeries
+from tibber_extended.periods import (
+    MODE_CHEAPEST_SLOTS,
+    MODE_CHEAPEST_WINDOW,
+    MODE_EXPENSIVE_WINDOW,
+    find_period,
+    find_window,
+)
+
+QUARTER = timedelta(minutes=15)
+START = 1_750_000_000.0 - 1_750_000_000.0 % 3600
+TOTALS = [5.0, 1.0, 1.0, 5.0, 0.0, 0.0, 9.0, 8.0, 2.0, 2.0]
+
+
+def _timestamp(value: str) -> float:
+    """Return the epoch seconds of an ISO time from a result."""
+    return dt_util.parse_datetime(value).timestamp()
+
+
+@pytest.fixture
+def prices() -> PriceSeries:
+    """Return quarter-hour slots with the prices in TOTALS."""
+    return PriceSeries.from_points(
+        PricePoint(START + index * 900, total, total, 0.0, PriceLevel.NORMAL)
+        for index, total in enumerate(TOTALS)
+    )
+
+
+def test_find_window(prices: PriceSeries) -> None:
+    """The window with the lowest or highest sum is found, with its end and average."""
+    cheapest = find_window(prices, 2, QUARTER)
+    assert _timestamp(cheapest["start"]) == START + 4 * 900
+    assert _timestamp(cheapest["end"]) == START + 6 * 900
+    assert cheapest["average"] == 0.0
+    assert cheapest["slots"] == 2
+
+    expensive = find_window(prices, 3, QUARTER, cheapest=False)
+    assert _timestamp(expensive["start"]) == START + 6 * 900
+    assert expensive["average"] == pytest.approx(19 / 3, abs=1e-4)
+
+    # Lika summor - det tidigaste fönstret vinner
+    assert _timestamp(find_window(prices, 1, QUARTER)["start"]) == START + 4 * 900
+    assert find_window(prices, 11, QUARTER) is None
+    assert find_window(prices, 0, QUARTER) is None
+
+
+def test_find_period_within_range(prices: PriceSeries) -> None:
+    """Only windows entirely inside start..end are considered."""
+    start = dt_util.utc_from_timestamp(START)
+    end = dt_util.utc_from_timestamp(START + 4 * 900)
+
+    window = find_period(prices, MODE_CHEAPEST_WINDOW, 0.5, 0, QUARTER, start=start, end=end)
+    assert _timestamp(window["start"]) == START + 900
+    assert window["average"] == 1.0
+
+    # Fönstret får inte sluta efter end
+    late = dt_util.utc_from_timestamp(START + 6 * 900)
+    expensive = find_period(prices, MODE_EXPENSIVE_WINDOW, 0.5, 0, QUARTER, start=late)
+    assert _timestamp(expensive["start"]) == START + 6 * 900
+    assert find_period(prices, MODE_CHEAPEST_WINDOW, 1, 0, QUARTER, start=late, end=late) is None
+
+
+def test_find_cheapest_slots(prices: PriceSeries) -> None:
+    """The cheapest slots are returned in time order, not necessarily contiguous."""
+    result = find_period(prices, MODE_CHEAPEST_SLOTS, 0, 4, QUARTER)
+    assert [_timestamp(slot["start"]) for slot in result["slots"]] == [
+        START + index * 900 for index in (1, 2, 4, 5)
+    ]
+    assert result["average"] == 0.5
+    assert find_period(prices, MODE_CHEAPEST_SLOTS, 0, 0, QUARTER) is None
@@ -0,0 +1,53 @@
+"""Tests for the price ranking and rule windows."""
+import pytest
+
+from tibber_extended.models import PriceSeries
+from tibber_extended.ranking import cheapest_windows, merge_windows, rank_day, threshold_windows
+
+QUARTER = 900.0
+
+
+def _day(totals, offset: float = 0.0) -> PriceSeries:
+    """Return quarter-hour slots with the given prices."""
+    count = len(totals)
+    return PriceSeries([offset + index * QUARTER for index in range(count)], totals, totals, [0.0] * count, [3] * count)
+
+
+def test_rank_day_shares_ranks_on_ties() -> None:
+    """Equal prices share a rank and the next rank skips ahead."""
+    ranking = rank_day(_day([3.0, 1.0, 2.0, 2.0, 5.0]))
+    assert list(ranking.ranks) == [4, 1, 2, 2, 5]
+    assert ranking.average == pytest.approx(2.6)
+    assert ranking.count == 5
+    assert ranking.percentile(1) == 0.0
+    assert ranking.percentile(4) == 100.0
+    assert ranking.percentile(2) == 25.0
+
+
+def test_rank_day_small_days() -> None:
+    """An empty day has no ranking and a single slot is the 0th percentile."""
+    assert rank_day(PriceSeries()) is None
+    assert rank_day(_day([1.0])).percentile(0) == 0.0
+
+
+def test_merge_windows() -> None:
+    """Adjacent slots merge into one window."""
+    starts, ends = merge_windows([0.0, QUARTER, 3 * QUARTER], QUARTER)
+    assert list(starts) == [0.0, 3 * QUARTER]
+    assert list(ends) == [2 * QUARTER, 4 * QUARTER]
+
+
+def test_cheapest_windows_per_day() -> None:
+    """The cheapest slots are chosen per day and merged across the day boundary."""
+    today = _day([5.0, 4.0, 1.0, 1.0])
+    tomorrow = _day([0.5, 2.0, 9.0, 3.0], offset=4 * QUARTER)
+    starts, ends = cheapest_windows((today, tomorrow), 2, QUARTER)
+    assert list(starts) == [2 * QUARTER]
+    assert list(ends) == [6 * QUARTER]
+
+
+def test_threshold_windows() -> None:
+    """Windows cover the slots priced below the threshold."""
+    starts, ends = threshold_windows(_day([1.0, 1.0, 3.0, 1.0, 2.0]), 2.0, QUARTER)
+    assert list(starts) == [0.0, 3 * QUARTER]
+    assert list(ends) == [2 * QUARTER, 4 * QUARTER]
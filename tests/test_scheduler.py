@@ -0,0 +1,121 @@
+"""Tests for the adaptive fetch scheduler."""
+from datetime import time, timedelta
+
+import pytest
+from homeassistant.util import dt as dt_util
+
+from tibber_extended import scheduler
+from tibber_extended.scheduler import (
+    POLL_BASE_DELAY,
+    POLL_MAX_DELAY,
+    RETRY_BASE_DELAY,
+    AdaptiveFetchScheduler,
+    backoff_delay,
+)
+
+from .conftest import HOME_ID
+
+PUBLISH_TIME = time(13, 0)
+
+
+def _at(hours: float, days: int = 0):
+    """Return a local time of the first day, or of a later one."""
+    return dt_util.start_of_local_day(dt_util.now().date() + timedelta(days=days)) + timedelta(hours=hours)
+
+
+def _drop_tomorrow(coordinator) -> None:
+    """Keep only today's prices, as before Tibber publishes tomorrow's."""
+    home_data = coordinator.data[HOME_ID]
+    tomorrow_start = coordinator.get_prices(HOME_ID, "tomorrow").start[0]
+    data = {HOME_ID: {**home_data, "prices": home_data["prices"].between(0, tomorrow_start)}}
+    coordinator._build_price_index(data, force=True)
+    coordinator.data = data
+
+
+@pytest.fixture
+def polls(price_coordinator, monkeypatch):
+    """Return a scheduler whose polls are recorded instead of scheduled, without jitter."""
+    monkeypatch.setattr(scheduler.random, "uniform", lambda low, high: 0.0)
+    fetch_scheduler = AdaptiveFetchScheduler(price_coordinator, PUBLISH_TIME)
+    fetch_scheduler.delays = []
+    fetch_scheduler._schedule_poll = fetch_scheduler.delays.append
+    return fetch_scheduler
+
+
+def test_backoff_delay_bounds() -> None:
+    """The delay doubles per attempt up to the maximum, plus at most half of it as jitter."""
+    for attempt, expected in ((0, 300), (1, 600), (3, 2400), (4, 3600), (10, 3600)):
+        delay = backoff_delay(attempt, POLL_BASE_DELAY, POLL_MAX_DELAY)
+        assert expected <= delay <= expected + min(scheduler.JITTER_MAX, expected / 2)
+
+
+async def test_needs_fetch(price_coordinator, polls) -> None:
+    """Tomorrow's prices are polled for from publication until the cutoff, and only while missing."""
+    assert not polls._needs_fetch(_at(14))
+
+    _drop_tomorrow(price_coordinator)
+    assert not polls._needs_fetch(_at(12.5))
+    assert polls._needs_fetch(_at(13))
+    assert polls._needs_fetch(_at(22.5))
+    assert not polls._needs_fetch(_at(23))
+    # Dagens priser har tagit slut
+    assert polls._needs_fetch(_at(0.5, days=1))
+
+    price_coordinator.last_update_success = False
+    assert polls._needs_fetch(_at(12))
+
+
+async def test_poll_backs_off_until_published(price_coordinator, polls, freezer) -> None:
+    """Polls back off while tomorrow is missing and stop once it arrives."""
+    complete = price_coordinator.data
+    _drop_tomorrow(price_coordinator)
+    freezer.move_to(_at(13.5))
+
+    async def refresh_unpublished():
+        price_coordinator.last_update_success = True
+
+    price_coordinator.async_refresh = refresh_unpublished
+    await polls._async_poll(None)
+    await polls._async_poll(None)
+    assert polls.delays == [POLL_BASE_DELAY, 2 * POLL_BASE_DELAY]
+
+    async def refresh_published():
+        price_coordinator._build_price_index(complete, force=True)
+        price_coordinator.data = complete
+
+    price_coordinator.async_refresh = refresh_published
+    await polls._async_poll(None)
+    assert polls.delays == [POLL_BASE_DELAY, 2 * POLL_BASE_DELAY]
+    assert polls._poll_attempt == 0
+
+
+async def test_failed_fetch_retries(price_coordinator, polls, freezer) -> None:
+    """A failed fetch is retried on its own schedule."""
+    _drop_tomorrow(price_coordinator)
+    freezer.move_to(_at(13.5))
+
+    async def refresh_failed():
+        price_coordinator.last_update_success = False
+
+    price_coordinator.async_refresh = refresh_failed
+    await polls._async_poll(None)
+    await polls._async_poll(None)
+    assert polls.delays == [RETRY_BASE_DELAY, 2 * RETRY_BASE_DELAY]
+    assert polls._poll_attempt == 0
+
+
+async def test_kept_prices_retry_after(price_coordinator, polls, freezer) -> None:
+    """Prices kept through a rate limit are retried, no sooner than Retry-After."""
+    _drop_tomorrow(price_coordinator)
+    freezer.move_to(_at(13.5))
+
+    async def refresh_rate_limited():
+        price_coordinator.kept_prices = True
+        price_coordinator.retry_after = 600.0
+
+    price_coordinator.async_refresh = refresh_rate_limited
+    await polls._async_poll(None)
+    await polls._async_poll(None)
+    assert price_coordinator.last_update_success
+    assert polls.delays == [600.0, 600.0]
+    assert polls._retry_attempt == 2
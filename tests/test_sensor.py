@@ -0,0 +1,67 @@
+"""Tests for the price sensor's attribute modes."""
+import pytest
+from homeassistant.util import dt as dt_util
+
+from tibber_extended.const import ATTRIBUTE_MODE_COMPACT, ATTRIBUTE_MODE_FULL, ATTRIBUTE_MODE_MINIMAL
+from tibber_extended.sensor import TibberPriceSensor
+
+from .conftest import HOME_ID
+
+
+def _sensor(coordinator, mode: str, resolution: str | None = None) -> TibberPriceSensor:
+    """Return a price sensor for the test home."""
+    return TibberPriceSensor(coordinator, HOME_ID, "Home", "SEK", attribute_mode=mode, resolution=resolution)
+
+
+async def test_full_mode_lists_prices(price_coordinator) -> None:
+    """Full mode lists every slot in the Tibber API format."""
+    attributes = _sensor(price_coordinator, ATTRIBUTE_MODE_FULL).extra_state_attributes
+    today = attributes["today"]
+    assert len(today["prices"]) == today["count"] == len(price_coordinator.get_prices(HOME_ID, "today"))
+    assert today["prices"][1] == {
+        "total": 1.0,
+        "energy": 0.5,
+        "tax": 0.25,
+        "startsAt": today["prices"][1]["startsAt"],
+        "level": "NORMAL",
+    }
+    assert "today_series" not in attributes
+    assert attributes["current_total"] == 24.0
+
+
+@pytest.mark.parametrize(("resolution", "interval"), [("QUARTER_HOURLY", 15), ("HOURLY", 60)])
+async def test_compact_mode_columns(price_coordinator, resolution: str, interval: int) -> None:
+    """Compact mode gives parallel columns from one start time, kept out of the recorder."""
+    sensor = _sensor(price_coordinator, ATTRIBUTE_MODE_COMPACT, resolution)
+    attributes = sensor.extra_state_attributes
+    prices = price_coordinator.get_prices(HOME_ID, "today", resolution)
+
+    series = attributes["today_series"]
+    assert "prices" not in attributes["today"]
+    assert dt_util.parse_datetime(series["start"]).timestamp() == prices.start[0]
+    assert series["interval"] == interval
+    assert series["total"] == prices.total.tolist()
+    assert series["level"] == [3] * len(prices)
+    assert {"today_series", "tomorrow_series"} <= sensor._unrecorded_attributes
+
+
+async def test_minimal_mode_statistics_only(price_coordinator) -> None:
+    """Minimal mode keeps the count and statistics only."""
+    attributes = _sensor(price_coordinator, ATTRIBUTE_MODE_MINIMAL).extra_state_attributes
+    count = len(price_coordinator.get_prices(HOME_ID, "today"))
+    assert attributes["today"] == {
+        "count": count,
+        "total": {"min": 0.0, "max": count - 1.0, "avg": (count - 1) / 2},
+        "energy": {"min": 0.0, "max": (count - 1) / 2, "avg": (count - 1) / 4},
+    }
+    assert "today_series" not in attributes
+
+
+async def test_day_attributes_cached_per_home_version(price_coordinator) -> None:
+    """The day attributes are built once per data version of the home."""
+    sensor = _sensor(price_coordinator, ATTRIBUTE_MODE_COMPACT)
+    first = sensor._get_day_attributes()
+    assert sensor._get_day_attributes() is first
+
+    price_coordinator.home_versions[HOME_ID] += 1
+    assert sensor._get_day_attributes() is not first